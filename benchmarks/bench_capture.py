@@ -0,0 +1,69 @@
+"""
+Recording cost and time-range seek speed of capture files.
+
+Records are written with CaptureWriter, plain and zlib-compressed, and a short time
+range near the end of the capture is then read back with CaptureReader. The seek is
+compared with a full scan of the file to show that it does not depend on capture size.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_capture
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from serial_toolbox.capture import CaptureReader, CaptureWriter
+
+
+def write_case(path: str, records: int, size: int, compress: bool) -> tuple:
+    """
+    Return the write() rate in records/s and the file size in bytes.
+    """
+    # Text-like payload so that compression has something to work with
+    payload = (b'12.5,-3.25,0.125,' * (size // 17 + 1))[:size]
+    start = time.perf_counter()
+    with CaptureWriter(path, compress=compress) as writer:
+        for index in range(records):
+            writer.write(payload, timestamp=index * 1e-3)
+        elapsed = time.perf_counter() - start
+    return records / elapsed, os.path.getsize(path)
+
+
+def read_case(path: str, records: int) -> tuple:
+    """
+    Return the time to read the last 100 ms of the capture via the index and via a full scan.
+    """
+    end_time = (records - 1) * 1e-3
+    start = time.perf_counter()
+    with CaptureReader(path) as reader:
+        selected = sum(1 for _ in reader.records(end_time - 0.1, end_time))
+    seek = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with CaptureReader(path) as reader:
+        scanned = sum(1 for record in reader if end_time - 0.1 <= record.time <= end_time)
+    scan = time.perf_counter() - start
+    assert selected == scanned
+    return seek, scan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=1000000, help='Number of records.')
+    parser.add_argument('--size', type=int, default=64, help='Bytes per record.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for compress in (False, True):
+            path = os.path.join(directory, f'capture_{compress}.bin')
+            rate, file_size = write_case(path, args.records, args.size, compress)
+            seek, scan = read_case(path, args.records)
+            label = 'zlib' if compress else 'plain'
+            print(f'{label:5s}: write {rate:12,.0f} records/s, {file_size / 1e6:8.1f} MB, '
+                  f'seek {seek * 1e3:7.2f} ms, full scan {scan * 1e3:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
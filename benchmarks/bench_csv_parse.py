@@ -0,0 +1,70 @@
+"""
+CPU cost of parsing numeric CSV lines: the previous per-line parser versus parse_numeric_batch.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_csv_parse
+"""
+import argparse
+import time
+
+from serial_toolbox.parsing import parse_numeric_batch
+
+
+def per_line(lines):
+    """The previous rxd_update parsing: validate each line, then parse it again."""
+    rows, text = [], []
+    for line in lines:
+        try:
+            [float(x) for x in line.split(',')]
+            is_numeric = True
+        except ValueError:
+            is_numeric = False
+        if is_numeric:
+            rows.append([float(x) for x in line.split(',')])
+        else:
+            text.append(line)
+    return rows, text
+
+
+def batch(lines):
+    return parse_numeric_batch(lines)
+
+
+def make_lines(count: int, channels: int, text_every: int):
+    lines = []
+    for i in range(count):
+        if text_every and i % text_every == 0:
+            lines.append(f'status: sample {i} ok')
+        else:
+            lines.append(','.join(f'{(i * (c + 1)) % 1000 / 7:.4f}' for c in range(channels)))
+    return lines
+
+
+def cpu_per_second(parser, rate: int, tick: float, channels: int, text_every: int, seconds: int = 3) -> float:
+    """Fraction of one core needed to parse `rate` lines/s delivered in batches of one tick."""
+    lines = make_lines(int(rate * tick), channels, text_every)
+    ticks = int(seconds / tick)
+    start = time.process_time()
+    for _ in range(ticks):
+        parser(lines)
+    return (time.process_time() - start) / (ticks * tick)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--channels', type=int, default=4, help='Values per line.')
+    parser.add_argument('--tick', type=float, default=0.01, help='Batch period in seconds (rxd_update tick).')
+    args = parser.parse_args()
+
+    print(f'{args.channels} channels, batches of {args.tick * 1e3:.0f} ms, CPU as % of one core')
+    print(f'{"rate":>12s} {"content":>14s} {"per-line":>10s} {"batch":>10s}')
+    for rate in (10_000, 100_000):
+        for label, text_every in (('numeric', 0), ('1% text', 100)):
+            before = cpu_per_second(per_line, rate, args.tick, args.channels, text_every)
+            after = cpu_per_second(batch, rate, args.tick, args.channels, text_every)
+            print(f'{rate:>8,d} l/s {label:>14s} {before * 100:9.1f}% {after * 100:9.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Plot frame time versus window size, with and without decimation, on the Agg backend.
+
+Each frame appends --rate samples per channel to a full TraceBuffer and then draws
+it with TracePlot, as SerialMonitor.update_plot does: reduce() on a view of the
+buffer, then draw(). The reduce column is the part spent under the data lock.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_decimate
+"""
+import argparse
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from serial_toolbox.plotting import TracePlot
+from serial_toolbox.trace_buffer import TraceBuffer
+
+
+def run_case(decimation: str, channels: int, window_size: int, rate: int, frames: int) -> tuple:
+    rng = np.random.default_rng(0)
+    buffer = TraceBuffer(window_size, channels)
+
+    def append(count):
+        phase = (buffer.total + np.arange(count)) / 5000
+        buffer.extend(np.sin(phase)[:, None] + rng.normal(0, 0.05, size=(count, channels)))
+
+    append(window_size)
+    figure, ax = plt.subplots()
+    plotter = TracePlot(figure, ax, window_size, decimation)
+    plotter.update(buffer.view(), buffer.total)
+    figure.canvas.draw()
+
+    reduce_time = 0.0
+    start = time.perf_counter()
+    for _ in range(frames):
+        append(rate)
+        reduce_start = time.perf_counter()
+        x, y = plotter.reduce(buffer.view(), buffer.total)
+        reduce_time += time.perf_counter() - reduce_start
+        plotter.draw(x, y, window_size)
+        figure.canvas.draw()
+    elapsed = time.perf_counter() - start
+    plt.close(figure)
+    return elapsed / frames, reduce_time / frames, y.shape[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--channels', type=int, default=4, help='Number of channels.')
+    parser.add_argument('--rate', type=int, default=1000, help='Samples per channel appended per frame.')
+    parser.add_argument('--frames', type=int, default=20, help='Frames per measurement.')
+    parser.add_argument('--windows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Window sizes to run.')
+    args = parser.parse_args()
+
+    print(f'{args.channels} channels, {args.rate} new samples per frame, Agg backend, time per frame')
+    print(f'{"window":>10s} {"decimation":>10s} {"frame":>10s} {"reduce":>10s} {"points":>8s}')
+    for window_size in args.windows:
+        for decimation in ('none', 'minmax', 'lttb'):
+            frame, reduce, points = run_case(decimation, args.channels, window_size, args.rate, args.frames)
+            print(f'{window_size:10,d} {decimation:>10s} {frame * 1e3:8.1f}ms {reduce * 1e3:8.2f}ms {points:8,d}')
+
+
+if __name__ == '__main__':
+    main()
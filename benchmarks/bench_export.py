@@ -0,0 +1,80 @@
+"""
+Exporter throughput per format and the time it adds to the reader thread.
+
+Records are comma-separated numeric lines in batches, as serial_interface passes them
+to its listeners; the raw format gets the joined lines as read chunks. The listener
+column is the time add_records (or write) takes in the calling thread, which is all
+the reader pays; the throughput column includes waiting for the writer thread to
+finish. The baseline writes each row to a csv.writer in the calling thread.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_export
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from serial_toolbox.export import Exporter
+
+from .bench_store import make_batches
+
+
+def run_exporter(path: str, batches: list, raw: bool) -> tuple:
+    exporter = Exporter(path, max_pending_chunks=1 << 16)
+    listener = 0.0
+    start = time.perf_counter()
+    for lines, received_time, first_index in batches:
+        call_start = time.perf_counter()
+        if raw:
+            exporter.write(lines)
+        else:
+            exporter.add_records(lines, received_time, first_index)
+        listener += time.perf_counter() - call_start
+    exporter.close()
+    elapsed = time.perf_counter() - start
+    assert not exporter.dropped_records
+    return elapsed, listener, sum(os.path.getsize(segment) for segment in exporter.segments)
+
+
+def run_baseline(path: str, batches: list) -> tuple:
+    start = time.perf_counter()
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        for lines, received_time, first_index in batches:
+            for offset, line in enumerate(lines):
+                writer.writerow([received_time, first_index + offset] + [float(value) for value in line.split(',')])
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=1_000_000, help='Records to export.')
+    parser.add_argument('--batch-size', type=int, default=100, help='Records per batch.')
+    parser.add_argument('--channels', type=int, default=4, help='Numeric columns per record.')
+    args = parser.parse_args()
+
+    batches = make_batches(args.records, args.batch_size, args.channels, 10000)
+    raw_batches = [(('\n'.join(lines) + '\n').encode(), received_time, first_index)
+                   for lines, received_time, first_index in batches]
+
+    print(f'{args.records:,} records of {args.channels} channels in batches of {args.batch_size}')
+    print(f'{"":16s} {"throughput":>14s} {"file":>10s} {"listener/batch":>15s}')
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [('csv.writer', lambda: run_baseline(os.path.join(directory, 'baseline.csv'), batches))]
+        for format in ('csv', 'npy', 'npz'):
+            cases.append((f'Exporter {format}',
+                          lambda format=format: run_exporter(os.path.join(directory, f'export.{format}'),
+                                                             batches, False)))
+        cases.append(('Exporter raw', lambda: run_exporter(os.path.join(directory, 'export.bin'), raw_batches, True)))
+        for name, run in cases:
+            elapsed, listener, size = run()
+            print(f'{name:16s} {args.records / elapsed:10,.0f} r/s {size / elapsed / 1e6:6.1f} MB/s '
+                  f'{listener / len(batches) * 1e6:11.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Decode throughput of the framers in serial_toolbox.framing, fed in serial-sized chunks.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_framing
+"""
+import argparse
+import binascii
+import os
+import time
+
+from serial_toolbox.framing import CobsFramer, FixedLengthFramer, LengthPrefixedFramer, LineFramer, SlipFramer
+
+
+def cobs_encode(packet: bytes) -> bytes:
+    out = bytearray()
+    for block in packet.split(b'\x00'):
+        while len(block) >= 254:
+            out.append(0xFF)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def slip_encode(packet: bytes) -> bytes:
+    return b'\xc0' + packet.replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc') + b'\xc0'
+
+
+def with_crc(packet: bytes) -> bytes:
+    return packet + binascii.crc_hqx(packet, 0xFFFF).to_bytes(2, 'big')
+
+
+def measure(framer, stream: bytes, chunk_size: int) -> tuple:
+    start = time.perf_counter()
+    frames = 0
+    for offset in range(0, len(stream), chunk_size):
+        frames += len(framer.feed(stream[offset:offset + chunk_size]))
+    elapsed = time.perf_counter() - start
+    return len(stream) / elapsed, frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packets', type=int, default=100000, help='Number of packets per framer.')
+    parser.add_argument('--packet-size', type=int, default=32, help='Payload size in bytes.')
+    parser.add_argument('--chunk-size', type=int, default=4096, help='Size of each simulated read.')
+    args = parser.parse_args()
+
+    packets = [os.urandom(args.packet_size) for _ in range(args.packets)]
+    cases = [
+        ('line', LineFramer(), b''.join(p.hex().encode() + b'\n' for p in packets)),
+        ('fixed', FixedLengthFramer(args.packet_size), b''.join(packets)),
+        ('length_prefixed', LengthPrefixedFramer(2), b''.join(len(p).to_bytes(2, 'big') + p for p in packets)),
+        ('length_prefixed+crc16', LengthPrefixedFramer(2, crc='crc16-ccitt'),
+         b''.join((len(p) + 2).to_bytes(2, 'big') + with_crc(p) for p in packets)),
+        ('slip', SlipFramer(), b''.join(slip_encode(p) for p in packets)),
+        ('cobs', CobsFramer(), b''.join(cobs_encode(p) + b'\x00' for p in packets)),
+        ('cobs+crc16', CobsFramer(crc='crc16-ccitt'), b''.join(cobs_encode(with_crc(p)) + b'\x00' for p in packets)),
+    ]
+
+    print(f'{"framer":24s} {"MB/s":>10s} {"frames/s":>12s}')
+    for name, framer, stream in cases:
+        bytes_per_second, frames_per_second = measure(framer, stream, args.chunk_size)
+        print(f'{name:24s} {bytes_per_second / 1e6:10.1f} {frames_per_second:12,.0f}')
+    print(f'{"921600 baud link":24s} {921600 / 10 / 1e6:10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Startup time budget check for the serial_toolbox entry points.
+
+Each target is run in a fresh interpreter several times and the median time is
+compared with its budget. The check also fails if a target loads one of the heavy
+optional dependencies that it should not need. Exits with status 1 on failure, so
+it can be run in CI.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_import_time
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('matplotlib', 'numpy', 'yaml', 'pydantic', 'prompt_toolkit', 'coloredlogs')
+
+TARGETS = [
+    # (label, code, budget in ms, heavy modules it may load)
+    ('import serial_toolbox.connect', 'import serial_toolbox.connect', 150, ()),
+    ('import serial_toolbox.interface_core', 'import serial_toolbox.interface_core', 150, ()),
+    ('sertools --help', 'from serial_toolbox.cli import main\n'
+                        'try:\n    main(["--help"])\nexcept SystemExit:\n    pass', 200, ()),
+    # The monitor itself needs numpy and prompt_toolkit, but matplotlib only when plotting is enabled
+    ('import serial_toolbox.ui', 'import serial_toolbox.ui', 400, ('numpy', 'prompt_toolkit')),
+]
+
+_PROBE = '''
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(elapsed, ','.join(name for name in {heavy!r} if name in sys.modules), file=sys.stderr)
+'''
+
+
+def measure(code: str, runs: int) -> tuple:
+    """
+    Return the median time in ms of running code in a fresh interpreter and the heavy modules it loaded.
+    """
+    times = []
+    loaded = ''
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', _PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True)
+        elapsed, _, loaded = result.stderr.strip().splitlines()[-1].partition(' ')
+        times.append(float(elapsed) * 1e3)
+    return statistics.median(times), [name for name in loaded.split(',') if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Runs per target.')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply all budgets, e.g. for slow CI machines.')
+    args = parser.parse_args()
+
+    failed = False
+    for label, code, budget, allowed in TARGETS:
+        elapsed, loaded = measure(code, args.runs)
+        budget *= args.scale
+        unexpected = [name for name in loaded if name not in allowed]
+        ok = elapsed <= budget and not unexpected
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label:38s} {elapsed:7.1f} ms (budget {budget:.0f} ms)"
+              + (f", loaded {', '.join(unexpected)}" if unexpected else ''))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Receive throughput (lines/s) of serial_interface, compared with the per-line readline() reader.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_line_reader
+"""
+import argparse
+import os
+import threading
+import time
+
+from serial_toolbox.interface_core import serial_interface
+
+from .common import open_pty_pair, quiet_logger
+
+
+class readline_interface(serial_interface):
+    """
+    serial_interface with the previous reader: one readline() and one process_data() per line.
+    """
+
+    def read_from_port(self):
+        while not self.stop_flag:
+            if self.serial_port.in_waiting:
+                line = self.serial_port.readline().decode('utf-8').strip()
+                self.process_data(line)
+        self.serial_port.close()
+
+
+def measure(interface_class, lines: int, line_length: int) -> float:
+    """
+    Push lines through a pty as fast as the reader accepts them and return the achieved lines/s.
+    """
+    master_fd, port = open_pty_pair()
+    interface = interface_class(port, terminal=False, logger=quiet_logger())
+
+    line = ('1' * (line_length - 1) + '\n').encode()
+    block = line * max(1, 4096 // len(line))
+    lines_per_block = len(block) // len(line)
+
+    def writer():
+        for _ in range(lines // lines_per_block):
+            os.write(master_fd, block)
+
+    expected = (lines // lines_per_block) * lines_per_block
+    start = time.perf_counter()
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    while interface.data_index < expected and time.perf_counter() - start < 60:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    interface.stop_flag = True
+    interface.thread.join(timeout=1.0)
+    os.close(master_fd)
+    return interface.data_index / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000, help='Number of lines to send.')
+    parser.add_argument('--line-length', type=int, default=16, help='Line length in bytes, including the newline.')
+    args = parser.parse_args()
+
+    before = measure(readline_interface, args.lines, args.line_length)
+    after = measure(serial_interface, args.lines, args.line_length)
+    print(f'{args.line_length}-byte lines')
+    print(f'readline() per line : {before:12,.0f} lines/s')
+    print(f'chunked framer      : {after:12,.0f} lines/s ({after / before:.1f}x)')
+    print(f'921600 baud needs   : {921600 / 10 / args.line_length:12,.0f} lines/s')
+
+
+if __name__ == '__main__':
+    main()
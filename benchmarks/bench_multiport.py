@@ -0,0 +1,71 @@
+"""
+CPU use of one thread per port (serial_interface) versus one selector thread (MultiPortInterface).
+
+Run from the repository root::
+
+    python -m benchmarks.bench_multiport
+"""
+import argparse
+import os
+import time
+
+from serial_toolbox.interface_core import MultiPortInterface, serial_interface
+
+from .common import open_pty_pair, quiet_logger
+
+
+def run(kind: str, ports: int, rate: int, duration: float) -> tuple:
+    """
+    Return (CPU fraction of one core, received lines/s) for `ports` ports receiving `rate` lines/s in total.
+    """
+    pairs = [open_pty_pair() for _ in range(ports)]
+    masters = [master for master, _ in pairs]
+    if kind == 'threads':
+        interfaces = [serial_interface(port, terminal=False, logger=quiet_logger()) for _, port in pairs]
+    else:
+        interfaces = [MultiPortInterface([port for _, port in pairs])]
+
+    line = b'1,2,3,4\n'
+    period = 0.01
+    per_tick = max(0, int(rate * period / ports))
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    next_tick = start
+    while time.perf_counter() - start < duration:
+        if per_tick:
+            for master in masters:
+                os.write(master, line * per_tick)
+        next_tick += period
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    cpu = (time.process_time() - cpu_start) / elapsed
+
+    if kind == 'threads':
+        received = sum(interface.data_index for interface in interfaces)
+        for interface in interfaces:
+            interface.stop_flag = True
+            interface.thread.join()
+    else:
+        received = sum(interfaces[0].data_index.values())
+        interfaces[0].stop()
+    for master in masters:
+        os.close(master)
+    return cpu, received / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=3.0, help='Measurement period per case in seconds.')
+    parser.add_argument('--rate', type=int, default=20000, help='Total lines/s across all ports when busy.')
+    args = parser.parse_args()
+
+    print(f'{"ports":>5s} {"traffic":>12s} {"threads CPU":>12s} {"selector CPU":>13s}')
+    for ports in (1, 16, 32):
+        for rate in (0, args.rate):
+            threads_cpu, _ = run('threads', ports, rate, args.duration)
+            selector_cpu, _ = run('selector', ports, rate, args.duration)
+            print(f'{ports:5d} {rate:8,d} l/s {threads_cpu * 100:11.1f}% {selector_cpu * 100:12.1f}%')
+
+
+if __name__ == '__main__':
+    main()
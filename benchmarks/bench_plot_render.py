@@ -0,0 +1,71 @@
+"""
+Frame time of the plot with the headless Agg backend: clear-and-replot versus TracePlot.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_plot_render
+"""
+import argparse
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from serial_toolbox.plotting import TracePlot
+
+
+def frames(channels: int, window_size: int, count: int):
+    rng = np.random.default_rng(0)
+    data = np.sin(np.linspace(0, 20, window_size)) + rng.normal(0, 0.05, size=(channels, window_size))
+    for _ in range(count):
+        data = np.roll(data, -10, axis=1)
+        yield data
+
+
+def replot(channels: int, window_size: int, count: int) -> float:
+    """The previous update_plot: ax.clear(), one new line per trace and a full draw."""
+    figure, ax = plt.subplots()
+    start = time.perf_counter()
+    for traces in frames(channels, window_size, count):
+        ax.clear()
+        for trace in traces:
+            ax.plot(trace)
+        ax.relim()
+        ax.autoscale_view()
+        figure.canvas.draw()
+        figure.canvas.flush_events()
+    elapsed = (time.perf_counter() - start) / count
+    plt.close(figure)
+    return elapsed
+
+
+def incremental(channels: int, window_size: int, count: int) -> float:
+    figure, ax = plt.subplots()
+    plotter = TracePlot(figure, ax, window_size)
+    plotter.update(next(frames(channels, window_size, 1)))
+    start = time.perf_counter()
+    for traces in frames(channels, window_size, count):
+        plotter.update(traces)
+    elapsed = (time.perf_counter() - start) / count
+    plt.close(figure)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--channels', type=int, default=8, help='Number of channels.')
+    parser.add_argument('--frames', type=int, default=20, help='Frames per measurement.')
+    args = parser.parse_args()
+
+    print(f'{args.channels} channels, Agg backend, time per frame')
+    print(f'{"window":>9s} {"clear+replot":>14s} {"TracePlot":>12s}')
+    for window_size in (200, 2_000, 10_000):
+        before = replot(args.channels, window_size, args.frames)
+        after = incremental(args.channels, window_size, args.frames)
+        print(f'{window_size:9,d} {before * 1e3:12.1f}ms {after * 1e3:10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
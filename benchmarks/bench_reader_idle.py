@@ -0,0 +1,57 @@
+"""
+Idle CPU, wake-up latency and stop latency of serial_interface's reader thread.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_reader_idle
+"""
+import argparse
+import os
+import statistics
+import time
+
+from serial_toolbox.interface_core import serial_interface
+
+from .common import open_pty_pair, quiet_logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--idle', type=float, default=3.0, help='Idle measurement period in seconds.')
+    parser.add_argument('--samples', type=int, default=50, help='Number of wake-up latency samples.')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='serial_interface poll_interval.')
+    args = parser.parse_args()
+
+    master_fd, port = open_pty_pair()
+    interface = serial_interface(port, terminal=False, logger=quiet_logger(), poll_interval=args.poll_interval)
+
+    # Idle CPU: the main thread sleeps, so process CPU time is the reader's cost.
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    time.sleep(args.idle)
+    idle_cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+
+    latencies = []
+    for i in range(args.samples):
+        time.sleep(0.01)
+        sent = time.perf_counter()
+        os.write(master_fd, f'{i}\n'.encode())
+        interface.data_queue.get(timeout=1.0)
+        latencies.append(time.perf_counter() - sent)
+
+    stop_start = time.perf_counter()
+    interface.stop_flag = True
+    interface.thread.join()
+    stop_latency = time.perf_counter() - stop_start
+    os.close(master_fd)
+
+    latencies_us = sorted(x * 1e6 for x in latencies)
+    print(f'idle CPU                : {idle_cpu * 100:.2f} % of one core')
+    print(f'wake-up latency median  : {statistics.median(latencies_us):.0f} us')
+    print(f'wake-up latency p95     : {latencies_us[int(len(latencies_us) * 0.95) - 1]:.0f} us')
+    print(f'wake-up latency max     : {latencies_us[-1]:.0f} us')
+    print(f'stop latency            : {stop_latency * 1e3:.1f} ms (poll_interval {args.poll_interval * 1e3:.0f} ms)')
+
+
+if __name__ == '__main__':
+    main()
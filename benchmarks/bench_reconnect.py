@@ -0,0 +1,87 @@
+"""
+Time for a serial_interface to resume after its port disappears and comes back.
+
+An unplug is simulated with a pty reached through a symlink: the symlink is removed
+and the pty closed, then after --downtime seconds a new pty appears under the same
+name. The benchmark reports how long after the port reappeared the reader was
+reading again, and the cost of a full list_ports.comports() scan for comparison.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_reconnect
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tty
+
+import serial
+from serial.tools import list_ports
+
+from serial_toolbox.connect import ReconnectSupervisor
+from serial_toolbox.interface_core import serial_interface
+
+from .common import quiet_logger
+
+
+def plug(link: str) -> tuple:
+    """
+    Create a pty and point link at its slave side.
+    """
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    os.symlink(os.ttyname(slave_fd), link)
+    return master_fd, slave_fd
+
+
+def unplug(link: str, master_fd: int, slave_fd: int):
+    os.remove(link)
+    os.close(master_fd)
+    os.close(slave_fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=20, help='Number of unplug/replug cycles.')
+    parser.add_argument('--downtime', type=float, default=0.1, help='Seconds the port is gone per cycle.')
+    args = parser.parse_args()
+
+    logger = quiet_logger()
+    link = os.path.join(tempfile.mkdtemp(), 'ttyBENCH')
+    master_fd, slave_fd = plug(link)
+    supervisor = ReconnectSupervisor(link, logger=logger)
+    interface = serial_interface(serial.Serial(link, timeout=0.1), terminal=False, logger=logger,
+                                 supervisor=supervisor)
+
+    resume_times = []
+    for cycle in range(args.cycles):
+        unplug(link, master_fd, slave_fd)
+        time.sleep(args.downtime)
+        master_fd, slave_fd = plug(link)
+        replugged = time.monotonic()
+        # Resumed once a record written to the new port reaches the queue
+        while interface.data_queue.empty():
+            os.write(master_fd, b'%d\n' % cycle)
+            time.sleep(0.0005)
+        resume_times.append((time.monotonic() - replugged) * 1e3)
+        interface.data_queue.get_many(timeout=0.05)
+
+    interface.stop_flag = True
+    interface.thread.join()
+    unplug(link, master_fd, slave_fd)
+
+    scan_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        list_ports.comports()
+        scan_times.append((time.perf_counter() - start) * 1e3)
+
+    print(f'{args.cycles} reconnects, {supervisor.downtime:.2f} s total downtime')
+    print(f'resume after replug : median {statistics.median(resume_times):6.2f} ms, max {max(resume_times):6.2f} ms')
+    print(f'comports() scan     : median {statistics.median(scan_times):6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Producer/consumer throughput of the previous queue.Queue handling versus RingBuffer.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_ring_buffer
+"""
+import argparse
+import queue
+import threading
+import time
+
+from serial_toolbox.interface_core import RingBuffer
+
+
+def queue_case(items: int, batch: int, maxsize: int) -> tuple:
+    """
+    The previous process_data/rxd_update pair: qsize() check + get() to drop, qsize() polling consumer.
+
+    The producer uses get_nowait() here: with the previous blocking get(), the consumer can empty
+    the queue between qsize() and get() and the producer then blocks forever.
+    """
+    data_queue = queue.Queue()
+    received = 0
+    done = threading.Event()
+
+    def consumer():
+        nonlocal received
+        while not done.is_set() or data_queue.qsize():
+            size = data_queue.qsize()
+            if size:
+                received += len([data_queue.get() for _ in range(size)])
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    start = time.perf_counter()
+    for base in range(0, items, batch):
+        for item in range(base, base + batch):
+            if data_queue.qsize() >= maxsize:
+                try:
+                    data_queue.get_nowait()
+                except queue.Empty:
+                    pass
+            data_queue.put(item)
+    elapsed = time.perf_counter() - start
+    done.set()
+    thread.join()
+    return items / elapsed, items - received
+
+
+def ring_case(items: int, batch: int, maxsize: int) -> tuple:
+    ring = RingBuffer(maxsize)
+    received = 0
+    done = threading.Event()
+
+    def consumer():
+        nonlocal received
+        while not done.is_set() or ring.qsize():
+            received += len(ring.get_many(timeout=0.1))
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    start = time.perf_counter()
+    for base in range(0, items, batch):
+        ring.put_many(list(range(base, base + batch)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    thread.join()
+    return items / elapsed, ring.dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=500000, help='Number of records.')
+    parser.add_argument('--batch', type=int, default=50, help='Records per reader batch.')
+    parser.add_argument('--maxsize', type=int, default=1000, help='Queue bound.')
+    args = parser.parse_args()
+
+    before, before_dropped = queue_case(args.items, args.batch, args.maxsize)
+    after, after_dropped = ring_case(args.items, args.batch, args.maxsize)
+    print(f'queue.Queue + qsize() : {before:12,.0f} records/s, {before_dropped:8,d} dropped')
+    print(f'RingBuffer            : {after:12,.0f} records/s, {after_dropped:8,d} dropped')
+
+
+if __name__ == '__main__':
+    main()
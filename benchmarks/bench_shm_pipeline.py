@@ -0,0 +1,105 @@
+"""
+Receive throughput of serial_interface and ProcessInterface with and without UI load.
+
+A synthetic device in a separate process writes numeric lines to a pty as fast as
+they are read. The consumer takes batches as SerialMonitor.rxd_update does: records
+from serial_interface are parsed in the consumer thread, ProcessInterface batches
+arrive parsed. The UI load is threads spinning pure Python code in the monitor's
+process, standing in for rendering and printing that hold the GIL.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_shm_pipeline
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+
+from serial_toolbox.interface_core import serial_interface
+from serial_toolbox.parsing import parse_numeric_batch
+from serial_toolbox.shm_pipeline import ProcessInterface
+
+from .common import open_pty_pair, quiet_logger
+from .device import SyntheticDevice
+
+
+def run_device(master_fd: int, line_length: int, channels: int, stop):
+    device = SyntheticDevice(master_fd, 0, line_length, channels, max_lines=100_000_000)
+    device.start()
+    stop.wait()
+    device.stop()
+
+
+def spin(stop: threading.Event):
+    while not stop.is_set():
+        total = 0
+        for value in range(1000):
+            total += value * value
+
+
+def run_case(mode: str, load_threads: int, duration: float, line_length: int, channels: int) -> float:
+    master_fd, port = open_pty_pair(timeout=0)
+    # fork before any thread is started, so the device inherits the pty master safely
+    context = multiprocessing.get_context('fork')
+    device_stop = context.Event()
+    device = context.Process(target=run_device, args=(master_fd, line_length, channels, device_stop))
+    device.start()
+
+    logger = quiet_logger()
+    if mode == 'process':
+        interface = ProcessInterface(port, max_queue_size=100000, logger=logger)
+        time.sleep(1.0)  # Let the spawned processes import and open the port
+    else:
+        interface = serial_interface(port, terminal=False, max_queue_size=100000, logger=logger)
+
+    load_stop = threading.Event()
+    loads = [threading.Thread(target=spin, args=(load_stop,), daemon=True) for _ in range(load_threads)]
+    received = 0
+    for load in loads:
+        load.start()
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        if mode == 'process':
+            for batch in interface.parsed_batches.get_many(timeout=0.1):
+                received += len(batch.records)
+        else:
+            records = interface.data_queue.get_many(timeout=0.1)
+            if records:
+                parse_numeric_batch([record['data'] for record in records])
+                received += len(records)
+    elapsed = time.perf_counter() - started
+    load_stop.set()
+    device_stop.set()
+    device.join()
+
+    if mode == 'process':
+        interface.stop()
+    else:
+        interface.stop_flag = True
+        interface.thread.join()
+    os.close(master_fd)
+    return received / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per case.')
+    parser.add_argument('--line-length', type=int, default=32, help='Bytes per line.')
+    parser.add_argument('--channels', type=int, default=4, help='Columns per line.')
+    parser.add_argument('--load-threads', type=int, nargs='+', default=[0, 1, 2],
+                        help='Numbers of UI load threads to run.')
+    args = parser.parse_args()
+
+    print(f'{os.cpu_count()} CPUs, {args.line_length}-byte lines of {args.channels} columns, '
+          f'{args.duration:.0f} s per case')
+    print(f'{"interface":>18s} {"load threads":>12s} {"received":>14s}')
+    for load_threads in args.load_threads:
+        for mode, name in (('thread', 'serial_interface'), ('process', 'ProcessInterface')):
+            rate = run_case(mode, load_threads, args.duration, args.line_length, args.channels)
+            print(f'{name:>18s} {load_threads:12d} {rate:10,.0f} l/s')
+
+
+if __name__ == '__main__':
+    main()
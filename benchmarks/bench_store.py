@@ -0,0 +1,86 @@
+"""
+SampleStore ingest rate, memory per record and range query time versus a list of record dicts.
+
+Records are comma-separated numeric lines in batches, as serial_interface passes them
+to its listeners. The baseline keeps the record dicts of data_queue in a list and
+answers a time range query by scanning it.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_store
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from serial_toolbox.store import SampleStore
+
+
+def make_batches(records: int, batch_size: int, channels: int, rate: float) -> list:
+    rng = np.random.default_rng(0)
+    batches = []
+    for first in range(0, records, batch_size):
+        values = rng.normal(size=(min(batch_size, records - first), channels))
+        lines = [','.join(f'{value:.4f}' for value in row) for row in values]
+        batches.append((lines, 1e9 + first / rate, first))
+    return batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=1_000_000, help='Records to store.')
+    parser.add_argument('--batch-size', type=int, default=100, help='Records per batch.')
+    parser.add_argument('--channels', type=int, default=4, help='Numeric columns per record.')
+    parser.add_argument('--rate', type=float, default=10000, help='Simulated records per second, for timestamps.')
+    parser.add_argument('--queries', type=int, default=100, help='Range queries to time.')
+    args = parser.parse_args()
+
+    batches = make_batches(args.records, args.batch_size, args.channels, args.rate)
+    duration = args.records / args.rate
+    rng = np.random.default_rng(1)
+    starts = 1e9 + rng.uniform(0, duration - 1, args.queries)
+
+    tracemalloc.start()
+    store = SampleStore(max_bytes=1 << 40)
+    start = time.perf_counter()
+    for lines, received_time, first_index in batches:
+        store.add_records(lines, received_time, first_index)
+    ingest = time.perf_counter() - start
+    store_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for t0 in starts:
+        window = store.window(t0, t0 + 1.0)
+    store_query = (time.perf_counter() - start) / args.queries
+
+    tracemalloc.start()
+    history = []
+    start = time.perf_counter()
+    for lines, received_time, first_index in batches:
+        history.extend({'index': first_index + offset, 'time': received_time, 'data': line}
+                       for offset, line in enumerate(lines))
+    list_ingest = time.perf_counter() - start
+    list_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    queries = max(args.queries // 10, 1)
+    start = time.perf_counter()
+    for t0 in starts[:queries]:
+        matches = [record for record in history if t0 <= record['time'] < t0 + 1.0]
+    list_query = (time.perf_counter() - start) / queries
+    assert len(matches) == len(store.window(starts[queries - 1], starts[queries - 1] + 1.0))
+
+    print(f'{args.records:,} records of {args.channels} channels, 1 s windows of ~{len(window):,} records')
+    print(f'{"":16s} {"ingest":>14s} {"memory/record":>14s} {"window query":>13s}')
+    print(f'{"list of dicts":16s} {args.records / list_ingest:10,.0f} r/s {list_memory / args.records:12.0f} B '
+          f'{list_query * 1e3:10.2f} ms')
+    print(f'{"SampleStore":16s} {args.records / ingest:10,.0f} r/s {store_memory / args.records:12.0f} B '
+          f'{store_query * 1e3:10.2f} ms')
+    print(f'(SampleStore ingest includes parsing the numeric values; the list keeps text only)')
+
+
+if __name__ == '__main__':
+    main()
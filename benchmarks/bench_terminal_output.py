@@ -0,0 +1,59 @@
+"""
+Memory and throughput of TerminalOutput under a sustained high line rate.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_terminal_output
+"""
+import argparse
+import io
+import threading
+import time
+import tracemalloc
+
+from serial_toolbox.output import TerminalOutput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0, help='Duration in seconds.')
+    parser.add_argument('--batch', type=int, default=100, help='Lines per put_many() call.')
+    args = parser.parse_args()
+
+    output = TerminalOutput()
+    stream = io.StringIO()
+    stop = threading.Event()
+    offered = 0
+
+    def producer():
+        nonlocal offered
+        lines = [f'RXD: {i},{i * 2},{i * 3}' for i in range(args.batch)]
+        while not stop.is_set():
+            output.put_many(lines)
+            offered += len(lines)
+
+    tracemalloc.start()
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    samples = []
+    start = time.monotonic()
+    while time.monotonic() - start < args.duration:
+        time.sleep(0.1)
+        stream.write(output.drain())
+        stream.seek(0)
+        stream.truncate()
+        samples.append(tracemalloc.get_traced_memory()[0])
+    stop.set()
+    thread.join()
+    elapsed = time.monotonic() - start
+
+    half = len(samples) // 2
+    print(f'offered      : {offered / elapsed:12,.0f} lines/s')
+    print(f'written      : {output.written / elapsed:12,.0f} lines/s')
+    print(f'suppressed   : {output.suppressed:12,d} lines')
+    print(f'memory       : {max(samples[:half]) / 1e6:.2f} MB peak in first half, '
+          f'{max(samples[half:]) / 1e6:.2f} MB peak in second half')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-sample cost of storing plot traces: Python lists with pop(0) versus TraceBuffer.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_trace_buffer
+"""
+import argparse
+import time
+
+import numpy as np
+
+from serial_toolbox.trace_buffer import TraceBuffer
+
+
+def list_traces(window_size: int, channels: int, samples: int) -> float:
+    """The previous update_traces: one list per channel, pop(0) once the window is full."""
+    traces = [[0.0] * window_size for _ in range(channels)]
+    values = [1.0] * channels
+    start = time.perf_counter()
+    for _ in range(samples):
+        for i, value in enumerate(values):
+            traces[i].append(value)
+        for trace in traces:
+            if len(trace) > window_size:
+                trace.pop(0)
+    return (time.perf_counter() - start) / samples
+
+
+def buffer_append(window_size: int, channels: int, samples: int) -> float:
+    buffer = TraceBuffer(window_size, channels)
+    buffer.extend(np.zeros((window_size, channels)))
+    values = [1.0] * channels
+    start = time.perf_counter()
+    for _ in range(samples):
+        buffer.append(values)
+    return (time.perf_counter() - start) / samples
+
+
+def buffer_extend(window_size: int, channels: int, samples: int, batch: int) -> float:
+    buffer = TraceBuffer(window_size, channels)
+    buffer.extend(np.zeros((window_size, channels)))
+    rows = np.ones((batch, channels))
+    start = time.perf_counter()
+    for _ in range(max(1, samples // batch)):
+        buffer.extend(rows)
+    return (time.perf_counter() - start) / (max(1, samples // batch) * batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--channels', type=int, default=8, help='Number of channels.')
+    parser.add_argument('--batch', type=int, default=100, help='Rows per extend() call.')
+    args = parser.parse_args()
+
+    print(f'{args.channels} channels, time per sample (all channels)')
+    print(f'{"window":>9s} {"list+pop(0)":>14s} {"append":>12s} {"extend x" + str(args.batch):>14s}')
+    for window_size in (1_000, 100_000, 1_000_000):
+        samples = max(20, 2_000_000 // window_size)
+        legacy = list_traces(window_size, args.channels, samples)
+        single = buffer_append(window_size, args.channels, 20_000)
+        batched = buffer_extend(window_size, args.channels, 100_000, args.batch)
+        print(f'{window_size:9,d} {legacy * 1e6:12.2f}us {single * 1e6:10.2f}us {batched * 1e6:12.3f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Receive throughput (lines/s) of serial_interface with RECV traffic logging on and off.
+
+Each case configures the root logger with log_init, writing the log file into a
+temporary directory, and pushes lines through a pty as fast as the reader accepts them.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_traffic_logging
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from serial_toolbox.interface_core import serial_interface
+from serial_toolbox.log_init import TrafficLogger, log_init, log_shutdown
+
+from .common import open_pty_pair
+
+CASES = [
+    # (label, file_log, async_file, traffic mode)
+    ('no file log, traffic off', False, False, 'off'),
+    ('sync file, traffic all (previous)', True, False, 'all'),
+    ('async file, traffic all', True, True, 'all'),
+    ('async file, traffic batch', True, True, 'batch'),
+    ('async file, traffic sample 1/100', True, True, 'sample'),
+    ('async file, traffic rate 100/s', True, True, 'rate'),
+    ('async file, traffic off', True, True, 'off'),
+]
+
+
+def measure(file_log: bool, async_file: bool, mode: str, lines: int, line_length: int) -> float:
+    """
+    Push lines through a pty and return the achieved lines/s.
+    """
+    logger = log_init(file_log=file_log, async_file=async_file)
+    master_fd, port = open_pty_pair()
+    interface = serial_interface(port, terminal=False, logger=logger, max_queue_size=lines,
+                                 traffic_log=TrafficLogger(mode, logger=logger))
+
+    line = ('1' * (line_length - 1) + '\n').encode()
+    block = line * max(1, 4096 // len(line))
+    lines_per_block = len(block) // len(line)
+
+    def writer():
+        for _ in range(lines // lines_per_block):
+            os.write(master_fd, block)
+
+    expected = (lines // lines_per_block) * lines_per_block
+    start = time.perf_counter()
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    while interface.data_index < expected and time.perf_counter() - start < 120:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    interface.stop_flag = True
+    interface.thread.join(timeout=1.0)
+    os.close(master_fd)
+    log_shutdown()
+    return interface.data_index / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000, help='Number of lines to send.')
+    parser.add_argument('--line-length', type=int, default=16, help='Line length in bytes, including the newline.')
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)  # log_init writes to ./log
+        try:
+            results = [(label, measure(file_log, async_file, mode, args.lines, args.line_length))
+                       for label, file_log, async_file, mode in CASES]
+        finally:
+            logging.getLogger().handlers = []
+            os.chdir(cwd)
+
+    for label, rate in results:
+        print(f'{label:36s}: {rate:12,.0f} lines/s')
+
+
+if __name__ == '__main__':
+    main()
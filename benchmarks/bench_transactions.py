@@ -0,0 +1,121 @@
+"""
+Transaction throughput and round-trip time for several max_in_flight settings.
+
+A simulated device on the master side of a pty answers every command line 'Q<n>'
+with 'R<n>' after a fixed turnaround latency. The device keeps processing new
+commands while earlier answers are still pending, as a device behind a USB
+adapter or a radio link does. With one transaction in flight, each command pays
+the full round trip; with more, the round trips overlap.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_transactions
+"""
+import argparse
+import heapq
+import os
+import select
+import threading
+import time
+
+from serial_toolbox.interface_core import serial_interface
+from serial_toolbox.transaction import TransactionEngine
+
+from .common import open_pty_pair, quiet_logger
+
+
+class Responder:
+    """
+    Answers 'Q<n>' lines with 'R<n>' lines after latency seconds, from a background thread.
+    """
+
+    def __init__(self, master_fd: int, latency: float):
+        self.master_fd = master_fd
+        self.latency = latency
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        pending = []  # Heap of (due time, response)
+        partial = b''
+        while not self.stop_flag:
+            timeout = 0.05
+            if pending:
+                timeout = max(0.0, min(timeout, pending[0][0] - time.monotonic()))
+            readable, _, _ = select.select([self.master_fd], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.master_fd, 65536)
+                except OSError:
+                    return
+                lines = (partial + data).split(b'\n')
+                partial = lines.pop()
+                due = time.monotonic() + self.latency
+                for line in lines:
+                    if line.startswith(b'Q'):
+                        heapq.heappush(pending, (due, b'R' + line[1:] + b'\n'))
+            now = time.monotonic()
+            responses = []
+            while pending and pending[0][0] <= now:
+                responses.append(heapq.heappop(pending)[1])
+            if responses:
+                os.write(self.master_fd, b''.join(responses))
+
+
+def run_case(transactions: int, max_in_flight: int, latency: float, sequence: bool) -> dict:
+    master_fd, port = open_pty_pair()
+    responder = Responder(master_fd, latency)
+    interface = serial_interface(port, terminal=False, max_queue_size=100000, logger=quiet_logger())
+    if sequence:
+        engine = TransactionEngine(interface, max_in_flight, timeout=5.0, sequence_pattern=r'^R(?P<seq>\d+)',
+                                   sequence_modulus=1000)
+    else:
+        engine = TransactionEngine(interface, max_in_flight, timeout=5.0)
+
+    start = time.perf_counter()
+    for index in range(transactions):
+        if sequence:
+            engine.request('Q{seq}')
+        else:
+            engine.request(f'Q{index}', prefix=f'R{index}')
+    engine.wait_all()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'rate': transactions / elapsed,
+        'p50': engine.rtt.percentile(50),
+        'p99': engine.rtt.percentile(99),
+        'completed': engine.completed,
+        'timeouts': engine.timeouts,
+    }
+    engine.close()
+    interface.stop_flag = True
+    interface.thread.join()
+    responder.stop_flag = True
+    responder.thread.join()
+    os.close(master_fd)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=2000, help='Transactions per case.')
+    parser.add_argument('--latency', type=float, default=0.002, help='Device turnaround time in seconds.')
+    parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 4, 16, 64], help='max_in_flight values to run.')
+    parser.add_argument('--sequence', action='store_true', help='Match responses by sequence id instead of prefix.')
+    args = parser.parse_args()
+
+    print(f'{args.transactions} transactions, {args.latency * 1e3:.1f} ms device turnaround, '
+          f"{'sequence id' if args.sequence else 'prefix'} matching")
+    baseline = None
+    for max_in_flight in args.in_flight:
+        result = run_case(args.transactions, max_in_flight, args.latency, args.sequence)
+        baseline = baseline or result['rate']
+        print(f"max_in_flight {max_in_flight:3d}: {result['rate']:9,.0f} transactions/s "
+              f"({result['rate'] / baseline:5.1f}x), RTT p50 {result['p50']:6.2f} ms, p99 {result['p99']:6.2f} ms, "
+              f"{result['completed']} completed, {result['timeouts']} timed out")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Cost of a running trigger per received batch, next to parsing the batch.
+
+Batches of numeric lines are parsed with parse_numeric_batch, as SerialMonitor does,
+and fed to a TriggerEngine in normal mode. The level trigger fires on the rising
+zero crossings of a noisy sine on channel 0; the regex trigger on one line in 1000.
+The times include assembling the captures.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_trigger
+"""
+import argparse
+import time
+
+import numpy as np
+
+from serial_toolbox.parsing import parse_numeric_batch
+from serial_toolbox.trigger import ChannelTrigger, PatternTrigger, TriggerEngine
+
+
+def make_batches(records: int, batch_size: int, channels: int) -> list:
+    rng = np.random.default_rng(0)
+    batches = []
+    for first in range(0, records, batch_size):
+        count = min(batch_size, records - first)
+        phase = (first + np.arange(count)) / 500
+        values = np.sin(phase)[:, None] + rng.normal(0, 0.01, size=(count, channels))
+        lines = [','.join(f'{value:.4f}' for value in row) for row in values]
+        for offset in range(count):
+            if (first + offset) % 1000 == 999:
+                lines[offset] = 'EVENT overflow'
+        values, numeric = parse_numeric_batch(lines)
+        batches.append((lines, values, numeric, 1e9 + first / 10000, first))
+    return batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=1_000_000, help='Records to feed.')
+    parser.add_argument('--batch-size', type=int, default=100, help='Records per batch.')
+    parser.add_argument('--channels', type=int, default=4, help='Numeric columns per record.')
+    parser.add_argument('--pre', type=int, default=500, help='Records kept before a trigger.')
+    parser.add_argument('--post', type=int, default=500, help='Records kept after a trigger.')
+    args = parser.parse_args()
+
+    batches = make_batches(args.records, args.batch_size, args.channels)
+    start = time.perf_counter()
+    for lines, _, _, _, _ in batches:
+        parse_numeric_batch(lines)
+    parse_time = (time.perf_counter() - start) / len(batches)
+
+    print(f'{args.records:,} records of {args.channels} channels in batches of {args.batch_size}, '
+          f'{args.pre} pre / {args.post} post records')
+    print(f'{"":24s} {"per batch":>10s} {"captures":>9s}')
+    print(f'{"parse_numeric_batch":24s} {parse_time * 1e6:7.1f} us')
+    for name, condition in (('level, rising edge', ChannelTrigger(0, 0.0, 'rising')),
+                            ('regex ^EVENT', PatternTrigger('^EVENT'))):
+        engine = TriggerEngine(condition, args.pre, args.post, 'normal')
+        start = time.perf_counter()
+        for lines, values, numeric, received_time, first_index in batches:
+            engine.feed(lines, values, numeric, received_time, first_index)
+        feed_time = (time.perf_counter() - start) / len(batches)
+        print(f'{name:24s} {feed_time * 1e6:7.1f} us {engine.captures:9,d}')
+
+
+if __name__ == '__main__':
+    main()
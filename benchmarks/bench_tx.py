@@ -0,0 +1,79 @@
+"""
+Send throughput of many small commands: one write() per command versus SerialWriter.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_tx
+"""
+import argparse
+import os
+import select
+import threading
+import time
+
+from serial_toolbox.tx import SerialWriter
+
+from .common import open_pty_pair
+
+
+def drain(master_fd: int, expected: int) -> threading.Thread:
+    """
+    Read and discard expected bytes from the device side in a background thread.
+    """
+    def run():
+        received = 0
+        while received < expected:
+            readable, _, _ = select.select([master_fd], [], [], 1.0)
+            if not readable:
+                return
+            received += len(os.read(master_fd, 65536))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def direct_case(commands: int, command: bytes) -> tuple:
+    master_fd, port = open_pty_pair()
+    thread = drain(master_fd, commands * len(command))
+    start = time.perf_counter()
+    for _ in range(commands):
+        port.write(command)
+    thread.join()
+    elapsed = time.perf_counter() - start
+    os.close(master_fd)
+    port.close()
+    return commands / elapsed, commands
+
+
+def writer_case(commands: int, command: bytes) -> tuple:
+    master_fd, port = open_pty_pair()
+    writer = SerialWriter(port)
+    thread = drain(master_fd, commands * len(command))
+    start = time.perf_counter()
+    for _ in range(commands):
+        writer.send(command)
+    writer.flush()
+    thread.join()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    os.close(master_fd)
+    port.close()
+    return commands / elapsed, writer.writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--commands', type=int, default=100000, help='Number of commands to send.')
+    parser.add_argument('--length', type=int, default=16, help='Command length in bytes, including the newline.')
+    args = parser.parse_args()
+
+    command = b'C' * (args.length - 1) + b'\n'
+    before, before_writes = direct_case(args.commands, command)
+    after, after_writes = writer_case(args.commands, command)
+    print(f'write() per command : {before:12,.0f} commands/s, {before_writes:8,d} write() calls')
+    print(f'SerialWriter        : {after:12,.0f} commands/s, {after_writes:8,d} write() calls ({after / before:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Shared helpers for the serial_toolbox benchmarks.
+
+The benchmarks use a pseudo-terminal pair as a stand-in for a real device: the
+benchmark writes to the master side and serial_toolbox reads from the slave side
+through a regular serial.Serial, so the OS-level read path is exercised.
+"""
+import logging
+import os
+import tty
+
+import serial
+
+
+def open_pty_pair(baudrate: int = 115200, timeout: float = 0.1):
+    """
+    Open a pseudo-terminal pair and a serial port on its slave side.
+
+    Parameters
+    ----------
+    baudrate : int, optional
+        Baudrate to configure on the slave port, by default 115200.
+    timeout : float, optional
+        Read timeout of the slave port, by default 0.1.
+
+    Returns
+    -------
+    tuple[int, serial.Serial]
+        The master file descriptor (the "device" side) and the opened slave port.
+    """
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    port = serial.Serial(os.ttyname(slave_fd), baudrate=baudrate, timeout=timeout)
+    os.close(slave_fd)
+    return master_fd, port
+
+
+def quiet_logger() -> logging.Logger:
+    """
+    Return a logger that discards records, so benchmarks do not create log files.
+
+    Returns
+    -------
+    logging.Logger
+        A logger with a NullHandler and propagation disabled.
+    """
+    logger = logging.getLogger('serial_toolbox.benchmarks')
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
@@ -0,0 +1,100 @@
+"""
+Compare two result files written by benchmarks.suite.
+
+Scenarios are matched by name. For each metric the relative change is printed and
+changes in the wrong direction larger than the threshold are flagged as regressions.
+
+Run from the repository root::
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+METRICS = [
+    # (path in the result, higher is better)
+    (('lines_per_s',), True),
+    (('bytes_per_s',), True),
+    (('latency_ms', 'p50'), False),
+    (('latency_ms', 'p90'), False),
+    (('latency_ms', 'p99'), False),
+    (('drops', 'queue_dropped'), False),
+    (('drops', 'lost'), False),
+    (('drops', 'device_behind'), False),
+    (('cpu_percent', 'reader'), False),
+    (('cpu_percent', 'consumer'), False),
+    (('cpu_percent', 'display'), False),
+    (('cpu_percent', 'process'), False),
+    (('plot_ms_mean',), False),
+]
+
+
+def load_results(path: str) -> tuple:
+    with open(path) as file:
+        data = json.load(file)
+    return data.get('environment', {}), {result['scenario']: result for result in data['results']}
+
+
+def lookup(result: dict, path: tuple):
+    for key in path:
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def _device_params(result: dict) -> dict:
+    """
+    Parameters that change what is measured; the duration only changes its precision.
+    """
+    return {key: value for key, value in result.get('params', {}).items() if key != 'duration'}
+
+
+def compare(before: dict, after: dict, threshold: float) -> list:
+    """
+    Print the metric changes of the scenarios present in both result sets and return the regressions.
+    """
+    regressions = []
+    for scenario in before:
+        if scenario not in after:
+            continue
+        if _device_params(before[scenario]) != _device_params(after[scenario]):
+            print(f'{scenario}: parameters differ, results may not be comparable')
+        print(f'\n{scenario}')
+        for path, higher_is_better in METRICS:
+            old, new = lookup(before[scenario], path), lookup(after[scenario], path)
+            if old is None or new is None:
+                continue
+            name = '.'.join(path)
+            if old:
+                change = 100 * (new - old) / abs(old)
+            else:
+                change = 0.0 if new == old else float('inf')
+            worse = change < -threshold if higher_is_better else change > threshold
+            marker = '  REGRESSION' if worse else ''
+            print(f'  {name:26s} {old:14,.2f} -> {new:14,.2f}  {change:+8.1f}%{marker}')
+            if worse:
+                regressions.append((scenario, name, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('before', help='Baseline result file.')
+    parser.add_argument('after', help='Result file to compare.')
+    parser.add_argument('--threshold', type=float, default=5.0, help='Relative change in percent flagged as a regression.')
+    parser.add_argument('--fail', action='store_true', help='Exit with status 1 if there are regressions.')
+    args = parser.parse_args()
+
+    before_environment, before = load_results(args.before)
+    after_environment, after = load_results(args.after)
+    print(f"before: {before_environment.get('commit')} {before_environment.get('time')}")
+    print(f"after : {after_environment.get('commit')} {after_environment.get('time')}")
+
+    regressions = compare(before, after, args.threshold)
+    print(f'\n{len(regressions)} regression(s) above {args.threshold:g}%')
+    if regressions and args.fail:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Synthetic serial device writing numbered frames to the master side of a pty.
+
+Text frames are comma-separated lines whose first column is the sequence number,
+e.g. ``00000042,0.841,-0.544,...``. Binary frames are length-prefixed (one byte)
+payloads made of the sequence number as a little-endian uint32 followed by float32
+channel values. The send time of every frame is kept by sequence number, so a
+consumer can compute end-to-end latency from the frames it receives.
+"""
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+_POOL_SIZE = 1024
+_SEQUENCE = struct.Struct('<I')
+
+
+class SyntheticDevice:
+    """
+    Writes frames at a fixed rate from a background thread.
+
+    Frames due since the last tick are written together every millisecond. If the
+    reader does not keep up, the pty buffer fills, writes block and the device falls
+    behind its target rate; lines_behind reports by how much.
+
+    Attributes
+    ----------
+    rate : float
+        Target frames per second, 0 for as fast as the reader accepts them.
+    line_length : int
+        Approximate text line length in bytes, newline included.
+    channels : int
+        Number of columns per frame, the sequence number included.
+    binary : bool
+        If True, write length-prefixed binary frames instead of text lines.
+    lines_sent : int
+        Number of frames written.
+    bytes_sent : int
+        Number of bytes written.
+    lines_behind : int
+        Frames that were due at the end of the run but had not been written.
+    send_times : numpy.ndarray
+        time.monotonic() at which each frame was handed to the pty, by sequence number.
+    """
+
+    def __init__(self, master_fd: int, rate: float = 1000, line_length: int = 32, channels: int = 4,
+                 binary: bool = False, max_lines: int = 10000000):
+        """
+        Parameters
+        ----------
+        master_fd : int
+            Master side of the pty pair.
+        rate : float, optional
+            Target frames per second, 0 for unthrottled, by default 1000.
+        line_length : int, optional
+            Approximate text line length in bytes, by default 32.
+        channels : int, optional
+            Number of columns per frame including the sequence number, by default 4.
+        binary : bool, optional
+            Write binary frames, by default False.
+        max_lines : int, optional
+            Maximum number of frames to write, by default 10,000,000.
+        """
+        if channels < 1:
+            raise ValueError('channels must include the sequence number column')
+        self.master_fd = master_fd
+        self.rate = rate
+        self.line_length = line_length
+        self.channels = channels
+        self.binary = binary
+        self.max_lines = max_lines
+        self.lines_sent = 0
+        self.bytes_sent = 0
+        self.lines_behind = 0
+        self.send_times = np.zeros(max_lines)
+
+        self._bodies = self._make_bodies()
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join()
+
+    def frame(self, sequence: int) -> bytes:
+        """
+        Return the encoded frame with the given sequence number.
+        """
+        body = self._bodies[sequence % _POOL_SIZE]
+        if self.binary:
+            payload = _SEQUENCE.pack(sequence) + body
+            return bytes((len(payload),)) + payload
+        return b'%08d%s\n' % (sequence, body)
+
+    def _make_bodies(self) -> list:
+        """
+        Precompute the channel values of _POOL_SIZE frames, so writing does not format numbers.
+        """
+        phases = np.linspace(0, 2 * np.pi, _POOL_SIZE, endpoint=False)
+        columns = self.channels - 1
+        values = np.sin(phases[:, None] + np.arange(columns)[None, :]).astype(np.float32)
+        if self.binary:
+            return [row.tobytes() for row in values]
+
+        bodies = []
+        for row in values:
+            body = ''.join(f',{value:.3f}' for value in row)
+            missing = self.line_length - 9 - len(body)  # sequence number and newline
+            if missing > 0 and columns:
+                body += '0' * missing  # More decimals keep the value unchanged
+            bodies.append(body.encode())
+        return bodies
+
+    def _run(self):
+        started = time.monotonic()
+        while not self._stop.is_set() and self.lines_sent < self.max_lines:
+            if self.rate:
+                due = int((time.monotonic() - started) * self.rate) - self.lines_sent
+                if due <= 0:
+                    time.sleep(0.001)
+                    continue
+                count = min(due, max(1, int(self.rate * 0.01)), self.max_lines - self.lines_sent)
+            else:
+                count = min(256, self.max_lines - self.lines_sent)
+
+            first = self.lines_sent
+            chunk = b''.join([self.frame(sequence) for sequence in range(first, first + count)])
+            self.send_times[first:first + count] = time.monotonic()
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(self.master_fd, view):]
+            self.lines_sent += count
+            self.bytes_sent += len(chunk)
+
+        if self.rate:
+            due = int((time.monotonic() - started) * self.rate)
+            self.lines_behind = max(0, due - self.lines_sent)
@@ -0,0 +1,272 @@
+"""
+Throughput and latency benchmark suite for the read/parse/display pipeline.
+
+Each scenario connects a synthetic device (see benchmarks.device) to serial_interface
+through a pty and runs the same stages as SerialMonitor, headless:
+
+    reader    serial_interface.read_from_port (framing, data_queue)
+    consumer  data_queue.get_many, parse_numeric_batch, TraceBuffer, TerminalOutput
+              (SerialMonitor.rxd_update / update_rxd_batch)
+    display   TerminalOutput.drain to /dev/null and TracePlot.update with the Agg
+              backend every 100 ms (SerialMonitor.print_rxd / update_plot)
+
+It reports sustained lines/s and bytes/s, receive-to-display latency percentiles,
+drops at each stage and CPU time per stage, and writes everything as JSON. Compare
+two result files with benchmarks.compare.
+
+Run from the repository root::
+
+    python -m benchmarks.suite -o before.json
+    python -m benchmarks.suite --scenario text-fast --duration 10 -o after.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from serial_toolbox.framing import LengthPrefixedFramer
+from serial_toolbox.interface_core import serial_interface
+from serial_toolbox.output import TerminalOutput
+from serial_toolbox.parsing import parse_numeric_batch
+from serial_toolbox.trace_buffer import TraceBuffer
+
+from .common import open_pty_pair, quiet_logger
+from .device import SyntheticDevice
+
+SCENARIOS = {
+    'text-slow': dict(rate=1000, line_length=32, channels=4, binary=False),
+    'text-fast': dict(rate=20000, line_length=32, channels=4, binary=False),
+    'text-wide': dict(rate=5000, line_length=160, channels=16, binary=False),
+    'text-flood': dict(rate=0, line_length=32, channels=4, binary=False),
+    'binary-fast': dict(rate=20000, line_length=0, channels=8, binary=True),
+}
+"""Default scenarios: device parameters by name."""
+
+DISPLAY_INTERVAL = 0.1
+
+
+def thread_cpu_time(thread: threading.Thread) -> float:
+    """
+    Return the CPU time in seconds consumed so far by a running thread (Linux).
+    """
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+
+def run_scenario(name: str, rate: float, line_length: int, channels: int, binary: bool,
+                 duration: float = 5.0, window_size: int = 200, max_queue_size: int = 1000,
+                 print_numbers: bool = False, plot: bool = True) -> dict:
+    """
+    Run one scenario and return its measurements.
+    """
+    master_fd, port = open_pty_pair(timeout=0)
+    max_lines = int(rate * duration * 1.5) + 1000 if rate else 20000000
+    device = SyntheticDevice(master_fd, rate, line_length, channels, binary, max_lines)
+
+    if binary:
+        interface = serial_interface(port, terminal=False, format='HEX', logger=quiet_logger(),
+                                     max_queue_size=max_queue_size, framer=LengthPrefixedFramer(prefix_size=1))
+    else:
+        interface = serial_interface(port, terminal=False, format='STR', logger=quiet_logger(),
+                                     max_queue_size=max_queue_size)
+
+    traces = TraceBuffer(window_size)
+    output = TerminalOutput()
+    data_lock = threading.Lock()
+    pending_sequences = []
+    received = [0, 0]  # lines, bytes
+    running = threading.Event()
+    running.set()
+
+    def consumer():
+        while running.is_set():
+            records = interface.data_queue.get_many(timeout=0.1)
+            if not records:
+                continue
+            if binary:
+                frames = [record['data'] for record in records]
+                sequences = np.frombuffer(b''.join(frame[:4] for frame in frames), dtype='<u4')
+                output.put_many(['RXD: 0x' + frame.hex() for frame in frames])
+                size = sum(map(len, frames)) + len(frames)
+            else:
+                lines = [record['data'] for record in records]
+                values, numeric = parse_numeric_batch(lines)
+                if len(values):
+                    with data_lock:
+                        traces.extend(values[:, 1:])
+                if print_numbers:
+                    output.put_many(['RXD: ' + line for line in lines])
+                else:
+                    output.put_many(['RXD: ' + line for line, is_numeric in zip(lines, numeric) if not is_numeric])
+                sequences = values[:, 0].astype(np.int64) if len(values) else np.empty(0, dtype=np.int64)
+                size = sum(map(len, lines)) + len(lines)
+            with data_lock:
+                pending_sequences.append(sequences)
+                received[0] += len(records)
+                received[1] += size
+
+    plotter = None
+    if plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        from serial_toolbox.plotting import TracePlot
+        figure, ax = plt.subplots()
+        plotter = TracePlot(figure, ax, window_size)
+        figure.canvas.draw()
+
+    consumer_thread = threading.Thread(target=consumer, daemon=True)
+    consumer_thread.start()
+    latencies = []
+    display_cpu = 0.0
+    plot_time = []
+
+    started = time.monotonic()
+    process_cpu = time.process_time()
+    device.start()
+    with open(os.devnull, 'w') as sink:
+        while time.monotonic() - started < duration:
+            time.sleep(DISPLAY_INTERVAL)
+            tick_cpu = time.thread_time()
+            sink.write(output.drain())
+            with data_lock:
+                sequences = pending_sequences[:]
+                pending_sequences.clear()
+                snapshot = traces.snapshot()
+            displayed = time.monotonic()
+            if sequences:
+                latencies.append(displayed - device.send_times[np.concatenate(sequences)])
+            if plotter is not None:
+                plot_started = time.perf_counter()
+                plotter.update(snapshot)
+                plot_time.append(time.perf_counter() - plot_started)
+            display_cpu += time.thread_time() - tick_cpu
+
+    reader_cpu = thread_cpu_time(interface.thread)
+    consumer_cpu = thread_cpu_time(consumer_thread)
+    device_cpu = thread_cpu_time(device.thread)
+    device.stop()
+    elapsed = time.monotonic() - started
+    process_cpu = time.process_time() - process_cpu
+
+    # Let the pipeline drain before counting losses
+    deadline = time.monotonic() + 2.0
+    while received[0] + interface.data_queue.dropped < device.lines_sent and time.monotonic() < deadline:
+        time.sleep(0.05)
+    running.clear()
+    consumer_thread.join()
+    interface.stop_flag = True
+    interface.thread.join(timeout=1.0)
+    os.close(master_fd)
+    if plotter is not None:
+        plt.close(figure)
+
+    latency = np.concatenate(latencies) * 1e3 if latencies else np.zeros(1)
+    return {
+        'scenario': name,
+        'params': {
+            'rate': rate, 'line_length': line_length, 'channels': channels, 'binary': binary,
+            'duration': duration, 'window_size': window_size, 'max_queue_size': max_queue_size,
+            'print_numbers': print_numbers, 'plot': plot,
+        },
+        'lines_sent': device.lines_sent,
+        'lines_received': received[0],
+        'lines_per_s': received[0] / elapsed,
+        'bytes_per_s': received[1] / elapsed,
+        'latency_ms': {
+            'p50': float(np.percentile(latency, 50)),
+            'p90': float(np.percentile(latency, 90)),
+            'p99': float(np.percentile(latency, 99)),
+            'max': float(latency.max()),
+        },
+        'drops': {
+            'device_behind': device.lines_behind,
+            'queue_dropped': interface.data_queue.dropped,
+            'lost': device.lines_sent - received[0] - interface.data_queue.dropped,
+            'display_suppressed': output.suppressed,
+        },
+        'cpu_percent': {
+            'device': 100 * device_cpu / elapsed,
+            'reader': 100 * reader_cpu / elapsed,
+            'consumer': 100 * consumer_cpu / elapsed,
+            'display': 100 * display_cpu / elapsed,
+            'process': 100 * process_cpu / elapsed,
+        },
+        'plot_ms_mean': 1e3 * float(np.mean(plot_time)) if plot_time else 0.0,
+    }
+
+
+def environment() -> dict:
+    """
+    Describe the machine and the commit the results were taken on.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+
+
+def print_result(result: dict):
+    latency = result['latency_ms']
+    drops = result['drops']
+    cpu = result['cpu_percent']
+    print(f"{result['scenario']:12s} {result['lines_per_s']:10,.0f} lines/s {result['bytes_per_s'] / 1e3:9,.1f} kB/s  "
+          f"latency p50 {latency['p50']:6.1f} p99 {latency['p99']:6.1f} ms  "
+          f"dropped {drops['queue_dropped']:,d} lost {drops['lost']:,d} behind {drops['device_behind']:,d}  "
+          f"cpu reader {cpu['reader']:5.1f}% consumer {cpu['consumer']:5.1f}% display {cpu['display']:5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run, repeatable. Defaults to all.')
+    parser.add_argument('--custom', action='store_true', help='Run one scenario from --rate, --line-length, '
+                                                               '--channels and --binary instead.')
+    parser.add_argument('--rate', type=float, default=1000, help='Custom: lines per second, 0 for unthrottled.')
+    parser.add_argument('--line-length', type=int, default=32, help='Custom: text line length in bytes.')
+    parser.add_argument('--channels', type=int, default=4, help='Custom: columns per line.')
+    parser.add_argument('--binary', action='store_true', help='Custom: binary length-prefixed frames.')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per scenario.')
+    parser.add_argument('--window-size', type=int, default=200, help='Plot window size.')
+    parser.add_argument('--max-queue-size', type=int, default=1000, help='data_queue size.')
+    parser.add_argument('--print-numbers', action='store_true', help='Print numeric lines too.')
+    parser.add_argument('--no-plot', action='store_true', help='Skip the plot stage.')
+    parser.add_argument('-o', '--output', help='Write results to this JSON file.')
+    args = parser.parse_args()
+
+    if args.custom:
+        scenarios = {'custom': dict(rate=args.rate, line_length=args.line_length, channels=args.channels,
+                                    binary=args.binary)}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+
+    results = []
+    for name, device in scenarios.items():
+        result = run_scenario(name, **device, duration=args.duration, window_size=args.window_size,
+                              max_queue_size=args.max_queue_size, print_numbers=args.print_numbers,
+                              plot=not args.no_plot)
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'environment': environment(), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,10 @@
-from serial_toolbox.cli import main
+def __getattr__(name):
+    # The CLI pulls in click; import it only when serial_toolbox.main is used
+    if name == 'main':
+        from serial_toolbox.cli import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from serial_toolbox.cli import main
+    main()
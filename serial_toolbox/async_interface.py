@@ -0,0 +1,268 @@
+"""
+asyncio-native serial interface driven by the event loop, without threads.
+"""
+import asyncio
+import errno
+import logging
+import os
+import time
+
+from .framing import LineFramer
+
+
+class AsyncSerialInterface:
+    """
+    Reads from and writes to a serial port from an asyncio event loop.
+
+    The port's file descriptor is registered with loop.add_reader() and
+    loop.add_writer(), so no extra threads are used. This requires a port with a
+    file descriptor (POSIX serial ports and pseudo-terminals).
+
+    Received data is framed into records with the same layout as
+    serial_interface: dicts with 'index', 'time' and 'data'.
+
+    Examples
+    --------
+    >>> async with AsyncSerialInterface(port) as iface:
+    ...     await iface.write('PING')
+    ...     reply = await iface.readline(timeout=1.0)
+    ...     async for record in iface:
+    ...         print(record['data'])
+
+    Attributes
+    ----------
+    serial_port : serial.Serial
+        The opened serial port.
+    format : str
+        Data format, 'STR' or 'HEX'.
+    framer : framing.Framer
+        Incremental framer splitting received chunks into records.
+    data_index : int
+        A counter for received records.
+    max_queue_size : int
+        Maximum number of unread records. Older records are discarded when it is reached.
+    dropped : int
+        Number of records discarded because the queue was full.
+    write_buffer_limit : int
+        Number of buffered outgoing bytes above which write() waits for the port to drain.
+    """
+
+    def __init__(self, serial_port, format: str = 'STR', framer=None, max_queue_size: int = 100,
+                 write_buffer_limit: int = 65536):
+        """
+        Parameters
+        ----------
+        serial_port : serial.Serial
+            The opened serial port.
+        format : str, optional
+            Data format, 'STR' or 'HEX', by default 'STR'.
+        framer : framing.Framer, optional
+            Framer splitting received chunks into records. Defaults to newline-terminated
+            records, with the newline kept in HEX format.
+        max_queue_size : int, optional
+            Maximum number of unread records, by default 100.
+        write_buffer_limit : int, optional
+            High-water mark for buffered outgoing bytes, by default 65536.
+        """
+        if framer is None:
+            framer = LineFramer(keep_delimiter=(format == 'HEX'))
+        self.serial_port = serial_port
+        self.format = format
+        self.framer = framer
+        self.data_index = 0
+        self.max_queue_size = max_queue_size
+        self.dropped = 0
+        self.write_buffer_limit = write_buffer_limit
+
+        self._fd = serial_port.fileno()
+        self._loop = None
+        self._records = asyncio.Queue()
+        self._write_buffer = bytearray()
+        self._drain_waiter = None
+        self._exception = None
+        self._closed = False
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        record = await self._records.get()
+        if record is None:
+            self._records.put_nowait(None)  # Keep the end marker for other readers
+            if self._exception is not None:
+                raise self._exception
+            raise StopAsyncIteration
+        return record
+
+    def start(self):
+        """
+        Register the port with the running event loop and start receiving.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def close(self):
+        """
+        Stop receiving, unregister the port and close it.
+
+        Iteration ends once the records received before closing have been consumed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._loop is not None:
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+        self._wake_drain_waiter()
+        self._put_record(None)
+        self.serial_port.close()
+
+    async def readline(self, timeout: float = None):
+        """
+        Wait for the next record and return its data.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds, by default None (wait forever).
+
+        Returns
+        -------
+        str or bytes
+            The record data: a stripped line in STR format, raw bytes in HEX format.
+
+        Raises
+        ------
+        TimeoutError
+            If no record arrived within timeout.
+        EOFError
+            If the interface was closed.
+        """
+        try:
+            record = await asyncio.wait_for(self.__anext__(), timeout)
+        except StopAsyncIteration:
+            raise EOFError('serial interface closed') from None
+        except asyncio.TimeoutError:
+            # Before Python 3.11, asyncio.TimeoutError is not the builtin TimeoutError
+            raise TimeoutError(f'no record within {timeout} s') from None
+        return record['data']
+
+    async def write(self, data):
+        """
+        Write data to the port, waiting while the outgoing buffer is above write_buffer_limit.
+
+        Parameters
+        ----------
+        data : str or bytes
+            In STR format a str is sent with a trailing newline; in HEX format a str is parsed
+            as hexadecimal. bytes are sent unchanged.
+        """
+        if isinstance(data, str):
+            if self.format == 'HEX':
+                data = bytes.fromhex(data)
+            else:
+                data = (data + '\n').encode()
+        self._send(data)
+        await self.drain()
+
+    async def drain(self):
+        """
+        Wait until the outgoing buffer is at or below write_buffer_limit.
+        """
+        if self._exception is not None:
+            raise self._exception
+        if len(self._write_buffer) <= self.write_buffer_limit or self._closed:
+            return
+        if self._drain_waiter is None:
+            self._drain_waiter = self._loop.create_future()
+        await self._drain_waiter
+
+    @property
+    def write_buffer_size(self) -> int:
+        """
+        Number of bytes waiting to be written to the port.
+        """
+        return len(self._write_buffer)
+
+    def _send(self, data: bytes):
+        """
+        Write as much as possible immediately and buffer the rest.
+        """
+        if self._closed:
+            raise ConnectionError('serial interface closed')
+        if not self._write_buffer:
+            try:
+                written = os.write(self._fd, data)
+            except BlockingIOError:
+                written = 0
+            data = data[written:]
+            if not data:
+                return
+            self._loop.add_writer(self._fd, self._on_writable)
+        self._write_buffer += data
+
+    def _on_writable(self):
+        try:
+            written = os.write(self._fd, self._write_buffer)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+        del self._write_buffer[:written]
+        if not self._write_buffer:
+            self._loop.remove_writer(self._fd)
+        if len(self._write_buffer) <= self.write_buffer_limit:
+            self._wake_drain_waiter()
+
+    def _on_readable(self):
+        try:
+            chunk = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # A pseudo-terminal whose other side closed reports EIO.
+            if e.errno == errno.EIO:
+                self.close()
+            else:
+                self._fail(e)
+            return
+        if not chunk:
+            self.close()
+            return
+
+        frames = self.framer.feed(chunk)
+        if not frames:
+            return
+        if self.format == 'STR':
+            frames = [frame.decode('utf-8', 'replace').strip() for frame in frames]
+        received_time = time.time()
+        for data in frames:
+            self._put_record({'index': self.data_index, 'time': received_time, 'data': data})
+            self.data_index += 1
+
+    def _put_record(self, record):
+        if self._records.qsize() >= self.max_queue_size:
+            self._records.get_nowait()
+            self.dropped += 1
+        self._records.put_nowait(record)
+
+    def _wake_drain_waiter(self):
+        waiter, self._drain_waiter = self._drain_waiter, None
+        if waiter is not None and not waiter.done():
+            if self._exception is not None:
+                waiter.set_exception(self._exception)
+            else:
+                waiter.set_result(None)
+
+    def _fail(self, exception):
+        logging.error('Serial port error: %s', exception)
+        self._exception = exception
+        self.close()
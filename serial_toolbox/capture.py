@@ -0,0 +1,444 @@
+"""
+Append-only binary capture files of serial traffic.
+
+A capture file starts with a file header and is followed by blocks. Each block
+holds a batch of timestamped records, optionally compressed with zlib::
+
+    file header   magic (8 bytes), version (uint32), reserved (4 bytes)
+    block header  magic (4 bytes), flags (uint8), 3 reserved bytes,
+                  stored size, raw size, record count (uint32 each),
+                  first and last timestamp (float64 each)
+    block payload records, zlib-compressed if flags has BLOCK_COMPRESSED
+    record        timestamp (float64), sequence number (uint64),
+                  direction (uint8), 3 reserved bytes, size (uint32), data
+
+A sparse index with one entry per block (first and last timestamp, file offset,
+record count) is appended to a side file with the '.idx' suffix. A reader uses it
+to jump to a time range without touching the blocks before it; if the index is
+missing it is rebuilt from the block headers alone. All integers are little-endian.
+"""
+import bisect
+import collections
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+FILE_MAGIC = b'STCAPTUR'
+FILE_VERSION = 1
+BLOCK_MAGIC = b'BLK1'
+BLOCK_COMPRESSED = 0x01
+
+RX = 0
+"""Direction of received data."""
+TX = 1
+"""Direction of sent data."""
+
+_FILE_HEADER = struct.Struct('<8sI4x')
+_BLOCK_HEADER = struct.Struct('<4sB3xIIIdd')
+_RECORD_HEADER = struct.Struct('<dQB3xI')
+_INDEX_ENTRY = struct.Struct('<ddQI4x')
+
+CaptureRecord = collections.namedtuple('CaptureRecord', ['time', 'index', 'direction', 'data'])
+"""A record read back from a capture file."""
+
+
+def index_path(path: str) -> str:
+    """
+    Return the path of the sparse index file belonging to a capture file.
+    """
+    return path + '.idx'
+
+
+class CaptureWriter:
+    """
+    Writes timestamped records to a capture file from a background thread.
+
+    write() only appends the record to the current block in memory, so it is cheap
+    enough to call from a reader thread. Full blocks, and partial blocks every
+    flush_interval, are handed to a writer thread that encodes, compresses and
+    appends them. If the disk cannot keep up, at most max_pending_blocks blocks are
+    queued and further blocks are dropped and counted in dropped_blocks.
+
+    Attributes
+    ----------
+    path : str
+        Path of the capture file.
+    compress : bool
+        If True, blocks are compressed with zlib.
+    block_size : int
+        Number of payload bytes after which a block is written.
+    flush_interval : float
+        Maximum time in seconds a record stays in memory before it is written.
+    records_written : int
+        Number of records written to the file.
+    bytes_written : int
+        Number of bytes written to the file, headers included.
+    dropped_blocks : int
+        Number of blocks dropped because the writer thread fell behind or writing failed.
+    error : Exception
+        The error that stopped writing, or None.
+    """
+
+    def __init__(self, path: str, compress: bool = False, block_size: int = 1 << 20, flush_interval: float = 1.0,
+                 max_pending_blocks: int = 64, compression_level: int = 1):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the capture file. An existing capture is appended to.
+        compress : bool, optional
+            If True, blocks are compressed with zlib, by default False.
+        block_size : int, optional
+            Number of payload bytes after which a block is written, by default 1 MiB.
+        flush_interval : float, optional
+            Maximum time in seconds a record stays in memory, by default 1.0.
+        max_pending_blocks : int, optional
+            Maximum number of blocks waiting for the writer thread, by default 64.
+        compression_level : int, optional
+            zlib compression level, by default 1 (fastest).
+        """
+        self.path = path
+        self.compress = compress
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.compression_level = compression_level
+        self.records_written = 0
+        self.bytes_written = 0
+        self.dropped_blocks = 0
+        self.error = None
+
+        sequence = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with CaptureReader(path) as existing:
+                sequence = existing.record_count
+                entries = existing.index_entries
+                end = existing.end_offset
+                rebuild_index = not existing.index_loaded
+            os.truncate(path, end)  # Drop a block left incomplete by a crash
+            if rebuild_index:
+                with open(index_path(path), 'wb') as index:
+                    index.writelines(_INDEX_ENTRY.pack(*entry) for entry in entries)
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION))
+            self._index = open(index_path(path), 'wb')
+        else:
+            self._index = open(index_path(path), 'ab')
+        self._offset = self._file.tell()
+
+        self._lock = threading.Lock()
+        self._records = []
+        self._record_bytes = 0
+        self._sequence = sequence
+        self._blocks = queue.Queue(max_pending_blocks)
+        self._closed = False
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, data: bytes, timestamp: float = None, direction: int = RX):
+        """
+        Add one record.
+
+        Parameters
+        ----------
+        data : bytes
+            The raw bytes, e.g. a chunk read from the serial port.
+        timestamp : float, optional
+            Time of the record as returned by time.time(), by default now.
+        direction : int, optional
+            RX or TX, by default RX.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._records.append((timestamp, self._sequence, direction, data))
+            self._sequence += 1
+            self._record_bytes += len(data) + _RECORD_HEADER.size
+            if self._record_bytes >= self.block_size:
+                self._hand_off()
+
+    def flush(self):
+        """
+        Hand the records collected so far to the writer thread.
+        """
+        with self._lock:
+            self._hand_off()
+
+    def close(self):
+        """
+        Write all remaining records and close the file.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        # Wakes the writer thread and tells it to finish; it may have died on an error
+        while self.thread.is_alive():
+            try:
+                self._blocks.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        try:
+            self._file.close()
+            self._index.close()
+        except OSError:
+            if self.error is None:
+                raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _hand_off(self):
+        """
+        Queue the current block for the writer thread. The caller holds the lock.
+        """
+        if self._records:
+            try:
+                self._blocks.put_nowait(self._records)
+            except queue.Full:
+                self.dropped_blocks += 1
+            self._records = []
+            self._record_bytes = 0
+
+    def _run(self):
+        while True:
+            try:
+                records = self._blocks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.flush()
+                continue
+            if records is None:
+                return
+            if self.error is not None:
+                self.dropped_blocks += 1
+                continue
+            try:
+                self._write_block(records)
+                if self._blocks.empty():
+                    self._file.flush()
+                    self._index.flush()
+            except Exception as e:
+                logging.error('Capture to %s stopped: %s', self.path, e)
+                self.error = e
+                self.dropped_blocks += 1
+
+    def _write_block(self, records):
+        parts = []
+        for timestamp, sequence, direction, data in records:
+            parts.append(_RECORD_HEADER.pack(timestamp, sequence, direction, len(data)))
+            parts.append(data)
+        payload = b''.join(parts)
+        raw_size = len(payload)
+
+        flags = 0
+        if self.compress:
+            payload = zlib.compress(payload, self.compression_level)
+            flags |= BLOCK_COMPRESSED
+
+        first_time = records[0][0]
+        last_time = max(record[0] for record in records)
+        header = _BLOCK_HEADER.pack(BLOCK_MAGIC, flags, len(payload), raw_size, len(records), first_time, last_time)
+        self._file.write(header)
+        self._file.write(payload)
+        self._index.write(_INDEX_ENTRY.pack(first_time, last_time, self._offset, len(records)))
+
+        self._offset += len(header) + len(payload)
+        self.records_written += len(records)
+        self.bytes_written += len(header) + len(payload)
+
+
+class CaptureReader:
+    """
+    Reads a capture file through mmap.
+
+    Only the sparse index is loaded up front; blocks are decoded when a time range
+    that overlaps them is requested.
+
+    Attributes
+    ----------
+    path : str
+        Path of the capture file.
+    block_offsets : list[int]
+        File offset of each block.
+    block_first_times : list[float]
+        First timestamp of each block.
+    block_last_times : list[float]
+        Running maximum of the last timestamp of each block, used for binary search.
+    record_count : int
+        Number of records in the file.
+    index_entries : list[tuple]
+        Sparse index: first and last timestamp, file offset and record count of each block.
+    index_loaded : bool
+        True if the index was read from the index file, False if it was rebuilt from the blocks.
+    end_offset : int
+        End of the last complete block.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the capture file.
+        """
+        self.path = path
+        _check_file_header(path)
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        entries = self._read_index()
+        self.index_loaded = entries is not None
+        if entries is None:
+            entries = self._scan_blocks()
+        self.index_entries = entries
+        self.end_offset = _FILE_HEADER.size
+        if entries:
+            self.end_offset = entries[-1][2] + _BLOCK_HEADER.size + _BLOCK_HEADER.unpack_from(self._map, entries[-1][2])[2]
+        self.block_first_times = [entry[0] for entry in entries]
+        self.block_last_times = []
+        latest = float('-inf')
+        for entry in entries:
+            latest = max(latest, entry[1])
+            self.block_last_times.append(latest)
+        self.block_offsets = [entry[2] for entry in entries]
+        self.record_count = sum(entry[3] for entry in entries)
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        return self.records()
+
+    def close(self):
+        """
+        Release the memory map and close the file.
+        """
+        self._map.close()
+        self._file.close()
+
+    @property
+    def time_range(self) -> tuple:
+        """
+        First and last timestamp in the capture, or (None, None) if it is empty.
+        """
+        if not self.block_offsets:
+            return None, None
+        return self.block_first_times[0], self.block_last_times[-1]
+
+    def records(self, start_time: float = None, end_time: float = None, direction: int = None):
+        """
+        Iterate over the records with start_time <= time <= end_time.
+
+        Parameters
+        ----------
+        start_time : float, optional
+            Earliest timestamp, by default None (from the beginning).
+        end_time : float, optional
+            Latest timestamp, by default None (to the end).
+        direction : int, optional
+            Only return RX or TX records, by default None (both).
+
+        Yields
+        ------
+        CaptureRecord
+            The records in file order.
+        """
+        first = 0 if start_time is None else bisect.bisect_left(self.block_last_times, start_time)
+        for block in range(first, len(self.block_offsets)):
+            if end_time is not None and self.block_first_times[block] > end_time:
+                # Timestamps are recorded in arrival order, so later blocks start later still
+                break
+            for record in self._decode_block(self.block_offsets[block]):
+                if start_time is not None and record.time < start_time:
+                    continue
+                if end_time is not None and record.time > end_time:
+                    continue
+                if direction is not None and record.direction != direction:
+                    continue
+                yield record
+
+    def _decode_block(self, offset: int):
+        magic, flags, stored_size, raw_size, count, _, _ = _BLOCK_HEADER.unpack_from(self._map, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f'{self.path}: no block at offset {offset}')
+        start = offset + _BLOCK_HEADER.size
+        payload = memoryview(self._map)[start:start + stored_size]
+        if flags & BLOCK_COMPRESSED:
+            payload = memoryview(zlib.decompress(payload, bufsize=raw_size))
+
+        position = 0
+        header_size = _RECORD_HEADER.size
+        for _ in range(count):
+            timestamp, sequence, direction, size = _RECORD_HEADER.unpack_from(payload, position)
+            position += header_size
+            yield CaptureRecord(timestamp, sequence, direction, bytes(payload[position:position + size]))
+            position += size
+
+    def _read_index(self):
+        """
+        Load the sparse index, or return None if it is missing or does not match the file.
+        """
+        try:
+            with open(index_path(self.path), 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        entries = [_INDEX_ENTRY.unpack_from(data, position)
+                   for position in range(0, len(data) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size)]
+        # Cheap consistency check: the index must start at the first block and end at the end of the file
+        if entries:
+            last_offset = entries[-1][2]
+            if entries[0][2] != _FILE_HEADER.size or last_offset + _BLOCK_HEADER.size > len(self._map):
+                return None
+            magic, _, stored_size, _, _, _, _ = _BLOCK_HEADER.unpack_from(self._map, last_offset)
+            if magic != BLOCK_MAGIC or last_offset + _BLOCK_HEADER.size + stored_size != len(self._map):
+                return None
+        elif len(self._map) > _FILE_HEADER.size:
+            return None
+        return entries
+
+    def _scan_blocks(self):
+        """
+        Rebuild the index by walking the block headers, skipping over the payloads.
+        """
+        entries = []
+        offset = _FILE_HEADER.size
+        size = len(self._map)
+        while offset + _BLOCK_HEADER.size <= size:
+            magic, _, stored_size, _, count, first_time, last_time = _BLOCK_HEADER.unpack_from(self._map, offset)
+            end = offset + _BLOCK_HEADER.size + stored_size
+            if magic != BLOCK_MAGIC or end > size:
+                break  # Truncated last block, e.g. after a crash
+            entries.append((first_time, last_time, offset, count))
+            offset = end
+        return entries
+
+
+def _check_file_header(path: str):
+    """
+    Raise ValueError if path is not a capture file of a supported version.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(_FILE_HEADER.size)
+    if len(header) < _FILE_HEADER.size:
+        raise ValueError(f'{path}: not a capture file')
+    magic, version = _FILE_HEADER.unpack(header)
+    if magic != FILE_MAGIC or version != FILE_VERSION:
+        raise ValueError(f'{path}: not a capture file of version {FILE_VERSION}')
@@ -1,5 +1,4 @@
 import click
-from serial_toolbox.ui import serial_monitor
 
 @click.group()
 def main():
@@ -10,12 +9,88 @@ def main():
     --------
     To run the serial monitor:
     $ sertools monitor -c path/to/config.yaml
+
+    To replay a recorded capture at twice the original speed:
+    $ sertools monitor -c path/to/config.yaml --replay session.cap --speed 2
+
+    To record a port for an hour, or pipe it to another program:
+    $ sertools record -p /dev/ttyUSB0 -b 921600 --duration 3600 session.cap
+    $ sertools stream -c path/to/config.yaml | grep ERROR
     """
     pass
 
+def headless_options(function):
+    """
+    Add the port and limit options shared by the headless commands.
+    """
+    options = [
+        click.option('-p', '--port', default=None, help='Serial port device. Defaults to port in the configuration file.'),
+        click.option('-b', '--baudrate', type=int, default=None, help='Baudrate. Defaults to the configuration file, else 9600.'),
+        click.option('-c', '--config', type=click.Path(exists=True), default=None, help='Path to the configuration file.'),
+        click.option('--duration', type=float, default=None, help='Stop after this many seconds.'),
+        click.option('--max-bytes', type=int, default=None, help='Stop after this many bytes.'),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+def open_headless_port(port, baudrate, config):
+    """
+    Open the port given by the options or the configuration file, without prompting.
+
+    Parameters
+    ----------
+    port : str or None
+        Device name from --port.
+    baudrate : int or None
+        Baudrate from --baudrate.
+    config : str or None
+        Path to the configuration file from --config.
+
+    Returns
+    -------
+    serial.Serial
+        The opened port.
+    """
+    timeout = 0.1
+    if config is not None:
+        import yaml
+        from pydantic import ValidationError
+        from serial_toolbox.models import Config
+        with open(config, 'r') as file:
+            try:
+                config_model = Config(**yaml.safe_load(file))
+            except ValidationError as e:
+                raise click.BadParameter(str(e), param_hint='--config')
+        port = port or config_model.port
+        baudrate = baudrate or config_model.baudrate
+        timeout = config_model.timeout
+    if port is None:
+        raise click.UsageError('No port given: use --port or set port in the configuration file.')
+
+    import logging
+    from serial_toolbox.connect import port_manager
+    from serial_toolbox.log_init import log_init
+    # Keep the console quiet: stream may be writing the data to stdout
+    logger = log_init(console_log_level=logging.CRITICAL)
+    serial_port = port_manager.open_port(port, baudrate or 9600, timeout, logger)
+    if serial_port is None:
+        raise click.ClickException(f'Could not open {port}, see the log file for details.')
+    return serial_port
+
+def report(stats):
+    """
+    Print the statistics of a headless run to stderr.
+    """
+    rate = stats['bytes'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+    click.echo(f"{stats['bytes']:,} bytes in {stats['elapsed']:.1f} s ({rate / 1e3:,.1f} kB/s), "
+               f"stopped by {stats['reason']}", err=True)
+
 @main.command()
 @click.option('-c', '--config', type=click.Path(exists=True), required=True, help='Path to the configuration file.')
-def monitor(config):
+@click.option('--replay', type=click.Path(exists=True), default=None, help='Replay a capture file instead of opening a serial port.')
+@click.option('--speed', type=float, default=1.0, show_default=True, help='Replay speed relative to the recording, 0 for as fast as possible.')
+def monitor(config, replay, speed):
     """
     Start the Serial Monitor CLI with configuration from CONFIG_FILE.
 
@@ -23,8 +98,54 @@ def monitor(config):
     ----------
     config : str
         Path to the configuration file.
+    replay : str
+        Path to a capture file to replay, or None to open a serial port.
+    speed : float
+        Replay speed relative to the recording.
+    """
+    from serial_toolbox.ui import serial_monitor  # Loads prompt_toolkit, pydantic and yaml
+    serial_monitor(config, replay=replay, speed=speed)
+
+@main.command()
+@headless_options
+@click.option('-o', '--output', default='-', show_default=True, help="Output file, '-' for stdout.")
+def stream(port, baudrate, config, duration, max_bytes, output):
+    """
+    Copy the raw data received on a port to stdout or a file, without the interactive monitor.
+
+    Stops on SIGINT/SIGTERM, at --duration or at --max-bytes, flushing all data received.
+    """
+    from serial_toolbox.headless import stream as stream_port
+    serial_port = open_headless_port(port, baudrate, config)
+    try:
+        stats = stream_port(serial_port, output, duration, max_bytes)
+    finally:
+        serial_port.close()
+    report(stats)
+
+@main.command()
+@headless_options
+@click.option('--compress', is_flag=True, help='Compress the capture blocks with zlib.')
+@click.argument('output', type=click.Path(dir_okay=False))
+def record(port, baudrate, config, duration, max_bytes, compress, output):
+    """
+    Record the raw data received on a port to the capture file OUTPUT, without the interactive monitor.
+
+    The capture can be replayed with 'sertools monitor --replay'. Stops on SIGINT/SIGTERM,
+    at --duration or at --max-bytes, writing all data received.
     """
-    serial_monitor(config)
+    from serial_toolbox.headless import record as record_port
+    serial_port = open_headless_port(port, baudrate, config)
+    try:
+        stats = record_port(serial_port, output, compress, duration, max_bytes)
+    finally:
+        serial_port.close()
+    report(stats)
+    if stats['capture_error'] is not None:
+        click.echo(f"Error: writing {output} failed, {stats['dropped_blocks']} blocks dropped: "
+                   f"{stats['capture_error']}", err=True)
+    elif stats['dropped_blocks']:
+        click.echo(f"Warning: {stats['dropped_blocks']} blocks dropped, the disk did not keep up", err=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,26 @@
+import os
 import threading
 import time
 import logging
+from collections import namedtuple
 import serial
 from serial.tools import list_ports
 
 from .log_init import log_init
 
+DeviceId = namedtuple('DeviceId', ['vid', 'pid', 'serial_number'])
+DeviceId.__doc__ = """
+USB identity of a serial adapter, which survives re-enumeration under another device name.
+Fields set to None match any value.
+"""
+
 class port_manager:
     """
     A utility class for managing asynchronous communication over serial ports.
     """
+
+    _device_cache = []
+    _device_cache_time = -float('inf')
     
     @classmethod
     def select_port(cls, interactive: bool = False, portname: str = None, baudrate: int = 9600, timeout: float = 0.1,
@@ -69,6 +80,150 @@ class port_manager:
         cls._reset_serial(ser, logger)
         return cls._open_serial(ser, logger)
 
+    @classmethod
+    def open_port(cls, device: str, baudrate: int = 9600, timeout: float = 0.1,
+                  logger: logging.Logger = None) -> serial.Serial:
+        """
+        Class method for opening a serial port by device name without user interaction.
+
+        Parameters
+        ----------
+        device : str
+            Device name, e.g. '/dev/ttyUSB0' or 'COM3'
+        baudrate : int, optional
+            The baudrate, default is 9600
+        timeout : float, optional
+            The timeout, default is 0.1
+        logger : logging.Logger, optional
+            The logger object, default is None
+
+        Returns
+        -------
+        serial.Serial
+            The opened serial object if any, else None.
+        """
+        if logger is None:
+            logger = log_init()
+
+        ser = serial.Serial()
+        ser.port = device
+        ser.baudrate = baudrate
+        ser.timeout = timeout
+        return cls._open_serial(ser, logger)
+
+    @classmethod
+    def open_ports(cls, devices: list = None, pattern: str = None, baudrate: int = 9600, timeout: float = 0.1,
+                   logger: logging.Logger = None) -> list:
+        """
+        Class method for opening several serial ports without user interaction.
+
+        Parameters
+        ----------
+        devices : list[str], optional
+            Device names to open, default is None
+        pattern : str, optional
+            Regular expression; every port whose device, description or hardware ID
+            matches it is opened, default is None
+        baudrate : int, optional
+            The baudrate, default is 9600
+        timeout : float, optional
+            The timeout, default is 0.1
+        logger : logging.Logger, optional
+            The logger object, default is None
+
+        Returns
+        -------
+        list[serial.Serial]
+            The ports that could be opened.
+        """
+        if logger is None:
+            logger = log_init()
+
+        devices = list(devices or [])
+        if pattern is not None:
+            devices += [info.device for info in sorted(list_ports.grep(pattern)) if info.device not in devices]
+        if not devices:
+            logger.error("Device not found")
+
+        ports = []
+        for device in devices:
+            ser = cls.open_port(device, baudrate, timeout, logger)
+            if ser is not None:
+                ports.append(ser)
+        return ports
+
+    @classmethod
+    def list_devices(cls, max_age: float = 0.0) -> list:
+        """
+        Class method for listing the serial ports, reusing a recent scan.
+
+        A scan with list_ports.comports() takes milliseconds to seconds depending on
+        the platform, so callers polling for a device pass a max_age.
+
+        Parameters
+        ----------
+        max_age : float, optional
+            Reuse the previous scan if it is at most this many seconds old, default is 0 (always scan)
+
+        Returns
+        -------
+        list[serial.tools.list_ports_common.ListPortInfo]
+            The ports found.
+        """
+        now = time.monotonic()
+        if now - cls._device_cache_time > max_age:
+            cls._device_cache = list_ports.comports()
+            cls._device_cache_time = now
+        return cls._device_cache
+
+    @classmethod
+    def identify(cls, device: str, max_age: float = 0.0) -> DeviceId:
+        """
+        Class method for looking up the USB identity of a serial port.
+
+        Parameters
+        ----------
+        device : str
+            Device name, e.g. '/dev/ttyUSB0' or 'COM3'
+        max_age : float, optional
+            Maximum age of the port scan to use, see list_devices, default is 0
+
+        Returns
+        -------
+        DeviceId
+            The identity, or None if the port is not a USB device or was not found.
+        """
+        device = os.path.realpath(device) if os.path.islink(device) else device
+        for info in cls.list_devices(max_age):
+            if info.device == device and info.vid is not None:
+                return DeviceId(info.vid, info.pid, info.serial_number)
+        return None
+
+    @classmethod
+    def find_device(cls, device_id: DeviceId, max_age: float = 0.0) -> str:
+        """
+        Class method for finding the device name of a USB serial adapter.
+
+        Parameters
+        ----------
+        device_id : DeviceId
+            The identity to look for. Fields set to None match any adapter.
+        max_age : float, optional
+            Maximum age of the port scan to use, see list_devices, default is 0
+
+        Returns
+        -------
+        str
+            The device name of the first matching port, or None.
+        """
+        for info in cls.list_devices(max_age):
+            if info.vid is None:
+                continue
+            if all(wanted is None or wanted == found for wanted, found in
+                   zip(device_id, (info.vid, info.pid, info.serial_number))):
+                return info.device
+        return None
+
     @classmethod
     def _user_serial_select(cls, devices, logger):
         """
@@ -147,12 +302,168 @@ class port_manager:
 
                 logger.info('Closing serial port')
 
-                while ser.isOpen() == True:
-                    logger.info('waiting for closing serial port')
-                    time.sleep(1)
+                # Poll in short steps, up to one second, instead of sleeping a whole second
+                deadline = time.monotonic() + 1.0
+                while ser.isOpen() == True and time.monotonic() < deadline:
+                    time.sleep(0.01)
                 logger.info('Finished closing serial port.')
             else:
                 logger.info('Serial port is available')
         except Exception as e:
             logger.error(e)
-            return None
\ No newline at end of file
+            return None
+
+class ReconnectSupervisor:
+    """
+    Reopens a serial port that disappeared, e.g. a USB adapter that was unplugged or reset.
+
+    The port is recognised by its USB identity (VID, PID and serial number) when known,
+    so it is found again even if it comes back under another device name. While waiting,
+    the supervisor checks every poll_interval whether the previous device name exists,
+    which is a single stat() call, and rescans all ports with list_ports.comports() only
+    every rescan_interval. A port coming back under the same name is therefore reopened
+    within a few milliseconds.
+
+    Attributes
+    ----------
+    device : str
+        Device name of the port, updated when it comes back under another name.
+    device_id : DeviceId or None
+        USB identity of the port, None to match by device name only.
+    baudrate : int
+        Baudrate of the reopened port.
+    timeout : float
+        Timeout of the reopened port.
+    poll_interval : float
+        Seconds between checks for the device name.
+    rescan_interval : float
+        Seconds between full port scans.
+    reconnects : int
+        Number of successful reconnects.
+    downtime : float
+        Total seconds between losing the port and reopening it.
+    last_downtime : float
+        Seconds the last reconnect took.
+    """
+
+    def __init__(self, device: str, device_id: DeviceId = None, baudrate: int = 9600, timeout: float = 0.1,
+                 poll_interval: float = 0.005, rescan_interval: float = 0.5, logger: logging.Logger = None):
+        """
+        Parameters
+        ----------
+        device : str
+            Device name of the port.
+        device_id : DeviceId, optional
+            USB identity of the port, default is None (match by device name only)
+        baudrate : int, optional
+            The baudrate, default is 9600
+        timeout : float, optional
+            The timeout, default is 0.1
+        poll_interval : float, optional
+            Seconds between checks for the device name, default is 0.005
+        rescan_interval : float, optional
+            Seconds between full port scans, default is 0.5
+        logger : logging.Logger, optional
+            The logger object, default is None
+        """
+        if logger is None:
+            logger = log_init()
+        self.device = device
+        self.device_id = device_id
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.logger = logger
+        self.reconnects = 0
+        self.downtime = 0.0
+        self.last_downtime = 0.0
+
+    @classmethod
+    def for_port(cls, serial_port: serial.Serial, logger: logging.Logger = None, **kwargs) -> 'ReconnectSupervisor':
+        """
+        Create a supervisor for an open port, taking its device name, USB identity and settings.
+
+        Parameters
+        ----------
+        serial_port : serial.Serial
+            The opened port.
+        logger : logging.Logger, optional
+            The logger object, default is None
+        **kwargs
+            poll_interval and rescan_interval, see ReconnectSupervisor.
+
+        Returns
+        -------
+        ReconnectSupervisor
+            The supervisor.
+        """
+        return cls(serial_port.port, port_manager.identify(serial_port.port), serial_port.baudrate,
+                   serial_port.timeout, logger=logger, **kwargs)
+
+    def reconnect(self, should_stop=None, timeout: float = None) -> serial.Serial:
+        """
+        Wait for the port to come back and reopen it.
+
+        Parameters
+        ----------
+        should_stop : callable, optional
+            Polled while waiting; returning True gives up, default is None
+        timeout : float, optional
+            Maximum time to wait in seconds, default is None (no limit)
+
+        Returns
+        -------
+        serial.Serial
+            The reopened port, or None if should_stop returned True or timeout expired.
+        """
+        self.logger.warning('Serial port lost: %s, waiting for it to come back', self.device)
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        next_scan = started
+        # Device names whose identity matched, and names that did not match with the time
+        # to check them again, as udev may not have filled in a new device's identity yet
+        matched = set()
+        mismatched = {}
+
+        while not (should_stop and should_stop()):
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return None
+
+            candidate = self.device if os.path.exists(self.device) else None
+            if candidate is None:
+                matched.clear()
+                mismatched.clear()
+                if self.device_id is not None and now >= next_scan:
+                    next_scan = now + self.rescan_interval
+                    candidate = port_manager.find_device(self.device_id)
+                    if candidate is not None:
+                        matched.add(candidate)
+            if (candidate is not None and self.device_id is not None and candidate not in matched
+                    and now >= mismatched.get(candidate, now)):
+                # The name exists again: make sure it is the same adapter
+                if port_manager.identify(candidate) == self.device_id:
+                    matched.add(candidate)
+                else:
+                    mismatched[candidate] = now + self.rescan_interval
+            if candidate is not None and (self.device_id is None or candidate in matched):
+                serial_port = self._open(candidate)
+                if serial_port is not None:
+                    self.last_downtime = time.monotonic() - started
+                    self.downtime += self.last_downtime
+                    self.reconnects += 1
+                    self.device = candidate
+                    self.logger.info('Serial port %s reopened after %.3f s', candidate, self.last_downtime)
+                    return serial_port
+            time.sleep(self.poll_interval)
+        return None
+
+    def _open(self, device: str) -> serial.Serial:
+        """
+        Open the device, returning None while it is not ready, e.g. before its permissions are set.
+        """
+        try:
+            return serial.Serial(device, baudrate=self.baudrate, timeout=self.timeout)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,297 @@
+"""
+Decimation of plot traces to about the pixel width of the axes.
+
+Drawing a line costs time proportional to its number of points, so a trace window
+of a million samples is reduced to a few thousand points before it is plotted. The
+decimators are incremental: buckets are aligned to absolute sample numbers, so as
+the window slides, completed buckets are reused and only the samples added since
+the previous frame are processed.
+"""
+import numpy as np
+
+DECIMATIONS = ('none', 'minmax', 'lttb')
+
+
+class Decimator:
+    """
+    Base class of the incremental decimators.
+
+    The window is split into buckets of bucket_size samples, a power of two chosen
+    so that the output has at most about max_points points. The partial buckets at
+    both ends of the window are reduced to their minimum and maximum on every call;
+    complete buckets are reduced once by the subclass and cached.
+
+    Attributes
+    ----------
+    max_points : int
+        Approximate maximum number of points per channel in the output.
+    bucket_size : int
+        Samples per bucket of the last call, 1 if the window was not decimated.
+    """
+
+    points_per_bucket = 1
+
+    def __init__(self, max_points: int = 2000):
+        """
+        Parameters
+        ----------
+        max_points : int, optional
+            Approximate maximum number of points per channel, by default 2000.
+        """
+        if max_points < 4:
+            raise ValueError('max_points must be at least 4')
+        self.max_points = max_points
+        self.bucket_size = 1
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the cached buckets.
+        """
+        self._channels = None
+        self._total = 0
+        self._first_bucket = 0  # Absolute number of the first cached bucket
+        self._end_bucket = 0  # Absolute number after the last cached bucket
+        self._x = None  # Absolute sample numbers of the cached points, channels x points
+        self._y = None
+
+    def decimate(self, traces: np.ndarray, total: int = None) -> tuple:
+        """
+        Reduce traces to about max_points points per channel.
+
+        Parameters
+        ----------
+        traces : numpy.ndarray
+            Samples of shape (channels x samples), oldest first. Only read during the call,
+            so it can be a view into a buffer that is modified afterwards.
+        total : int, optional
+            Number of samples appended to the buffer since it was created, including the
+            ones that left the window, e.g. TraceBuffer.total. It aligns the buckets to
+            absolute sample numbers; without it nothing is cached between calls.
+
+        Returns
+        -------
+        tuple[numpy.ndarray, numpy.ndarray]
+            x positions in the window (0 for the oldest sample) and y values, both of shape
+            (channels x points). Both are new arrays.
+        """
+        channels, samples = traces.shape
+        if samples <= self.max_points:
+            self.bucket_size = 1
+            return np.broadcast_to(np.arange(samples), (channels, samples)).copy(), traces.copy()
+
+        bucket_size = 1 << int(np.ceil(np.log2(samples * self.points_per_bucket / self.max_points)))
+        if total is None:
+            self.reset()
+            total = samples
+        first = total - samples
+        first_full = -(-first // bucket_size)
+        end_full = total // bucket_size
+
+        if (bucket_size != self.bucket_size or channels != self._channels or total < self._total
+                or first_full >= self._end_bucket):
+            # New bucket layout, cleared buffer, or every cached bucket left the window
+            self.reset()
+            self._first_bucket = self._end_bucket = first_full
+        elif first_full > self._first_bucket:
+            # Drop the buckets that left the window
+            drop = (first_full - self._first_bucket) * self.points_per_bucket
+            self._x = self._x[:, drop:]
+            self._y = self._y[:, drop:]
+            self._first_bucket = first_full
+        self.bucket_size = bucket_size
+        self._channels = channels
+        self._total = total
+
+        # Reduce the buckets completed since the last call
+        end_cached = self._cacheable_end(end_full)
+        if end_cached > self._end_bucket:
+            start = self._end_bucket * bucket_size
+            x, y = self._reduce(traces, first, start, end_cached * bucket_size, total)
+            if self._x is None:
+                self._x, self._y = x, y
+            else:
+                self._x = np.concatenate((self._x, x), axis=1)
+                self._y = np.concatenate((self._y, y), axis=1)
+            self._end_bucket = end_cached
+
+        parts_x, parts_y = [], []
+        head_end = min(first_full * bucket_size, total)
+        if head_end > first:
+            x, y = _minmax(traces[:, :head_end - first], first)
+            parts_x.append(x)
+            parts_y.append(y)
+        if self._x is not None:
+            parts_x.append(self._x)
+            parts_y.append(self._y)
+        tail_start = max(self._end_bucket * bucket_size, head_end)
+        if tail_start < total:
+            x, y = self._reduce_tail(traces, first, tail_start, end_full * bucket_size, total)
+            parts_x.append(x)
+            parts_y.append(y)
+
+        x = np.concatenate(parts_x, axis=1) - first
+        y = np.concatenate(parts_y, axis=1)
+        return x, y
+
+    def _cacheable_end(self, end_full: int) -> int:
+        """
+        Absolute number after the last complete bucket whose reduction cannot change.
+        """
+        return end_full
+
+    def _reduce(self, traces, first: int, start: int, end: int, total: int) -> tuple:
+        """
+        Reduce the complete buckets between absolute sample numbers start and end.
+        """
+        raise NotImplementedError
+
+    def _reduce_tail(self, traces, first: int, start: int, end: int, total: int) -> tuple:
+        """
+        Reduce the uncached samples at the end of the window: the complete buckets up to
+        absolute sample number end, then the partial bucket.
+        """
+        parts_x, parts_y = [], []
+        if end > start:
+            x, y = self._reduce(traces, first, start, end, total)
+            parts_x.append(x)
+            parts_y.append(y)
+        partial = max(start, end)
+        if total > partial:
+            x, y = _minmax(traces[:, partial - first:], partial)
+            parts_x.append(x)
+            parts_y.append(y)
+        return np.concatenate(parts_x, axis=1), np.concatenate(parts_y, axis=1)
+
+
+class MinMaxDecimator(Decimator):
+    """
+    Keeps the minimum and the maximum of each bucket, in the order they occur.
+
+    Every peak survives decimation, so the plot looks like the full-resolution one
+    drawn at the same pixel width.
+    """
+
+    points_per_bucket = 2
+
+    def _reduce(self, traces, first: int, start: int, end: int, total: int) -> tuple:
+        segment = traces[:, start - first:end - first]
+        channels = segment.shape[0]
+        buckets = segment.reshape(channels, -1, self.bucket_size)
+        return _bucket_minmax(buckets, start)
+
+
+class LttbDecimator(Decimator):
+    """
+    Largest-Triangle-Three-Buckets downsampling: one point per bucket, the one that
+    forms the largest triangle with the point kept in the previous bucket and the
+    mean of the next bucket.
+
+    It keeps the visual shape of the trace with half the points of MinMaxDecimator,
+    but narrow peaks can be lost. Buckets are processed one after another, each step
+    vectorized over channels and samples.
+    """
+
+    def reset(self):
+        super().reset()
+        self._previous = None  # (x, y) of the last cached point per channel
+
+    def _cacheable_end(self, end_full: int) -> int:
+        # The last complete bucket depends on the mean of the partial one after it
+        return end_full - 1
+
+    def _reduce(self, traces, first: int, start: int, end: int, total: int) -> tuple:
+        size = self.bucket_size
+        channels = traces.shape[0]
+        cache = end <= self._cacheable_end(total // size) * size
+        if self._previous is not None and start == self._end_bucket * size:
+            previous_x, previous_y = self._previous
+        else:
+            previous_x = np.full(channels, float(start))
+            previous_y = traces[:, start - first]
+
+        xs, ys = [], []
+        for bucket_start in range(start, end, size):
+            bucket = traces[:, bucket_start - first:bucket_start + size - first]
+            following = traces[:, bucket_start + size - first:min(bucket_start + 2 * size, total) - first]
+            if following.shape[1]:
+                next_x = bucket_start + size + (following.shape[1] - 1) / 2
+                next_y = _nanmean(following)
+            else:
+                next_x = float(bucket_start + size - 1)
+                next_y = bucket[:, -1]
+            candidates_x = np.arange(bucket_start, bucket_start + size, dtype=np.float64)
+            # Twice the triangle area; the constant factor does not change the argmax
+            area = np.abs((previous_x[:, None] - next_x) * (bucket - previous_y[:, None])
+                          - (previous_x[:, None] - candidates_x) * (next_y - previous_y)[:, None])
+            area[np.isnan(area)] = -1
+            chosen = area.argmax(axis=1)
+            previous_x = bucket_start + chosen.astype(np.float64)
+            previous_y = bucket[np.arange(channels), chosen]
+            xs.append(bucket_start + chosen)
+            ys.append(previous_y)
+        if cache:
+            self._previous = (previous_x, previous_y)
+        return np.stack(xs, axis=1), np.stack(ys, axis=1)
+
+
+def make_decimator(method: str = 'minmax', max_points: int = 2000) -> Decimator:
+    """
+    Create a decimator by name.
+
+    Parameters
+    ----------
+    method : str, optional
+        'minmax', 'lttb' or 'none', by default 'minmax'.
+    max_points : int, optional
+        Approximate maximum number of points per channel, by default 2000.
+
+    Returns
+    -------
+    Decimator
+        The decimator, or None for 'none'.
+    """
+    if method == 'none':
+        return None
+    if method == 'minmax':
+        return MinMaxDecimator(max_points)
+    if method == 'lttb':
+        return LttbDecimator(max_points)
+    raise ValueError(f"Unknown decimation '{method}', expected one of {DECIMATIONS}")
+
+
+def _nanmean(values: np.ndarray) -> np.ndarray:
+    """
+    Mean of each row ignoring NaN, NaN for all-NaN rows, without numpy's empty slice warning.
+    """
+    nan = np.isnan(values)
+    if not nan.any():
+        return values.mean(axis=1)
+    count = (~nan).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(nan, 0.0, values).sum(axis=1) / count
+
+
+def _minmax(segment: np.ndarray, start: int) -> tuple:
+    """
+    Reduce a segment of samples, starting at absolute sample number start, to one bucket.
+    """
+    return _bucket_minmax(segment[:, None, :], start)
+
+
+def _bucket_minmax(buckets: np.ndarray, start: int) -> tuple:
+    """
+    Return the minimum and maximum of each bucket of a (channels x buckets x size) array,
+    as two points per bucket in the order they occur. All-NaN buckets give NaN points.
+    """
+    channels, count, size = buckets.shape
+    nan = np.isnan(buckets)
+    low = np.where(nan, np.inf, buckets).argmin(axis=2)
+    high = np.where(nan, -np.inf, buckets).argmax(axis=2)
+    first = np.minimum(low, high)
+    second = np.maximum(low, high)
+    offsets = start + np.arange(count) * size
+    x = np.stack((offsets + first, offsets + second), axis=2).reshape(channels, -1)
+    y = np.stack((np.take_along_axis(buckets, first[:, :, None], axis=2)[:, :, 0],
+                  np.take_along_axis(buckets, second[:, :, None], axis=2)[:, :, 0]), axis=2).reshape(channels, -1)
+    return x, y
@@ -0,0 +1,482 @@
+"""
+Streaming export of received data to CSV, NumPy and raw files from a background thread.
+
+The numeric formats ('csv', 'npy', 'npz') export the comma-separated numeric records
+as rows of receive time, data index and channel values; other records are skipped.
+The 'raw' format writes the received byte stream exactly as read from the port.
+
+NumPy rows are structured arrays with the fields 'time', 'index' and 'values' (one
+float64 per channel), see export_dtype. An '.npy' file is a single growing array whose
+header is rewritten after every chunk, so it can be loaded with numpy.load at any
+time. An '.npz' file gets one member per chunk; read_npz joins them.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+from .capture import RX
+from .parsing import parse_numeric_batch
+
+EXPORT_FORMATS = ('csv', 'npy', 'npz', 'raw')
+
+
+def export_dtype(channels: int) -> np.dtype:
+    """
+    Return the structured dtype of exported NumPy rows with the given number of channels.
+    """
+    return np.dtype([('time', '<f8'), ('index', '<i8'), ('values', '<f8', (channels,))])
+
+
+def read_npz(path: str) -> np.ndarray:
+    """
+    Read an '.npz' export, joining its chunks in order.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+
+    Returns
+    -------
+    numpy.ndarray
+        Structured array with the fields 'time', 'index' and 'values'.
+    """
+    with np.load(path) as archive:
+        return np.concatenate([archive[name] for name in sorted(archive.files)])
+
+
+class Exporter:
+    """
+    Exports the data received by a serial_interface in large chunks from a background thread.
+
+    The interface's reader thread only appends each batch to a list under a short lock.
+    Every chunk_records records, and every flush_interval seconds, the collected
+    batches are handed to a writer thread through a bounded queue, which parses and
+    formats them and writes them with one call. If the disk cannot keep up, at most
+    max_pending_chunks chunks wait and further chunks are dropped and counted, so the
+    reader never blocks.
+
+    With rotate_bytes or rotate_seconds, the output is split into numbered segments,
+    e.g. 'session_0000.csv', 'session_0001.csv', checked before each chunk is written.
+    A numeric export also starts a new segment when records with more channels appear,
+    numbered from 'session_0001.csv' if there is no rotation.
+
+    Attributes
+    ----------
+    path : str
+        Output path, or the path the segment names are derived from.
+    format : str
+        'csv', 'npy', 'npz' or 'raw'.
+    segments : list[str]
+        Paths of the files written so far.
+    records_written : int
+        Number of records (numeric rows, or raw chunks) written.
+    bytes_written : int
+        Number of bytes written.
+    skipped_records : int
+        Number of non-numeric records left out of a numeric export.
+    dropped_records : int
+        Number of records dropped because the writer thread fell behind or writing failed.
+    error : Exception
+        The error that stopped the export, or None.
+    """
+
+    def __init__(self, path: str, format: str = None, rotate_bytes: int = None, rotate_seconds: float = None,
+                 chunk_records: int = 65536, chunk_bytes: int = 1 << 20, flush_interval: float = 1.0, max_pending_chunks: int = 64,
+                 compress: bool = False):
+        """
+        Parameters
+        ----------
+        path : str
+            Output path. Existing files are overwritten.
+        format : str, optional
+            'csv', 'npy', 'npz' or 'raw'. By default taken from the extension of path,
+            and 'raw' for other extensions.
+        rotate_bytes : int, optional
+            Start a new segment after this many bytes, by default None (never).
+        rotate_seconds : float, optional
+            Start a new segment after this many seconds, by default None (never).
+        chunk_records : int, optional
+            Number of records after which a chunk is written, by default 65536.
+        chunk_bytes : int, optional
+            Number of bytes after which a chunk of a 'raw' export is written, by default 1 MiB.
+        flush_interval : float, optional
+            Maximum time in seconds a record stays in memory, by default 1.0.
+        max_pending_chunks : int, optional
+            Maximum number of chunks waiting for the writer thread, by default 64.
+        compress : bool, optional
+            Deflate the members of an '.npz' export, by default False.
+        """
+        if format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            format = extension if extension in EXPORT_FORMATS else 'raw'
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{format}', expected one of {EXPORT_FORMATS}")
+        self.path = path
+        self.format = format
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.chunk_records = chunk_records
+        self.chunk_bytes = chunk_bytes
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.segments = []
+        self.records_written = 0
+        self.bytes_written = 0
+        self.skipped_records = 0
+        self.dropped_records = 0
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._batches = []
+        self._pending_records = 0
+        self._chunks = queue.Queue(max_pending_chunks)
+        self._segment = None
+        self._closed = False
+        self._interfaces = []
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def attach(self, interface):
+        """
+        Export the data received by a serial_interface.
+
+        Numeric formats listen to the framed records; 'raw' is attached as a capture so
+        that it sees the bytes exactly as read.
+
+        Parameters
+        ----------
+        interface : serial_interface
+            The interface.
+        """
+        if self.format == 'raw':
+            interface.attach_capture(self)
+        else:
+            interface.add_listener(self.add_records)
+        self._interfaces.append(interface)
+
+    def detach(self, interface):
+        """
+        Stop exporting the data of an interface.
+        """
+        if self.format == 'raw':
+            interface.detach_capture(self)
+        else:
+            interface.remove_listener(self.add_records)
+        self._interfaces.remove(interface)
+
+    def add_records(self, records, received_time: float, first_index: int):
+        """
+        Add a batch of records, as passed to serial_interface listeners.
+
+        Parameters
+        ----------
+        records : list[str]
+            The records.
+        received_time : float
+            Receive timestamp of the batch.
+        first_index : int
+            data_index of the first record.
+        """
+        with self._lock:
+            self._batches.append((records, received_time, first_index))
+            self._pending_records += len(records)
+            if self._pending_records >= self.chunk_records:
+                self._hand_off()
+
+    def write(self, data: bytes, timestamp: float = None, direction: int = RX):
+        """
+        Add raw bytes, with the signature of capture.CaptureWriter.write. Only RX data is exported.
+        """
+        if direction != RX:
+            return
+        with self._lock:
+            self._batches.append(data)
+            self._pending_records += len(data)
+            if self._pending_records >= self.chunk_bytes:
+                self._hand_off()
+
+    def flush(self):
+        """
+        Hand the data collected so far to the writer thread.
+        """
+        with self._lock:
+            self._hand_off()
+
+    def close(self):
+        """
+        Detach from all interfaces, write the remaining data and close the file.
+        """
+        if self._closed:
+            return
+        for interface in list(self._interfaces):
+            self.detach(interface)
+        self.flush()
+        self._closed = True
+        # Wakes the writer thread and tells it to finish; it may have died on an error
+        while self.thread.is_alive():
+            try:
+                self._chunks.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        if self._segment is not None:
+            self._segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _hand_off(self):
+        """
+        Queue the collected batches for the writer thread. The caller holds the lock.
+        """
+        if self._batches:
+            try:
+                self._chunks.put_nowait(self._batches)
+            except queue.Full:
+                self._drop(self._batches)
+            self._batches = []
+            self._pending_records = 0
+
+    def _run(self):
+        while True:
+            try:
+                batches = self._chunks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.flush()
+                continue
+            if batches is None:
+                return
+            if self.error is not None:
+                self._drop(batches)
+                continue
+            try:
+                if self.format == 'raw':
+                    self._write_raw(batches)
+                else:
+                    self._write_numeric(batches)
+            except Exception as e:
+                logging.error('Export to %s stopped: %s', self.path, e)
+                self.error = e
+                self._drop(batches)
+
+    def _drop(self, batches):
+        if self.format == 'raw':
+            self.dropped_records += len(batches)
+        else:
+            self.dropped_records += sum(len(batch[0]) for batch in batches)
+
+    def _write_raw(self, chunks):
+        segment = self._current_segment(0)
+        data = b''.join(chunks)
+        segment.write_raw(data)
+        self.records_written += len(chunks)
+        self.bytes_written += len(data)
+
+    def _write_numeric(self, batches):
+        lines = [line for records, _, _ in batches for line in records]
+        if lines and not isinstance(lines[0], str):
+            # HEX format records have no numeric columns
+            self.skipped_records += len(lines)
+            return
+        values, numeric = parse_numeric_batch(lines)
+        self.skipped_records += len(lines) - len(values)
+        if not len(values):
+            return
+        counts = [len(records) for records, _, _ in batches]
+        times = np.repeat([received_time for _, received_time, _ in batches], counts)
+        indices = np.concatenate([np.arange(first_index, first_index + count)
+                                  for (_, _, first_index), count in zip(batches, counts)])
+
+        segment = self._current_segment(values.shape[1])
+        written = segment.write_rows(times[numeric], indices[numeric], values)
+        self.records_written += len(values)
+        self.bytes_written += written
+
+    def _current_segment(self, channels: int):
+        """
+        Return the segment to write to, opening a new one on rotation or wider rows.
+        """
+        segment = self._segment
+        if segment is not None:
+            rotate = ((self.rotate_bytes and segment.nbytes >= self.rotate_bytes)
+                      or (self.rotate_seconds and time.monotonic() - segment.opened >= self.rotate_seconds)
+                      or channels > segment.channels)
+            if not rotate:
+                return segment
+            segment.close()
+
+        path = self.path
+        if self.rotate_bytes or self.rotate_seconds or self.segments:
+            base, extension = os.path.splitext(self.path)
+            path = f'{base}_{len(self.segments):04d}{extension}'
+        self._segment = _SEGMENT_TYPES[self.format](path, channels, self.compress)
+        self.segments.append(path)
+        return self._segment
+
+
+class _Segment:
+    """
+    One output file of an export.
+    """
+
+    def __init__(self, path: str, channels: int, compress: bool):
+        self.path = path
+        self.channels = channels
+        self.compress = compress
+        self.nbytes = 0
+        self.opened = time.monotonic()
+
+    def write_rows(self, times, indices, values) -> int:
+        raise NotImplementedError
+
+    def write_raw(self, data: bytes):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _pad(self, values):
+        """
+        Pad values with NaN columns up to the channels of the segment.
+        """
+        if values.shape[1] < self.channels:
+            values = np.hstack((values, np.full((len(values), self.channels - values.shape[1]), np.nan)))
+        return values
+
+
+class _RawSegment(_Segment):
+
+    def __init__(self, path: str, channels: int, compress: bool):
+        super().__init__(path, channels, compress)
+        self._file = open(path, 'wb')
+
+    def write_raw(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        self.nbytes += len(data)
+
+    def close(self):
+        self._file.close()
+
+
+class _CsvSegment(_Segment):
+
+    def __init__(self, path: str, channels: int, compress: bool):
+        super().__init__(path, channels, compress)
+        self._file = open(path, 'w')
+        header = ','.join(['time', 'index'] + [f'ch{channel}' for channel in range(channels)]) + '\n'
+        self._file.write(header)
+        self.nbytes += len(header)
+        self._row_format = ','.join(['%.6f', '%d'] + ['%r'] * channels) + '\n'
+
+    def write_rows(self, times, indices, values) -> int:
+        table = np.column_stack((times, indices, self._pad(values)))
+        # One %-format over the whole chunk is much faster than numpy.savetxt's per-row loop;
+        # %r writes the shortest text that reads back to the same float
+        text = (self._row_format * len(table)) % tuple(table.ravel().tolist())
+        self._file.write(text)
+        self._file.flush()
+        self.nbytes += len(text)
+        return len(text)
+
+    def close(self):
+        self._file.close()
+
+
+class _NpySegment(_Segment):
+    """
+    A .npy file written in chunks. The header is sized, as numpy does for arrays that
+    grow along their first axis, with room for a 21-digit row count and padded to a
+    multiple of 64 bytes, so that the shape can be rewritten in place after every chunk.
+    """
+
+    _ROW_DIGITS = 21
+    _ALIGNMENT = 64
+
+    def __init__(self, path: str, channels: int, compress: bool):
+        super().__init__(path, channels, compress)
+        self.dtype = export_dtype(channels)
+        self.rows = 0
+        self._descr = np.lib.format.dtype_to_descr(self.dtype)
+        # Header of the widest row count, plus the newline; version 2.0 if too long for 1.0
+        widest = len(self._header_dict(10 ** self._ROW_DIGITS - 1)) + 1
+        self._version = (1, 0) if 10 + widest <= 0xFFFF else (2, 0)
+        prefix_size = len(np.lib.format.MAGIC_PREFIX) + 2 + (2 if self._version == (1, 0) else 4)
+        self._header_size = -(-(prefix_size + widest) // self._ALIGNMENT) * self._ALIGNMENT
+        self._file = open(path, 'wb')
+        self._write_header()
+        self.nbytes = self._header_size
+
+    def write_rows(self, times, indices, values) -> int:
+        table = np.empty(len(times), dtype=self.dtype)
+        table['time'] = times
+        table['index'] = indices
+        table['values'] = self._pad(values)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(table.tobytes())
+        self.rows += len(table)
+        self._write_header()
+        self._file.flush()
+        self.nbytes += table.nbytes
+        return table.nbytes
+
+    def close(self):
+        self._file.close()
+
+    def _header_dict(self, rows: int) -> bytes:
+        return repr({'descr': self._descr, 'fortran_order': False, 'shape': (rows,)}).encode('latin-1')
+
+    def _write_header(self):
+        header = self._header_dict(self.rows)
+        length_size = 2 if self._version == (1, 0) else 4
+        prefix = np.lib.format.MAGIC_PREFIX + bytes(self._version)
+        length = self._header_size - len(prefix) - length_size
+        self._file.seek(0)
+        self._file.write(prefix + length.to_bytes(length_size, 'little') + header.ljust(length - 1) + b'\n')
+
+
+class _NpzSegment(_Segment):
+    """
+    An .npz file with one member per chunk.
+    """
+
+    def __init__(self, path: str, channels: int, compress: bool):
+        super().__init__(path, channels, compress)
+        self.dtype = export_dtype(channels)
+        self.chunks = 0
+        self._archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+
+    def write_rows(self, times, indices, values) -> int:
+        table = np.empty(len(times), dtype=self.dtype)
+        table['time'] = times
+        table['index'] = indices
+        table['values'] = self._pad(values)
+        with self._archive.open(f'chunk_{self.chunks:06d}.npy', 'w', force_zip64=True) as member:
+            np.lib.format.write_array(member, table, allow_pickle=False)
+        self.chunks += 1
+        self._archive.fp.flush()
+        written = self._archive.fp.tell() - self.nbytes
+        self.nbytes += written
+        return written
+
+    def close(self):
+        self._archive.close()
+
+
+_SEGMENT_TYPES = {
+    'raw': _RawSegment,
+    'csv': _CsvSegment,
+    'npy': _NpySegment,
+    'npz': _NpzSegment,
+}
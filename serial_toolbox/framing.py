@@ -0,0 +1,509 @@
+"""
+Incremental framers that split a stream of received bytes into records.
+
+A framer is fed whatever chunk the serial port returned and hands back the
+complete frames found so far. Incomplete data is kept in a reusable buffer
+until the rest of the frame arrives in a later chunk. Framers can optionally
+verify and strip a trailing CRC; frames failing the check are dropped and
+counted in error_count.
+"""
+import binascii
+import zlib
+
+CRC_ALGORITHMS = {
+    'crc16-ccitt': (2, lambda data: binascii.crc_hqx(data, 0xFFFF)),
+    'crc32': (4, zlib.crc32),
+}
+"""Supported CRC algorithms, mapping name to (size in bytes, function)."""
+
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+SLIP_ESC_END = 0xDC
+SLIP_ESC_ESC = 0xDD
+
+
+class Framer:
+    """
+    Base class for incremental framers.
+
+    Attributes
+    ----------
+    frame_count : int
+        Number of complete frames returned so far.
+    error_count : int
+        Number of framing errors (discarded or malformed data, CRC mismatches) seen so far.
+    crc_error_count : int
+        Number of frames dropped because of a CRC mismatch.
+    crc : str or None
+        Name of the CRC algorithm checked on each frame, see CRC_ALGORITHMS.
+    """
+
+    def __init__(self, crc: str = None, crc_byteorder: str = 'big'):
+        """
+        Parameters
+        ----------
+        crc : str, optional
+            CRC algorithm appended to each frame, by default None (no CRC).
+        crc_byteorder : str, optional
+            Byte order of the CRC field, 'big' or 'little', by default 'big'.
+        """
+        if crc is not None and crc not in CRC_ALGORITHMS:
+            raise ValueError(f"Unknown CRC algorithm '{crc}'")
+        self.frame_count = 0
+        self.error_count = 0
+        self.crc_error_count = 0
+        self.crc = crc
+        self.crc_byteorder = crc_byteorder
+        self._buffer = bytearray()
+
+    def feed(self, data) -> list:
+        """
+        Add received bytes and return the frames completed by them.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The chunk read from the serial port.
+
+        Returns
+        -------
+        list[bytes]
+            Complete frames, in arrival order, with any CRC stripped.
+        """
+        frames = self._extract(data)
+        if self.crc is not None and frames:
+            frames = self._check_crc(frames)
+        self.frame_count += len(frames)
+        return frames
+
+    def reset(self):
+        """
+        Discard any partially received frame.
+        """
+        self._buffer.clear()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of buffered bytes that do not form a complete frame yet.
+        """
+        return len(self._buffer)
+
+    def _extract(self, data) -> list:
+        """
+        Append data to the buffer and remove and return the complete frames.
+        """
+        raise NotImplementedError
+
+    def _check_crc(self, frames) -> list:
+        """
+        Verify and strip the trailing CRC of each frame, dropping frames that fail.
+        """
+        size, function = CRC_ALGORITHMS[self.crc]
+        byteorder = self.crc_byteorder
+        checked = []
+        for frame in frames:
+            if len(frame) >= size:
+                with memoryview(frame) as view:
+                    if function(view[:-size]) == int.from_bytes(view[-size:], byteorder):
+                        checked.append(frame[:-size])
+                        continue
+            self.crc_error_count += 1
+            self.error_count += 1
+        return checked
+
+
+class RawFramer(Framer):
+    """
+    Pass-through framer returning every received chunk as one frame.
+    """
+
+    def _extract(self, data) -> list:
+        return [bytes(data)] if data else []
+
+
+class DelimiterFramer(Framer):
+    """
+    Framer for records terminated by a delimiter byte sequence.
+
+    Attributes
+    ----------
+    delimiter : bytes
+        Byte sequence terminating each record.
+    keep_delimiter : bool
+        If True, frames are returned with their delimiter attached.
+    skip_empty : bool
+        If True, empty records between consecutive delimiters are dropped.
+    max_length : int
+        Maximum record length in bytes, without the delimiter. A longer record is
+        dropped up to its delimiter and counted as one framing error.
+    """
+
+    def __init__(self, delimiter: bytes, keep_delimiter: bool = False, skip_empty: bool = False,
+                 max_length: int = 65536, crc: str = None, crc_byteorder: str = 'big'):
+        """
+        Parameters
+        ----------
+        delimiter : bytes
+            Byte sequence terminating each record.
+        keep_delimiter : bool, optional
+            If True, frames keep their delimiter, by default False.
+        skip_empty : bool, optional
+            If True, empty records are dropped, by default False.
+        max_length : int, optional
+            Maximum record length in bytes, by default 65536.
+        crc : str, optional
+            CRC algorithm appended to each frame, by default None.
+        crc_byteorder : str, optional
+            Byte order of the CRC field, by default 'big'.
+        """
+        super().__init__(crc=crc, crc_byteorder=crc_byteorder)
+        if not delimiter:
+            raise ValueError('delimiter must not be empty')
+        if keep_delimiter and crc is not None:
+            raise ValueError('keep_delimiter cannot be combined with a CRC')
+        self.delimiter = bytes(delimiter)
+        self.keep_delimiter = keep_delimiter
+        self.skip_empty = skip_empty
+        self.max_length = max_length
+        self._discarding = False  # Dropping the rest of an oversized record up to its delimiter
+
+    def reset(self):
+        """
+        Discard any partially received frame.
+        """
+        super().reset()
+        self._discarding = False
+
+    def _extract(self, data) -> list:
+        buffer = self._buffer
+        buffer += data
+        delimiter = self.delimiter
+
+        if self._discarding:
+            start = buffer.find(delimiter)
+            if start < 0:
+                self._discard_tail()
+                return []
+            del buffer[:start + len(delimiter)]
+            self._discarding = False
+
+        end = buffer.rfind(delimiter)
+        if end < 0:
+            if len(buffer) > self.max_length:
+                self._overflow()
+            return []
+
+        # Copy all complete records out in one slice and split them in C,
+        # leaving only the trailing partial record in the buffer.
+        with memoryview(buffer) as view:
+            complete = bytes(view[:end])
+        del buffer[:end + len(self.delimiter)]
+
+        frames = complete.split(delimiter)
+        if len(complete) > self.max_length:
+            kept = [frame for frame in frames if len(frame) <= self.max_length]
+            self.error_count += len(frames) - len(kept)
+            frames = kept
+        if len(buffer) > self.max_length:
+            self._overflow()
+        if self.skip_empty:
+            frames = [frame for frame in frames if frame]
+        if self.keep_delimiter:
+            frames = [frame + delimiter for frame in frames]
+        return self._decode_frames(frames)
+
+    def _overflow(self):
+        """
+        Count the oversized partial record in the buffer and drop it up to its delimiter.
+        """
+        self.error_count += 1
+        self._discarding = True
+        self._discard_tail()
+
+    def _discard_tail(self):
+        """
+        Clear the buffer, except for bytes that may start a delimiter split across chunks.
+        """
+        del self._buffer[:max(len(self._buffer) - len(self.delimiter) + 1, 0)]
+
+    def _decode_frames(self, frames) -> list:
+        """
+        Hook for subclasses that transform the delimited frames, e.g. to undo byte stuffing.
+        """
+        return frames
+
+
+class LineFramer(DelimiterFramer):
+    """
+    Framer for newline-terminated text lines.
+    """
+
+    def __init__(self, delimiter: bytes = b'\n', keep_delimiter: bool = False, max_length: int = 65536):
+        """
+        Parameters
+        ----------
+        delimiter : bytes, optional
+            Byte sequence terminating each line, by default b'\\n'.
+        keep_delimiter : bool, optional
+            If True, frames keep their delimiter, by default False.
+        max_length : int, optional
+            Maximum line length in bytes, by default 65536.
+        """
+        super().__init__(delimiter, keep_delimiter=keep_delimiter, max_length=max_length)
+
+
+class SlipFramer(DelimiterFramer):
+    """
+    Framer for SLIP (RFC 1055) encoded packets.
+    """
+
+    def __init__(self, max_length: int = 65536, crc: str = None, crc_byteorder: str = 'big'):
+        """
+        Parameters
+        ----------
+        max_length : int, optional
+            Maximum encoded packet length, by default 65536.
+        crc : str, optional
+            CRC algorithm appended to each packet before encoding, by default None.
+        crc_byteorder : str, optional
+            Byte order of the CRC field, by default 'big'.
+        """
+        super().__init__(bytes([SLIP_END]), skip_empty=True, max_length=max_length, crc=crc, crc_byteorder=crc_byteorder)
+
+    def _decode_frames(self, frames) -> list:
+        esc = bytes([SLIP_ESC])
+        esc_end = bytes([SLIP_ESC, SLIP_ESC_END])
+        esc_esc = bytes([SLIP_ESC, SLIP_ESC_ESC])
+        decoded = []
+        for frame in frames:
+            if esc not in frame:
+                decoded.append(frame)
+                continue
+            if frame.count(esc) != frame.count(esc_end) + frame.count(esc_esc):
+                self.error_count += 1
+                continue
+            decoded.append(frame.replace(esc_end, bytes([SLIP_END])).replace(esc_esc, esc))
+        return decoded
+
+
+class CobsFramer(DelimiterFramer):
+    """
+    Framer for COBS (Consistent Overhead Byte Stuffing) encoded packets delimited by 0x00.
+    """
+
+    def __init__(self, max_length: int = 65536, crc: str = None, crc_byteorder: str = 'big'):
+        """
+        Parameters
+        ----------
+        max_length : int, optional
+            Maximum encoded packet length, by default 65536.
+        crc : str, optional
+            CRC algorithm appended to each packet before encoding, by default None.
+        crc_byteorder : str, optional
+            Byte order of the CRC field, by default 'big'.
+        """
+        super().__init__(b'\x00', skip_empty=True, max_length=max_length, crc=crc, crc_byteorder=crc_byteorder)
+
+    def _decode_frames(self, frames) -> list:
+        decoded = []
+        for frame in frames:
+            packet = cobs_decode(frame)
+            if packet is None:
+                self.error_count += 1
+            else:
+                decoded.append(packet)
+        return decoded
+
+
+class FixedLengthFramer(Framer):
+    """
+    Framer for records of a fixed size.
+
+    Attributes
+    ----------
+    length : int
+        Size of each record in bytes, including any CRC.
+    """
+
+    def __init__(self, length: int, crc: str = None, crc_byteorder: str = 'big'):
+        """
+        Parameters
+        ----------
+        length : int
+            Size of each record in bytes, including any CRC.
+        crc : str, optional
+            CRC algorithm appended to each record, by default None.
+        crc_byteorder : str, optional
+            Byte order of the CRC field, by default 'big'.
+        """
+        super().__init__(crc=crc, crc_byteorder=crc_byteorder)
+        if length <= 0:
+            raise ValueError('length must be positive')
+        self.length = length
+
+    def _extract(self, data) -> list:
+        buffer = self._buffer
+        buffer += data
+        length = self.length
+        end = len(buffer) - len(buffer) % length
+        if end == 0:
+            return []
+        with memoryview(buffer) as view:
+            frames = [bytes(view[start:start + length]) for start in range(0, end, length)]
+        del buffer[:end]
+        return frames
+
+
+class LengthPrefixedFramer(Framer):
+    """
+    Framer for records preceded by an unsigned length field.
+
+    Attributes
+    ----------
+    prefix_size : int
+        Size of the length field in bytes.
+    byteorder : str
+        Byte order of the length field, 'big' or 'little'.
+    length_includes_prefix : bool
+        If True, the length field counts its own bytes as well as the payload.
+    max_length : int
+        Maximum accepted payload length. A larger length field is treated as a framing
+        error and the buffered data is discarded to resynchronize.
+    """
+
+    def __init__(self, prefix_size: int = 1, byteorder: str = 'big', length_includes_prefix: bool = False,
+                 max_length: int = 65536, crc: str = None, crc_byteorder: str = 'big'):
+        """
+        Parameters
+        ----------
+        prefix_size : int, optional
+            Size of the length field in bytes, by default 1.
+        byteorder : str, optional
+            Byte order of the length field, by default 'big'.
+        length_includes_prefix : bool, optional
+            If True, the length field counts its own bytes, by default False.
+        max_length : int, optional
+            Maximum accepted payload length, by default 65536.
+        crc : str, optional
+            CRC algorithm at the end of each payload (counted in the length), by default None.
+        crc_byteorder : str, optional
+            Byte order of the CRC field, by default 'big'.
+        """
+        super().__init__(crc=crc, crc_byteorder=crc_byteorder)
+        if prefix_size not in (1, 2, 4):
+            raise ValueError('prefix_size must be 1, 2 or 4')
+        self.prefix_size = prefix_size
+        self.byteorder = byteorder
+        self.length_includes_prefix = length_includes_prefix
+        self.max_length = max_length
+
+    def _extract(self, data) -> list:
+        buffer = self._buffer
+        buffer += data
+        prefix_size = self.prefix_size
+        byteorder = self.byteorder
+        adjust = prefix_size if self.length_includes_prefix else 0
+        size = len(buffer)
+        frames = []
+        start = 0
+        with memoryview(buffer) as view:
+            while size - start >= prefix_size:
+                length = int.from_bytes(view[start:start + prefix_size], byteorder) - adjust
+                if length < 0 or length > self.max_length:
+                    self.error_count += 1
+                    start = size
+                    break
+                end = start + prefix_size + length
+                if end > size:
+                    break
+                frames.append(bytes(view[start + prefix_size:end]))
+                start = end
+        if start:
+            del buffer[:start]
+        return frames
+
+
+def cobs_decode(frame):
+    """
+    Decode one COBS encoded packet (without its 0x00 delimiter).
+
+    Parameters
+    ----------
+    frame : bytes
+        The encoded packet.
+
+    Returns
+    -------
+    bytes or None
+        The decoded packet, or None if the encoding is invalid.
+    """
+    size = len(frame)
+    out = bytearray()
+    start = 0
+    while start < size:
+        code = frame[start]
+        end = start + code
+        if code == 0 or end > size:
+            return None
+        out += frame[start + 1:end]
+        start = end
+        if code != 0xFF and start < size:
+            out.append(0)
+    return bytes(out)
+
+
+def make_framer(type: str = 'line', delimiter: str = '0a', length: int = 0, prefix_size: int = 1,
+                byteorder: str = 'big', length_includes_prefix: bool = False, max_length: int = 65536,
+                crc: str = 'none', crc_byteorder: str = 'big', format: str = 'STR') -> Framer:
+    """
+    Create a framer from configuration values, e.g. models.FramingConfig.
+
+    Parameters
+    ----------
+    type : str, optional
+        Framer name: 'raw', 'line', 'delimiter', 'fixed', 'length_prefixed', 'slip' or 'cobs'.
+        By default 'line'.
+    delimiter : str, optional
+        Delimiter as a hexadecimal string for the 'delimiter' framer, by default '0a'.
+    length : int, optional
+        Record size for the 'fixed' framer.
+    prefix_size : int, optional
+        Length field size for the 'length_prefixed' framer, by default 1.
+    byteorder : str, optional
+        Byte order of the length field, by default 'big'.
+    length_includes_prefix : bool, optional
+        If True, the length field counts its own bytes, by default False.
+    max_length : int, optional
+        Maximum frame length, by default 65536.
+    crc : str, optional
+        CRC algorithm, or 'none', by default 'none'.
+    crc_byteorder : str, optional
+        Byte order of the CRC field, by default 'big'.
+    format : str, optional
+        Data format of the interface ('STR' or 'HEX'). The 'line' framer keeps the newline in HEX format.
+
+    Returns
+    -------
+    Framer
+        The configured framer.
+    """
+    crc = None if crc == 'none' else crc
+    crc_options = {'crc': crc, 'crc_byteorder': crc_byteorder}
+    if type == 'raw':
+        return RawFramer(**crc_options)
+    if type == 'line':
+        if crc is not None:
+            return DelimiterFramer(b'\n', max_length=max_length, **crc_options)
+        return LineFramer(keep_delimiter=(format == 'HEX'), max_length=max_length)
+    if type == 'delimiter':
+        return DelimiterFramer(bytes.fromhex(delimiter), max_length=max_length, **crc_options)
+    if type == 'fixed':
+        return FixedLengthFramer(length, **crc_options)
+    if type == 'length_prefixed':
+        return LengthPrefixedFramer(prefix_size, byteorder, length_includes_prefix, max_length, **crc_options)
+    if type == 'slip':
+        return SlipFramer(max_length, **crc_options)
+    if type == 'cobs':
+        return CobsFramer(max_length, **crc_options)
+    raise ValueError(f"Unknown framing type '{type}'")
@@ -0,0 +1,187 @@
+"""
+Headless recording and streaming of a serial port at full link rate.
+
+Unlike serial_interface, these loops do not frame or queue the received data: every
+chunk read from the port is handed straight to a buffered sink.
+"""
+import os
+import select
+import signal
+import sys
+import time
+
+from .capture import CaptureWriter
+
+
+def read_chunks(serial_port, sink, duration: float = None, max_bytes: int = None, poll_interval: float = 0.1,
+                on_idle=None, handle_signals: bool = True) -> dict:
+    """
+    Read raw chunks from a port and pass them to sink until a limit is reached or a signal arrives.
+
+    Parameters
+    ----------
+    serial_port : serial.Serial
+        The opened serial port.
+    sink : callable
+        Called as sink(chunk, timestamp) for every chunk read.
+    duration : float, optional
+        Stop after this many seconds, by default None (no limit).
+    max_bytes : int, optional
+        Stop after this many bytes; the last chunk is cut to fit, by default None (no limit).
+    poll_interval : float, optional
+        Maximum time in seconds to wait for data before checking the limits, by default 0.1.
+    on_idle : callable, optional
+        Called without arguments whenever no data arrived for poll_interval, e.g. to flush output.
+    handle_signals : bool, optional
+        If True, SIGINT and SIGTERM stop the loop cleanly instead of raising. Only possible in
+        the main thread. By default True.
+
+    Returns
+    -------
+    dict
+        'bytes', 'chunks', 'elapsed' (seconds) and 'reason' ('duration', 'max_bytes', 'signal',
+        'sink closed' or 'port closed').
+    """
+    stop = []
+
+    def on_signal(signum, frame):
+        stop.append(signum)
+
+    previous_handlers = {}
+    if handle_signals:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous_handlers[signum] = signal.signal(signum, on_signal)
+
+    try:
+        fileno = serial_port.fileno()
+    except (AttributeError, OSError, ValueError):
+        fileno = None
+
+    total = 0
+    chunks = 0
+    reason = 'signal'
+    started = time.monotonic()
+    deadline = None if duration is None else started + duration
+    try:
+        while not stop:
+            timeout = poll_interval
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    reason = 'duration'
+                    break
+
+            if fileno is not None:
+                try:
+                    readable, _, _ = select.select([fileno], [], [], timeout)
+                except InterruptedError:
+                    continue
+            else:
+                readable = serial_port.in_waiting > 0
+                if not readable:
+                    time.sleep(min(timeout, 0.005))
+            if not readable:
+                if on_idle is not None:
+                    on_idle()
+                continue
+
+            try:
+                chunk = serial_port.read(serial_port.in_waiting or 1)
+            except OSError:
+                reason = 'port closed'
+                break
+            if not chunk:
+                continue
+            if max_bytes is not None and total + len(chunk) >= max_bytes:
+                chunk = chunk[:max_bytes - total]
+                reason = 'max_bytes'
+                stop.append(None)
+            try:
+                sink(chunk, time.time())
+            except BrokenPipeError:
+                reason = 'sink closed'
+                break
+            total += len(chunk)
+            chunks += 1
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+    return {'bytes': total, 'chunks': chunks, 'elapsed': time.monotonic() - started, 'reason': reason}
+
+
+def stream(serial_port, output: str = '-', duration: float = None, max_bytes: int = None,
+           buffer_size: int = 1 << 20) -> dict:
+    """
+    Copy the raw bytes received on a port to stdout or a file.
+
+    Output is written through a large buffer and flushed whenever the port is idle,
+    so a downstream pipe still sees data promptly on slow links.
+
+    Parameters
+    ----------
+    serial_port : serial.Serial
+        The opened serial port.
+    output : str, optional
+        Output file path, or '-' for stdout, by default '-'.
+    duration : float, optional
+        Stop after this many seconds, by default None.
+    max_bytes : int, optional
+        Stop after this many bytes, by default None.
+    buffer_size : int, optional
+        Size of the output buffer in bytes, by default 1 MiB.
+
+    Returns
+    -------
+    dict
+        Statistics, see read_chunks.
+    """
+    if output == '-':
+        file = os.fdopen(sys.stdout.fileno(), 'wb', buffering=buffer_size, closefd=False)
+    else:
+        file = open(output, 'wb', buffering=buffer_size)
+
+    def flush():
+        try:
+            file.flush()
+        except BrokenPipeError:
+            pass
+
+    try:
+        return read_chunks(serial_port, lambda chunk, timestamp: file.write(chunk), duration, max_bytes,
+                           on_idle=flush)
+    finally:
+        try:
+            file.close()
+        except BrokenPipeError:
+            pass
+
+
+def record(serial_port, path: str, compress: bool = False, duration: float = None, max_bytes: int = None) -> dict:
+    """
+    Record the raw bytes received on a port to a capture file.
+
+    Parameters
+    ----------
+    serial_port : serial.Serial
+        The opened serial port.
+    path : str
+        Path of the capture file, appended to if it exists.
+    compress : bool, optional
+        Compress the capture blocks with zlib, by default False.
+    duration : float, optional
+        Stop after this many seconds, by default None.
+    max_bytes : int, optional
+        Stop after this many bytes, by default None.
+
+    Returns
+    -------
+    dict
+        Statistics, see read_chunks, plus 'dropped_blocks' and 'capture_error' (the error
+        that stopped writing, or None) from the capture writer.
+    """
+    with CaptureWriter(path, compress=compress) as capture:
+        stats = read_chunks(serial_port, capture.write, duration, max_bytes)
+    stats['dropped_blocks'] = capture.dropped_blocks
+    stats['capture_error'] = capture.error
+    return stats
@@ -1,10 +1,252 @@
 import threading
 import queue
+import select
+import selectors
 import time
 from .connect import port_manager
+from .framing import LineFramer
+from .capture import RX, TX
+from .metrics import MetricsRegistry
+from .tx import SerialWriter
 
 import logging
-from .log_init import log_init
+from .log_init import log_init, TrafficLogger
+
+class RingBuffer:
+    """
+    Bounded ring buffer between one producer and one consumer thread, with a backpressure policy.
+
+    Items are stored in a preallocated list of slots. put_many() and get_many() move a
+    whole batch with slice assignments under a single short lock, and a consumer
+    blocked in get()/get_many() is woken by the producer instead of polling qsize().
+    The interface mirrors queue.Queue (put, get, qsize, empty, full) so it can stand
+    in for one.
+
+    Attributes
+    ----------
+    maxsize : int
+        Number of slots.
+    policy : str
+        What happens when the buffer is full: 'drop_oldest' discards the oldest items,
+        'drop_newest' discards the items being added, 'block' makes the producer wait.
+    dropped : int
+        Number of items discarded because of the policy.
+    high_watermark : int
+        Highest number of items held at once.
+    """
+
+    POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+    def __init__(self, maxsize: int, policy: str = 'drop_oldest'):
+        """
+        Parameters
+        ----------
+        maxsize : int
+            Number of slots.
+        policy : str, optional
+            'drop_oldest', 'drop_newest' or 'block', by default 'drop_oldest'.
+        """
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.high_watermark = 0
+        self._slots = [None] * maxsize
+        self._head = 0  # Position of the oldest item
+        self._count = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def qsize(self) -> int:
+        """
+        Return the number of items held.
+        """
+        return self._count
+
+    __len__ = qsize
+
+    def empty(self) -> bool:
+        """
+        Return True if no items are held.
+        """
+        return self._count == 0
+
+    def full(self) -> bool:
+        """
+        Return True if all slots are used.
+        """
+        return self._count == self.maxsize
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """
+        Add one item, applying the policy if the buffer is full.
+
+        Parameters
+        ----------
+        item : object
+            The item to add.
+        block : bool, optional
+            With the 'block' policy, whether to wait for a free slot, by default True.
+        timeout : float, optional
+            With the 'block' policy, maximum time to wait, by default None (forever).
+
+        Raises
+        ------
+        queue.Full
+            With the 'block' policy, if no slot became free in time.
+        """
+        if not self.put_many([item], timeout=timeout if block else 0):
+            raise queue.Full
+
+    def put_many(self, items, timeout: float = None) -> int:
+        """
+        Add a batch of items, applying the policy to the ones that do not fit.
+
+        Parameters
+        ----------
+        items : list
+            The items to add, oldest first.
+        timeout : float, optional
+            With the 'block' policy, maximum time to wait for free slots, by default None (forever).
+
+        Returns
+        -------
+        int
+            Number of items consumed from items (stored, or discarded by a drop policy).
+            Only the 'block' policy returns less than len(items), when timeout expires.
+        """
+        total = len(items)
+        if not total:
+            return 0
+        with self._lock:
+            if self.policy == 'block':
+                done = 0
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while done < total:
+                    while self._count == self.maxsize:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            return done
+                        self._not_full.wait(remaining)
+                    chunk = items[done:done + self.maxsize - self._count]
+                    self._store(chunk)
+                    done += len(chunk)
+                return total
+
+            free = self.maxsize - self._count
+            if total > free:
+                if self.policy == 'drop_newest':
+                    self.dropped += total - free
+                    items = items[:free]
+                else:
+                    if total > self.maxsize:
+                        self.dropped += total - self.maxsize
+                        items = items[total - self.maxsize:]
+                    self._discard(len(items) - free)
+            if items:
+                self._store(items)
+        return total
+
+    def get(self, block: bool = True, timeout: float = None):
+        """
+        Remove and return the oldest item.
+
+        Parameters
+        ----------
+        block : bool, optional
+            Whether to wait for an item, by default True.
+        timeout : float, optional
+            Maximum time to wait, by default None (forever).
+
+        Raises
+        ------
+        queue.Empty
+            If no item became available in time.
+        """
+        items = self.get_many(1, timeout=timeout if block else 0)
+        if not items:
+            raise queue.Empty
+        return items[0]
+
+    def get_nowait(self):
+        """
+        Remove and return the oldest item without waiting.
+        """
+        return self.get(block=False)
+
+    def get_many(self, max_items: int = None, timeout: float = None) -> list:
+        """
+        Wait until items are available, then remove and return up to max_items of them.
+
+        Parameters
+        ----------
+        max_items : int, optional
+            Maximum number of items to return, by default None (all held items).
+        timeout : float, optional
+            Maximum time to wait for the first item, by default None (forever). 0 does not wait.
+
+        Returns
+        -------
+        list
+            The items, oldest first. Empty if timeout expired.
+        """
+        with self._lock:
+            if not self._count:
+                if timeout is not None and timeout <= 0:
+                    return []
+                self._not_empty.wait_for(lambda: self._count, timeout)
+                if not self._count:
+                    return []
+
+            count = self._count if max_items is None else min(max_items, self._count)
+            head = self._head
+            end = head + count
+            slots = self._slots
+            if end <= self.maxsize:
+                items = slots[head:end]
+                slots[head:end] = [None] * count
+            else:
+                end -= self.maxsize
+                items = slots[head:] + slots[:end]
+                slots[head:] = [None] * (self.maxsize - head)
+                slots[:end] = [None] * end
+            self._head = end % self.maxsize
+            self._count -= count
+            if self.policy == 'block':
+                self._not_full.notify()
+            return items
+
+    def _store(self, items):
+        """
+        Copy items into free slots. The caller holds the lock and ensures they fit.
+        """
+        count = len(items)
+        start = (self._head + self._count) % self.maxsize
+        end = start + count
+        if end <= self.maxsize:
+            self._slots[start:end] = items
+        else:
+            split = self.maxsize - start
+            self._slots[start:] = items[:split]
+            self._slots[:end - self.maxsize] = items[split:]
+        self._count += count
+        if self._count > self.high_watermark:
+            self.high_watermark = self._count
+        self._not_empty.notify()
+
+    def _discard(self, count: int):
+        """
+        Drop the count oldest items. The caller holds the lock.
+        """
+        if count <= 0:
+            return
+        self._head = (self._head + count) % self.maxsize
+        self._count -= count
+        self.dropped += count
 
 class serial_interface:
     """
@@ -18,17 +260,38 @@ class serial_interface:
         Thread used to continuously read from the serial port.
     stop_flag : bool
         Flag used to stop the thread.
-    data_queue : queue.Queue
-        Thread-safe queue to store incoming data.
+    data_queue : RingBuffer
+        Bounded thread-safe queue to store incoming data.
     terminal : bool
         If True, print incoming data to console.
     data_index : int
         A counter for received data.
     max_queue_size : int
         Maximum size for the data_queue.
+    queue_policy : str
+        What happens when data_queue is full, see RingBuffer.
+    poll_interval : float
+        Upper bound in seconds on how long the reader blocks waiting for data,
+        and therefore on how long it takes to notice stop_flag.
+    framer : framing.Framer
+        Incremental framer splitting received chunks into records.
+    captures : list[capture.CaptureWriter]
+        Capture files receiving the raw traffic, see attach_capture.
+    listeners : list[callable]
+        Callbacks receiving every batch of records, see add_listener.
+    metrics : metrics.MetricsRegistry
+        Reader and queue metrics ('reader.*', 'queue.*').
+    traffic_log : log_init.TrafficLogger
+        Logger of the received and sent records.
+    writer : tx.SerialWriter
+        Writer thread that sends the data passed to write_to_port.
+    supervisor : connect.ReconnectSupervisor or None
+        Reopens the port if it is lost; None stops the reader instead.
     """
 
-    def __init__(self, serial_port, terminal: bool = True, max_queue_size: int = 100, format: str = 'STR', logger: logging.Logger=None):
+    def __init__(self, serial_port, terminal: bool = True, max_queue_size: int = 100, format: str = 'STR', logger: logging.Logger=None,
+                 poll_interval: float = 0.1, framer=None, queue_policy: str = 'drop_oldest', metrics: MetricsRegistry = None,
+                 traffic_log: TrafficLogger = None, writer: SerialWriter = None, supervisor=None):
         """
         Parameters
         ----------
@@ -40,44 +303,238 @@ class serial_interface:
             Maximum size for data_queue. Older data will be discarded when max is reached. Defaults to 100.
         format : str, optional
             TBD
+        poll_interval : float, optional
+            Maximum time in seconds the reader blocks while the port is idle. Defaults to 0.1.
+        framer : framing.Framer, optional
+            Framer splitting received chunks into records. Defaults to newline-terminated
+            records, with the newline kept in HEX format.
+        queue_policy : str, optional
+            'drop_oldest', 'drop_newest' or 'block' (the reader waits for the consumer). Defaults to 'drop_oldest'.
+        metrics : metrics.MetricsRegistry, optional
+            Registry to record metrics in. Defaults to a new one.
+        traffic_log : log_init.TrafficLogger, optional
+            Logger of the received and sent records. Defaults to logging every record to logger.
+        writer : tx.SerialWriter, optional
+            Writer for the port, e.g. with pacing or flow control. Defaults to an unpaced writer.
+        supervisor : connect.ReconnectSupervisor, optional
+            Reopens the port when reading fails, e.g. after a USB adapter was unplugged. The
+            data queue and data_index carry on across the reconnect. Defaults to None
+            (the reader stops).
         """
         if logger is None:
             logger = log_init()
+        if traffic_log is None:
+            traffic_log = TrafficLogger(logger=logger)
+        self.traffic_log = traffic_log
 
         self.serial_port = serial_port
         self.thread = threading.Thread(target=self.read_from_port)
         self.thread.daemon = True
         self.stop_flag = False
-        self.data_queue = queue.Queue()
+        self.data_queue = RingBuffer(max_queue_size, queue_policy)
         self.terminal = terminal
         self.data_index = 0
         self.max_queue_size = max_queue_size
+        self.queue_policy = queue_policy
         self.format = format
+        self.poll_interval = poll_interval
+        if framer is None:
+            framer = LineFramer(keep_delimiter=(format == 'HEX'))
+        self.framer = framer
+        self.captures = []
+        self.listeners = []
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+        self.metrics = metrics
+        self._bytes_received = metrics.counter('reader.bytes')
+        self._reads = metrics.counter('reader.reads')
+        self._frames_received = metrics.counter('reader.frames')
+        metrics.gauge('reader.framing_errors', lambda: self.framer.error_count)
+        metrics.gauge('queue.depth', self.data_queue.qsize)
+        metrics.gauge('queue.high_watermark', lambda: self.data_queue.high_watermark)
+        metrics.gauge('queue.dropped', lambda: self.data_queue.dropped)
+
+        if writer is None:
+            writer = SerialWriter(serial_port, metrics=metrics)
+        self.writer = writer
+
+        self.supervisor = supervisor
+        if supervisor is not None:
+            metrics.gauge('reconnect.count', lambda: supervisor.reconnects)
+            metrics.gauge('reconnect.downtime_s', lambda: supervisor.downtime)
+
         self.thread.start()
 
+    def attach_capture(self, capture):
+        """
+        Record the raw traffic of the port, as read and written, to a capture file.
+
+        Parameters
+        ----------
+        capture : capture.CaptureWriter
+            The capture writer. It is not closed by the interface.
+        """
+        self.captures = self.captures + [capture]
+
+    def detach_capture(self, capture):
+        """
+        Stop recording to a capture file attached with attach_capture.
+
+        Parameters
+        ----------
+        capture : capture.CaptureWriter
+            The capture writer.
+        """
+        self.captures = [attached for attached in self.captures if attached is not capture]
+
+    def add_listener(self, listener):
+        """
+        Call a function with every batch of received records, before they are queued.
+
+        Listeners run in the reader thread, so they must return quickly.
+
+        Parameters
+        ----------
+        listener : callable
+            Called as listener(records, received_time, first_index) with the records of a
+            batch, as put in data_queue, their receive timestamp and the data_index of the
+            first record.
+        """
+        self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        """
+        Stop calling a function added with add_listener.
+
+        Parameters
+        ----------
+        listener : callable
+            The listener.
+        """
+        self.listeners = [added for added in self.listeners if added is not listener]
+
     def read_from_port(self):
         """
         Continuously reads data from the serial port until stop_flag is set to True.
 
+        Everything pending on the port is read in one call and split into records by
+        the framer; the records of a chunk are handed to process_batch together. If the
+        port fails and a supervisor is set, reading continues on the reopened port.
+
         Parameters
         ----------
         serial_port : serial.Serial
             Instance of the serial port to read from.
         """
-        try:
-            while not self.stop_flag:
-                if self.serial_port.in_waiting:
-                    if self.format == 'STR':
-                        line = self.serial_port.readline().decode('utf-8').strip()
-                        self.process_data(line)
-                    elif self.format == 'HEX':
-                        raw_data = self.serial_port.readline()
-                        self.process_data(raw_data)
-        except Exception as e:
-            logging.ERROR(e)
-            return
+        while not self.stop_flag:
+            try:
+                self._read_until_stopped()
+            except OSError as e:
+                if self.supervisor is None:
+                    logging.error('Serial read error: %s', e)
+                    break
+                if not self._reconnect(e):
+                    break
+            except Exception as e:
+                logging.error('Serial reader stopped: %s', e)
+                break
+        self.writer.close()
         self.serial_port.close()
 
+    def _read_until_stopped(self):
+        """
+        Read, frame and queue data until stop_flag is set. Errors of the port propagate.
+        """
+        fileno = self._port_fileno()
+        while not self.stop_flag:
+            if not self._wait_for_data(fileno):
+                continue
+            chunk = self.serial_port.read(self.serial_port.in_waiting or 1)
+            if not chunk:
+                continue
+            self._reads.add()
+            self._bytes_received.add(len(chunk))
+            for capture in self.captures:
+                capture.write(chunk, direction=RX)
+            frames = self.framer.feed(chunk)
+            if not frames:
+                continue
+            self._frames_received.add(len(frames))
+            if self.format == 'STR':
+                self.process_batch([frame.decode('utf-8', 'replace').strip() for frame in frames])
+            elif self.format == 'HEX':
+                self.process_batch(frames)
+
+    def _reconnect(self, error) -> bool:
+        """
+        Wait for the supervisor to reopen the lost port and switch reading and writing to it.
+
+        Parameters
+        ----------
+        error : OSError
+            The error that ended reading.
+
+        Returns
+        -------
+        bool
+            True if the port was reopened, False if stop_flag was set while waiting.
+        """
+        logging.warning('Serial read error: %s', error)
+        self.writer.suspend('serial port lost')
+        try:
+            self.serial_port.close()
+        except OSError:
+            pass
+        serial_port = self.supervisor.reconnect(lambda: self.stop_flag)
+        if serial_port is None:
+            return False
+        self.serial_port = serial_port
+        self.writer.set_port(serial_port)
+        # A partial frame from before the disconnect would corrupt the first one after it
+        self.framer.reset()
+        return True
+
+    def _port_fileno(self):
+        """
+        Return the OS file descriptor of the serial port, or None if it cannot be waited on.
+
+        Returns
+        -------
+        int or None
+            File descriptor usable with select(), None for ports without one (e.g. Windows or loop://).
+        """
+        try:
+            return self.serial_port.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def _wait_for_data(self, fileno) -> bool:
+        """
+        Block until the serial port has pending input or poll_interval elapses.
+
+        With a file descriptor the wait happens inside select(), so an idle port costs no CPU.
+        Otherwise in_waiting is polled with short sleeps.
+
+        Parameters
+        ----------
+        fileno : int or None
+            File descriptor of the serial port, see _port_fileno.
+
+        Returns
+        -------
+        bool
+            True if data is waiting to be read.
+        """
+        if fileno is not None:
+            readable, _, _ = select.select([fileno], [], [], self.poll_interval)
+            return bool(readable)
+
+        if self.serial_port.in_waiting:
+            return True
+        time.sleep(min(self.poll_interval, 0.005))
+        return False
+
     def print_queue(self, restore_queue: bool = False):
         for _ in range(self.data_queue.qsize()):
             serial_data = self.data_queue.get()
@@ -100,27 +557,46 @@ class serial_interface:
         data : str
             The data read from the serial port.
         """
+        self.process_batch([data])
+
+    def process_batch(self, records):
+        """
+        Processes a batch of records received together by adding them to the data_queue.
+
+        All records of a batch share one receive timestamp.
 
-        logging.info('RECV: ' + str(data))
+        Parameters
+        ----------
+        records : list[str] or list[bytes]
+            The records read from the serial port, in arrival order.
+        """
+        received_time = time.time()
 
-        data_dict = {
-            'index': self.data_index, 
-            'time': time.time(), 
-            'data': data
-        }
+        self.traffic_log.received(records)
+        for listener in self.listeners:
+            listener(records, received_time, self.data_index)
 
-        if self.data_queue.qsize() >= self.max_queue_size:
-            self.data_queue.get()
+        data_dicts = []
+        for data in records:
+            data_dicts.append({
+                'index': self.data_index,
+                'time': received_time,
+                'data': data
+            })
+            self.data_index += 1
 
-        self.data_queue.put(data_dict)
-        self.data_index += 1
+        # With the 'block' policy, wait in steps so that stop_flag is still noticed
+        while data_dicts:
+            data_dicts = data_dicts[self.data_queue.put_many(data_dicts, timeout=self.poll_interval):]
+            if self.stop_flag:
+                break
 
         if self.terminal:
-            print(data)
+            print('\n'.join(str(data) for data in records))
 
     def write_to_port(self, data_str):
         """
-        Writes data to the serial port.
+        Queues data for the writer thread, which writes it to the serial port.
 
         Parameters
         ----------
@@ -128,16 +604,182 @@ class serial_interface:
             The data to write to the serial port.
         """
         if self.format == 'STR':
-            self.serial_port.write((data_str+"\n").encode())
+            data_bin = (data_str+"\n").encode()
+            self._send(data_bin)
             return
         elif self.format == 'HEX':
             try:
                 data_bin = bytes.fromhex(data_str)
-                self.serial_port.write(data_bin)
+                self._send(data_bin)
             except ValueError:
-                logging.WARNING('\'' + data_str + '\' includes non-hexadecimal number')
+                logging.warning('\'' + data_str + '\' includes non-hexadecimal number')
+
+        self.traffic_log.sent(data_str)
 
-        logging.info('SENT: ' + data_str)
+    def _send(self, data: bytes):
+        try:
+            self.writer.send(data)
+        except ConnectionError as e:
+            logging.warning('Not sent: %s', e)
+            return
+        self._record_sent(data)
+
+    def _record_sent(self, data: bytes):
+        for capture in self.captures:
+            capture.write(data, direction=TX)
+
+class MultiPortInterface:
+    """
+    Class for reading from several serial ports in one thread driven by a selector.
+
+    All ports are registered with a single selectors.DefaultSelector, so one thread
+    services every port and CPU use scales with traffic rather than with the number
+    of ports. Each port has its own framer and data queue, and every record is
+    tagged with the id of the port it came from.
+
+    Attributes
+    ----------
+    ports : dict[str, serial.Serial]
+        Open ports by port id (the device name).
+    framers : dict[str, framing.Framer]
+        Framer of each port.
+    data_queues : dict[str, RingBuffer]
+        Bounded thread-safe queue of received records of each port.
+    data_index : dict[str, int]
+        A counter for received records of each port.
+    thread : threading.Thread
+        Thread running the selector loop.
+    stop_flag : bool
+        Flag used to stop the thread.
+    max_queue_size : int
+        Maximum size of each data queue.
+    poll_interval : float
+        Upper bound in seconds on how long the selector blocks, and therefore on how
+        long it takes to notice stop_flag.
+    """
+
+    def __init__(self, serial_ports, format: str = 'STR', max_queue_size: int = 100, framers: dict = None,
+                 poll_interval: float = 0.1, queue_policy: str = 'drop_oldest'):
+        """
+        Parameters
+        ----------
+        serial_ports : list[serial.Serial]
+            Opened ports with file descriptors, e.g. from port_manager.open_ports().
+        format : str, optional
+            Data format of all ports, 'STR' or 'HEX'. Defaults to 'STR'.
+        max_queue_size : int, optional
+            Maximum size of each data queue. Older data will be discarded when max is reached. Defaults to 100.
+        framers : dict[str, framing.Framer], optional
+            Framer for some or all port ids. Other ports use newline-terminated records.
+        poll_interval : float, optional
+            Maximum time in seconds the selector blocks while all ports are idle. Defaults to 0.1.
+        queue_policy : str, optional
+            'drop_oldest' or 'drop_newest', see RingBuffer. 'block' is not supported because one
+            slow consumer would stall every port. Defaults to 'drop_oldest'.
+        """
+        if queue_policy == 'block':
+            raise ValueError("MultiPortInterface does not support the 'block' queue policy")
+        framers = framers or {}
+        self.format = format
+        self.max_queue_size = max_queue_size
+        self.poll_interval = poll_interval
+        self.ports = {}
+        self.framers = {}
+        self.data_queues = {}
+        self.data_index = {}
+        self.selector = selectors.DefaultSelector()
+
+        for serial_port in serial_ports:
+            port_id = serial_port.port
+            self.ports[port_id] = serial_port
+            self.framers[port_id] = framers.get(port_id) or LineFramer(keep_delimiter=(format == 'HEX'))
+            self.data_queues[port_id] = RingBuffer(max_queue_size, queue_policy)
+            self.data_index[port_id] = 0
+            self.selector.register(serial_port.fileno(), selectors.EVENT_READ, port_id)
+
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self.read_from_ports)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def read_from_ports(self):
+        """
+        Services all ports until stop_flag is set to True, then closes them.
+        """
+        while not self.stop_flag:
+            for key, _ in self.selector.select(self.poll_interval):
+                self._read_port(key)
+        self.selector.close()
+        for serial_port in self.ports.values():
+            serial_port.close()
+
+    def _read_port(self, key):
+        """
+        Read everything pending on the port of a selector key and queue the completed records.
+        """
+        port_id = key.data
+        serial_port = self.ports[port_id]
+        try:
+            chunk = serial_port.read(serial_port.in_waiting or 1)
+        except OSError as e:
+            logging.error('Error reading %s: %s', port_id, e)
+            self.selector.unregister(key.fileobj)
+            return
+
+        frames = self.framers[port_id].feed(chunk)
+        if not frames:
+            return
+        if self.format == 'STR':
+            frames = [frame.decode('utf-8', 'replace').strip() for frame in frames]
+        self.process_batch(port_id, frames)
+
+    def process_batch(self, port_id, records):
+        """
+        Adds a batch of records received together on one port to its data queue.
+
+        Parameters
+        ----------
+        port_id : str
+            Id of the port the records came from.
+        records : list[str] or list[bytes]
+            The records read from the port, in arrival order.
+        """
+        received_time = time.time()
+        index = self.data_index[port_id]
+        self.data_queues[port_id].put_many([
+            {'port': port_id, 'index': index + offset, 'time': received_time, 'data': data}
+            for offset, data in enumerate(records)
+        ])
+        self.data_index[port_id] = index + len(records)
+
+    def write_to_port(self, port_id, data_str):
+        """
+        Writes data to one of the serial ports.
+
+        Parameters
+        ----------
+        port_id : str
+            Id of the port to write to.
+        data_str : str
+            The data to write, hexadecimal in HEX format.
+        """
+        if self.format == 'STR':
+            self.ports[port_id].write((data_str + "\n").encode())
+        elif self.format == 'HEX':
+            try:
+                self.ports[port_id].write(bytes.fromhex(data_str))
+            except ValueError:
+                logging.warning('\'' + data_str + '\' includes non-hexadecimal number')
+                return
+
+        logging.info('SENT(%s): %s', port_id, data_str)
+
+    def stop(self):
+        """
+        Stops the selector thread and waits for it to close the ports.
+        """
+        self.stop_flag = True
+        self.thread.join()
 
 def serial_monitor_cli(interactive: bool = True):
     """
@@ -1,10 +1,17 @@
 from datetime import datetime
+import atexit
 import logging
-import coloredlogs
+import logging.handlers
+import queue
+import threading
+import time
 import sys
 import os
 
-def log_init(file_log: bool = True, console_log_level: int = logging.WARNING, file_log_level: int = logging.INFO):
+_queue_listener = None
+
+def log_init(file_log: bool = True, console_log_level: int = logging.WARNING, file_log_level: int = logging.INFO,
+             async_file: bool = False):
     """
     Function to initialize the logger. Sets up the logger to output different log levels
     to stdout and a log file.
@@ -17,17 +24,27 @@ def log_init(file_log: bool = True, console_log_level: int = logging.WARNING, fi
         The logging level for console output, by default logging.WARNING.
     file_log_level : int, optional
         The logging level for file output, by default logging.INFO.
+    async_file : bool, optional
+        If True, records for the log file are passed through a queue and formatted and
+        written by a listener thread, so logging threads never wait for the disk.
+        By default False.
 
     Returns
     -------
     logging.RootLogger
         The initialized logger.
     """
+    global _queue_listener
+
     # Create and configure root logger
     logger = logging.getLogger()
     logger.handlers = []  # Clearing existing handlers
     logger.propagate = False  # Ensuring that logs don't propagate to avoid duplication
 
+    if _queue_listener is not None:
+        _queue_listener.stop()  # Flushes the records of a previous async setup
+        _queue_listener = None
+
     log_levels = [console_log_level]
 
     # Console handler
@@ -49,14 +66,192 @@ def log_init(file_log: bool = True, console_log_level: int = logging.WARNING, fi
         handler_file = logging.FileHandler(log_file_path)
         handler_file.setFormatter(logging.Formatter('%(asctime)s : %(levelname)s : %(message)s', datefmt='%Y/%m/%d %H:%M:%S'))
         handler_file.setLevel(file_log_level)
-        logger.addHandler(handler_file)
+
+        if async_file:
+            log_queue = queue.SimpleQueue()
+            handler_queue = _DeferredQueueHandler(log_queue)
+            handler_queue.setLevel(file_log_level)
+            logger.addHandler(handler_queue)
+            _queue_listener = logging.handlers.QueueListener(log_queue, handler_file, respect_handler_level=True)
+            _queue_listener.start()
+        else:
+            logger.addHandler(handler_file)
 
         log_levels.append(file_log_level)
 
     logger.setLevel(min(log_levels))
 
     # Enable colored logs for console output
+    import coloredlogs  # Imported here because it is slow to import and only needed for setup
     coloredlogs.install(level=console_log_level, logger=logger)
 
     logger.info("Logger setup done.")
-    return logger
\ No newline at end of file
+    return logger
+
+def log_shutdown():
+    """
+    Stop the listener thread of an async_file setup, writing out the records still queued.
+
+    Called automatically at interpreter exit.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+atexit.register(log_shutdown)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats every record on the logging thread so that it can
+    be pickled. The queue here stays in-process, so the record is passed unchanged.
+    """
+
+    def prepare(self, record):
+        return record
+
+class TrafficLogger:
+    """
+    Logs the records received from and sent to a serial port, lazily and optionally thinned out.
+
+    Nothing is formatted unless the logger is enabled for the level, and messages use
+    %-style arguments so the text is only built by a handler that writes it.
+
+    Modes
+    -----
+    'all'
+        Log every record.
+    'batch'
+        Log every record, but one log entry per received batch with one line per record.
+        Much cheaper than 'all' at high line rates; the text is only joined by the handler.
+    'sample'
+        Log one record in sample_every.
+    'rate'
+        Log at most max_per_second records per second (with a one second burst), and
+        report how many were skipped.
+    'off'
+        Log nothing.
+
+    Attributes
+    ----------
+    mode : str
+        One of MODES.
+    sample_every : int
+        Sampling period in 'sample' mode.
+    max_per_second : int
+        Rate limit in 'rate' mode.
+    level : int
+        Logging level of the traffic messages.
+    skipped : int
+        Number of records not logged because of sampling or rate limiting.
+    """
+
+    MODES = ('all', 'batch', 'sample', 'rate', 'off')
+
+    def __init__(self, mode: str = 'all', sample_every: int = 100, max_per_second: int = 100,
+                 logger: logging.Logger = None, level: int = logging.INFO):
+        """
+        Parameters
+        ----------
+        mode : str, optional
+            'all', 'batch', 'sample', 'rate' or 'off', by default 'all'.
+        sample_every : int, optional
+            Sampling period in 'sample' mode, by default 100.
+        max_per_second : int, optional
+            Rate limit in 'rate' mode, by default 100.
+        logger : logging.Logger, optional
+            Logger to write to, by default the root logger.
+        level : int, optional
+            Logging level of the traffic messages, by default logging.INFO.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f'mode must be one of {self.MODES}, got {mode!r}')
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+        self.max_per_second = max_per_second
+        self.logger = logger if logger is not None else logging.getLogger()
+        self.level = level
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._seen = {}
+        self._unreported = {}
+        self._tokens = float(max_per_second)
+        self._last_refill = time.monotonic()
+
+    def received(self, records):
+        """
+        Log a batch of received records as 'RECV: <data>'.
+
+        Parameters
+        ----------
+        records : list[str] or list[bytes]
+            The received records.
+        """
+        self._log('RECV', records)
+
+    def sent(self, data, prefix: str = 'SENT'):
+        """
+        Log one sent record as '<prefix>: <data>'.
+
+        Parameters
+        ----------
+        data : str or bytes
+            The sent data.
+        prefix : str, optional
+            Message prefix, by default 'SENT'.
+        """
+        self._log(prefix, (data,))
+
+    def _log(self, prefix: str, records):
+        if self.mode == 'off' or not records or not self.logger.isEnabledFor(self.level):
+            return
+        if self.mode == 'all':
+            for data in records:
+                self.logger.log(self.level, '%s: %s', prefix, data)
+            return
+        if self.mode == 'batch':
+            self.logger.log(self.level, '%s', _TrafficLines(prefix, records))
+            return
+
+        with self._lock:
+            if self.mode == 'sample':
+                seen = self._seen.get(prefix, 0)
+                selected = records[(-seen) % self.sample_every::self.sample_every]
+                self._seen[prefix] = seen + len(records)
+            else:
+                now = time.monotonic()
+                rate = self.max_per_second
+                self._tokens = min(float(rate), self._tokens + (now - self._last_refill) * rate)
+                self._last_refill = now
+                selected = records[:max(0, int(self._tokens))]
+                self._tokens -= len(selected)
+            skipped = len(records) - len(selected)
+            self.skipped += skipped
+            # Skipped records are reported with the next record that gets logged
+            unreported = self._unreported.get(prefix, 0)
+            if selected:
+                self._unreported[prefix] = skipped
+            else:
+                self._unreported[prefix] = unreported + skipped
+
+        if self.mode == 'rate' and selected and unreported:
+            self.logger.log(self.level, '%s: %d records not logged', prefix, unreported)
+        for data in selected:
+            self.logger.log(self.level, '%s: %s', prefix, data)
+
+class _TrafficLines:
+    """
+    Log message argument that joins a batch of records into lines only when formatted.
+    """
+
+    __slots__ = ('prefix', 'records')
+
+    def __init__(self, prefix, records):
+        self.prefix = prefix
+        self.records = records
+
+    def __str__(self):
+        prefix = self.prefix + ': '
+        return '\n'.join(prefix + str(data) for data in self.records)
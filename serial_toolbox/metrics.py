@@ -0,0 +1,332 @@
+"""
+Lightweight pipeline metrics: counters, gauges and log-bucket histograms.
+"""
+import logging
+import math
+import threading
+import time
+
+
+class Counter:
+    """
+    Monotonic count, e.g. of bytes or lines.
+
+    Updates are a plain integer addition without a lock. Each counter is meant to be
+    updated by a single thread; readers may see a slightly stale value.
+
+    Attributes
+    ----------
+    value : int
+        Current count.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def add(self, amount: int = 1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """
+    Current level of something, e.g. a queue depth.
+
+    A gauge either holds the last value passed to set(), or calls a function when it
+    is read, which costs nothing on the hot path.
+
+    Attributes
+    ----------
+    function : callable or None
+        Called without arguments to read the value.
+    value : float
+        Last value passed to set().
+    """
+
+    def __init__(self, function=None):
+        self.function = function
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+
+class Histogram:
+    """
+    Distribution of values, e.g. latencies, in logarithmic buckets.
+
+    Each power of two is split into SUBBUCKETS buckets, so percentiles are accurate
+    to within about 12%. Recording a value is a frexp() and a list increment.
+
+    Attributes
+    ----------
+    count : int
+        Number of recorded values.
+    total : float
+        Sum of the recorded values.
+    min : float
+        Smallest recorded value.
+    max : float
+        Largest recorded value.
+    counts : list[int]
+        Number of values per bucket.
+    """
+
+    SUBBUCKETS = 4
+    MIN_EXPONENT = -20
+    MAX_EXPONENT = 40
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.counts = [0] * ((self.MAX_EXPONENT - self.MIN_EXPONENT) * self.SUBBUCKETS + 1)
+
+    def record(self, value: float):
+        """
+        Add one value.
+        """
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_many(self, values):
+        """
+        Add an array of values with vectorized bucketing.
+        """
+        import numpy as np  # Only needed by callers that already use numpy
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+        mantissas, exponents = np.frexp(values)
+        buckets = (exponents - self.MIN_EXPONENT) * self.SUBBUCKETS + ((mantissas - 0.5) * 2 * self.SUBBUCKETS).astype(int)
+        buckets = np.clip(buckets, 1, len(self.counts) - 1)
+        buckets[values <= 0] = 0
+        for bucket, count in zip(*np.unique(buckets, return_counts=True)):
+            self.counts[bucket] += int(count)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def percentile(self, percent: float) -> float:
+        """
+        Return an estimate of the given percentile: the upper bound of the bucket it falls in.
+
+        Parameters
+        ----------
+        percent : float
+            Percentile between 0 and 100.
+
+        Returns
+        -------
+        float
+            The estimate, or NaN if nothing was recorded.
+        """
+        if not self.count:
+            return math.nan
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return min(max(self._upper_bound(bucket), self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+    def _bucket(self, value: float) -> int:
+        if value <= 0:
+            return 0
+        mantissa, exponent = math.frexp(value)
+        bucket = (exponent - self.MIN_EXPONENT) * self.SUBBUCKETS + int((mantissa - 0.5) * 2 * self.SUBBUCKETS)
+        return min(max(bucket, 1), len(self.counts) - 1)
+
+    def _upper_bound(self, bucket: int) -> float:
+        if bucket == 0:
+            return 0.0
+        exponent, subbucket = divmod(bucket, self.SUBBUCKETS)
+        return math.ldexp(0.5 + (subbucket + 1) / (2 * self.SUBBUCKETS), exponent + self.MIN_EXPONENT)
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics with snapshot and periodic logging.
+
+    Metric names are dotted by pipeline stage, e.g. 'reader.bytes' or 'latency.print_ms'.
+
+    Examples
+    --------
+    >>> metrics = MetricsRegistry()
+    >>> lines = metrics.counter('reader.lines')
+    >>> lines.add(10)
+    >>> metrics.gauge('queue.depth', data_queue.qsize)
+    >>> metrics.snapshot()['reader.lines']
+    10
+
+    Attributes
+    ----------
+    metrics : dict[str, Counter or Gauge or Histogram]
+        The registered metrics by name.
+    started : float
+        time.monotonic() at creation, used for rates.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._log_thread = None
+        self._log_stop = threading.Event()
+
+    def counter(self, name: str) -> Counter:
+        """
+        Return the counter with this name, creating it if needed.
+        """
+        return self._get(name, Counter)
+
+    def gauge(self, name: str, function=None) -> Gauge:
+        """
+        Return the gauge with this name, creating it if needed.
+
+        Parameters
+        ----------
+        name : str
+            Metric name.
+        function : callable, optional
+            Called to read the value, e.g. a queue's qsize method. Replaces the previous one.
+        """
+        gauge = self._get(name, Gauge)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name: str) -> Histogram:
+        """
+        Return the histogram with this name, creating it if needed.
+        """
+        return self._get(name, Histogram)
+
+    def snapshot(self) -> dict:
+        """
+        Return the current value of every metric.
+
+        Returns
+        -------
+        dict
+            Metric name to value: an int for counters, a number for gauges and a dict of
+            count, mean, min, p50, p90, p99 and max for histograms. 'uptime' holds the
+            seconds since the registry was created.
+        """
+        with self._lock:
+            metrics = list(self.metrics.items())
+        snapshot = {'uptime': time.monotonic() - self.started}
+        for name, metric in sorted(metrics):
+            snapshot[name] = metric.snapshot()
+        return snapshot
+
+    def format(self, snapshot: dict = None) -> str:
+        """
+        Format a snapshot as one metric per line, with average rates for counters.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        uptime = snapshot['uptime']
+        lines = [f'uptime {uptime:.1f} s']
+        for name, value in snapshot.items():
+            if name == 'uptime':
+                continue
+            if isinstance(value, dict):
+                if value['count']:
+                    lines.append(f"{name} count={value['count']} p50={value['p50']:.3g} p90={value['p90']:.3g} "
+                                 f"p99={value['p99']:.3g} max={value['max']:.3g}")
+                else:
+                    lines.append(f'{name} count=0')
+            elif isinstance(self.metrics.get(name), Counter) and uptime > 0:
+                lines.append(f'{name} {value} ({value / uptime:.1f}/s)')
+            else:
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines)
+
+    def format_line(self, snapshot: dict = None) -> str:
+        """
+        Format a snapshot on a single line, for the log.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        fields = []
+        for name, value in snapshot.items():
+            if name == 'uptime':
+                continue
+            if isinstance(value, dict):
+                if value['count']:
+                    fields.append(f"{name}=p50:{value['p50']:.3g}/p99:{value['p99']:.3g}/n:{value['count']}")
+            else:
+                fields.append(f'{name}={value}')
+        return ' '.join(fields)
+
+    def start_logging(self, interval: float, logger: logging.Logger = None):
+        """
+        Log a one-line snapshot at INFO level every interval seconds from a background thread.
+
+        Parameters
+        ----------
+        interval : float
+            Seconds between log lines.
+        logger : logging.Logger, optional
+            Logger to use, by default the root logger.
+        """
+        if logger is None:
+            logger = logging.getLogger()
+        self.stop_logging()
+        self._log_stop.clear()
+
+        def run():
+            while not self._log_stop.wait(interval):
+                logger.info('STATS: %s', self.format_line())
+
+        self._log_thread = threading.Thread(target=run)
+        self._log_thread.daemon = True
+        self._log_thread.start()
+
+    def stop_logging(self):
+        """
+        Stop the periodic log line started with start_logging.
+        """
+        if self._log_thread is not None:
+            self._log_stop.set()
+            self._log_thread.join()
+            self._log_thread = None
+
+    def _get(self, name: str, kind):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.setdefault(name, kind())
+        if not isinstance(metric, kind):
+            raise TypeError(f"metric '{name}' is a {type(metric).__name__}, not a {kind.__name__}")
+        return metric
@@ -1,10 +1,46 @@
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, Optional
+
+class FramingConfig(BaseModel):
+    type: Literal['raw', 'line', 'delimiter', 'fixed', 'length_prefixed', 'slip', 'cobs'] = 'line'
+    delimiter: str = '0a'
+    length: int = 0
+    prefix_size: Literal[1, 2, 4] = 1
+    byteorder: Literal['big', 'little'] = 'big'
+    length_includes_prefix: bool = False
+    max_length: int = 65536
+    crc: Literal['none', 'crc16-ccitt', 'crc32'] = 'none'
+    crc_byteorder: Literal['big', 'little'] = 'big'
 
 class Config(BaseModel):
+    port: Optional[str] = None
     baudrate: int
     timeout: float
     format: Literal['STR', 'HEX']
     plotting: bool
     print_numbers: bool
-    window_size: int
\ No newline at end of file
+    window_size: int
+    plot_decimation: Literal['none', 'minmax', 'lttb'] = 'minmax'
+    max_print_rate: int = 1000
+    max_print_pending: int = 10000
+    max_queue_size: int = 1000
+    queue_policy: Literal['drop_oldest', 'drop_newest', 'block'] = 'drop_oldest'
+    stats_interval: float = 10.0
+    async_log: bool = True
+    traffic_log: Literal['all', 'batch', 'sample', 'rate', 'off'] = 'all'
+    traffic_log_sample_every: int = 100
+    traffic_log_max_rate: int = 100
+    flow_control: Literal['none', 'rtscts', 'xonxoff'] = 'none'
+    tx_inter_byte_delay: float = 0.0
+    tx_inter_line_delay: float = 0.0
+    transaction_timeout: float = 1.0
+    max_in_flight: int = 4
+    reconnect: bool = True
+    history_max_mb: float = 64.0
+    export_rotate_mb: float = 0.0
+    export_rotate_seconds: float = 0.0
+    process_pipeline: bool = False
+    process_ring_mb: float = 16.0
+    trigger_pre: int = 500
+    trigger_post: int = 500
+    framing: Optional[FramingConfig] = None
@@ -0,0 +1,119 @@
+"""
+Bounded, rate-limited output of received lines to the terminal.
+"""
+import collections
+import threading
+import time
+
+
+class TerminalOutput:
+    """
+    Thread-safe buffer of lines waiting to be printed, drained in one write per tick.
+
+    The buffer holds at most max_pending lines; when it is full the oldest lines are
+    dropped. On each flush, at most max_lines_per_second lines (averaged with a one
+    second burst allowance) are written, keeping the most recent ones. Dropped lines
+    are reported with a single "N lines suppressed" summary.
+
+    Attributes
+    ----------
+    max_pending : int
+        Maximum number of lines waiting to be printed.
+    max_lines_per_second : int
+        Maximum sustained number of lines written per second.
+    written : int
+        Total number of lines written.
+    suppressed : int
+        Total number of lines dropped, by overflow or rate limiting.
+    """
+
+    def __init__(self, max_pending: int = 10000, max_lines_per_second: int = 1000):
+        """
+        Parameters
+        ----------
+        max_pending : int, optional
+            Maximum number of lines waiting to be printed, by default 10000.
+        max_lines_per_second : int, optional
+            Maximum sustained number of lines written per second, by default 1000.
+        """
+        self.max_pending = max_pending
+        self.max_lines_per_second = max_lines_per_second
+        self.written = 0
+        self.suppressed = 0
+        self._lines = collections.deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._unreported = 0
+        self._tokens = float(max_lines_per_second)
+        self._last_flush = time.monotonic()
+
+    def put(self, line: str):
+        """
+        Add one line to be printed.
+
+        Parameters
+        ----------
+        line : str
+            The line, without a trailing newline.
+        """
+        with self._lock:
+            if len(self._lines) == self.max_pending:
+                self._unreported += 1
+            self._lines.append(line)
+
+    def put_many(self, lines):
+        """
+        Add several lines to be printed.
+
+        Parameters
+        ----------
+        lines : list[str]
+            The lines, without trailing newlines.
+        """
+        if not lines:
+            return
+        with self._lock:
+            overflow = len(self._lines) + len(lines) - self.max_pending
+            if overflow > 0:
+                self._unreported += overflow
+            self._lines.extend(lines)
+
+    def qsize(self) -> int:
+        """
+        Return the number of lines waiting to be printed.
+        """
+        return len(self._lines)
+
+    def drain(self) -> str:
+        """
+        Take all pending lines that fit the rate limit and return them as one string.
+
+        Returns
+        -------
+        str
+            The text to write, newline-terminated, or an empty string if there is nothing to print.
+        """
+        now = time.monotonic()
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            unreported = self._unreported
+            self._unreported = 0
+
+        rate = self.max_lines_per_second
+        self._tokens = min(float(rate), self._tokens + (now - self._last_flush) * rate)
+        self._last_flush = now
+
+        budget = int(self._tokens)
+        if len(lines) > budget:
+            unreported += len(lines) - budget
+            lines = lines[len(lines) - budget:] if budget > 0 else []
+        self._tokens -= len(lines)
+
+        if unreported:
+            self.suppressed += unreported
+            lines.insert(0, f'... {unreported} lines suppressed')
+        self.written += len(lines) - (1 if unreported else 0)
+
+        if not lines:
+            return ''
+        return '\n'.join(lines) + '\n'
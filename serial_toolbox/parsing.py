@@ -0,0 +1,92 @@
+"""
+Batch parsing of received text lines into numeric channel values.
+"""
+import itertools
+import re
+
+import numpy as np
+
+_NUMBER = r'[ \t]*[-+]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|nan|inf|infinity)[ \t]*'
+NUMERIC_ROW = re.compile(f'{_NUMBER}(?:,{_NUMBER})*', re.IGNORECASE)
+"""Pattern matching a line of comma-separated numbers."""
+
+# A character that cannot appear in plain decimal numbers. Searching for these is much
+# cheaper than matching NUMERIC_ROW on every line.
+_SUSPECT_CHARACTER = re.compile(r'[^0-9.,+\-eE \t\n]')
+
+
+def parse_numeric_batch(lines):
+    """
+    Parse the comma-separated numeric lines of a batch in one vectorized pass.
+
+    A batch made only of numeric rows with the same number of columns is parsed with a
+    single numpy.loadtxt call. Otherwise lines with non-numeric characters are located
+    with one regular expression scan over the joined batch and checked individually,
+    and the remaining rows are parsed together, grouped by column count if needed.
+    Rows with fewer columns than the widest row are padded with NaN.
+
+    Parameters
+    ----------
+    lines : list[str]
+        The received lines, stripped of surrounding whitespace.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        Array of shape (numeric rows x channels) with the parsed values, in line order.
+    numeric : numpy.ndarray
+        Boolean array with one entry per line, True for the lines parsed into values.
+    """
+    numeric = np.fromiter(map(bool, lines), dtype=bool, count=len(lines))
+    if not numeric.any():
+        return np.empty((0, 0)), numeric
+
+    if numeric.all():
+        try:
+            return _loadtxt(lines), numeric
+        except ValueError:
+            pass
+
+    text = '\n'.join(lines)
+    index = 0
+    position = 0
+    while True:
+        match = _SUSPECT_CHARACTER.search(text, position)
+        if match is None:
+            break
+        index += text.count('\n', position, match.start())
+        numeric[index] = NUMERIC_ROW.fullmatch(lines[index]) is not None
+        position = text.find('\n', match.start()) + 1
+        if position == 0:
+            break
+        index += 1
+
+    rows = list(itertools.compress(lines, numeric))
+    if not rows:
+        return np.empty((0, 0)), numeric
+    try:
+        return _loadtxt(rows), numeric
+    except ValueError:
+        pass
+
+    # Malformed rows made of numeric characters, or rows of different widths.
+    indices = np.flatnonzero(numeric)
+    valid = np.fromiter((NUMERIC_ROW.fullmatch(row) is not None for row in rows), dtype=bool, count=len(rows))
+    numeric[indices[~valid]] = False
+    rows = list(itertools.compress(rows, valid))
+    if not rows:
+        return np.empty((0, 0)), numeric
+
+    widths = np.fromiter((row.count(',') + 1 for row in rows), dtype=np.intp, count=len(rows))
+    values = np.full((len(rows), int(widths.max())), np.nan)
+    for width in np.unique(widths):
+        selected = np.flatnonzero(widths == width)
+        values[selected, :width] = _loadtxt([rows[i] for i in selected])
+    return values, numeric
+
+
+def _loadtxt(rows) -> np.ndarray:
+    """
+    Parse comma-separated rows with the same number of columns into a 2-D array.
+    """
+    return np.loadtxt(rows, delimiter=',', comments=None, ndmin=2, dtype=np.float64)
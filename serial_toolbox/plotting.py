@@ -0,0 +1,187 @@
+"""
+Incremental matplotlib rendering of plot traces.
+"""
+import numpy as np
+
+from .decimate import make_decimator
+
+
+class TracePlot:
+    """
+    Renders traces into a matplotlib axes with persistent Line2D artists.
+
+    The lines are created once per channel and updated with set_data(). On backends
+    that support blitting, the lines are animated: a full redraw happens only when the
+    axes limits change, and other frames restore the cached background and redraw the
+    lines alone. The axes are rescaled only when data leaves the current limits.
+
+    Long traces are decimated to about the pixel width of the axes before drawing,
+    so the frame time does not grow with window_size.
+
+    Attributes
+    ----------
+    figure : matplotlib.figure.Figure
+        The figure holding the axes.
+    ax : matplotlib.axes.Axes
+        The axes the traces are drawn into.
+    lines : list of matplotlib.lines.Line2D
+        One line per channel.
+    window_size : int
+        Maximum number of samples per trace, used to bound the x limits.
+    decimator : decimate.Decimator or None
+        Reduces the traces before drawing, None to draw every sample.
+    """
+
+    def __init__(self, figure, ax, window_size: int, decimation: str = 'minmax', max_points: int = None):
+        """
+        Parameters
+        ----------
+        figure : matplotlib.figure.Figure
+            The figure holding the axes.
+        ax : matplotlib.axes.Axes
+            The axes to draw into.
+        window_size : int
+            Maximum number of samples per trace.
+        decimation : str, optional
+            'minmax', 'lttb' or 'none', see decimate.make_decimator. Defaults to 'minmax'.
+        max_points : int, optional
+            Points per trace after decimation. Defaults to following the axes width in pixels.
+        """
+        self.figure = figure
+        self.ax = ax
+        self.lines = []
+        self.window_size = window_size
+        self.decimator = make_decimator(decimation, max_points or 2000)
+        self._auto_points = max_points is None
+        self.blit = figure.canvas.supports_blit
+        self._background = None
+        self._has_data_limits = False
+        self._x = np.arange(0)
+        figure.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def update(self, traces, total: int = None):
+        """
+        Draw a new frame.
+
+        Parameters
+        ----------
+        traces : numpy.ndarray
+            Samples of shape (channels x samples). It must not be modified by other
+            threads while drawing, e.g. a snapshot copied under a lock.
+        total : int, optional
+            Samples appended since the buffer was created, see reduce.
+        """
+        x, y = self.reduce(traces, total)
+        self.draw(x, y, traces.shape[1])
+
+    def reduce(self, traces, total: int = None) -> tuple:
+        """
+        Decimate the traces, or copy them if decimation is off.
+
+        The result does not share memory with traces, so traces can be a view into a
+        buffer that is only locked during this call.
+
+        Parameters
+        ----------
+        traces : numpy.ndarray
+            Samples of shape (channels x samples).
+        total : int, optional
+            Samples appended since the buffer was created, e.g. TraceBuffer.total, which
+            lets the decimator reuse the buckets of the previous frame.
+
+        Returns
+        -------
+        tuple[numpy.ndarray, numpy.ndarray]
+            x positions, shared by all channels (1-D) or per channel (2-D), and y values
+            of shape (channels x points).
+        """
+        if self.decimator is None:
+            samples = traces.shape[1]
+            if len(self._x) < samples:
+                self._x = np.arange(max(samples, min(2 * len(self._x), self.window_size)))
+            return self._x[:samples], traces.copy()
+        if self._auto_points:
+            # One bucket per pixel column; min/max decimation keeps two points per bucket
+            self.decimator.max_points = self.decimator.points_per_bucket * max(int(self.ax.bbox.width), 100)
+        return self.decimator.decimate(traces, total)
+
+    def draw(self, x, y, samples: int):
+        """
+        Draw a frame from the output of reduce.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            x positions, 1-D or one row per channel.
+        y : numpy.ndarray
+            y values, one row per channel.
+        samples : int
+            Number of samples in the window, used for the x limits.
+        """
+        redraw = self._sync_lines(y.shape[0])
+
+        for index, (line, trace) in enumerate(zip(self.lines, y)):
+            line.set_data(x if x.ndim == 1 else x[index], trace)
+
+        redraw = self._update_limits(y, samples) or redraw
+
+        canvas = self.figure.canvas
+        if redraw or not self.blit or self._background is None:
+            canvas.draw_idle()
+        else:
+            canvas.restore_region(self._background)
+            self._draw_lines()
+            canvas.blit(self.ax.bbox)
+        canvas.flush_events()
+
+    def _sync_lines(self, channels: int) -> bool:
+        """
+        Create lines for new channels. Returns True if any were added.
+        """
+        if len(self.lines) >= channels:
+            return False
+        while len(self.lines) < channels:
+            line, = self.ax.plot([], [], animated=self.blit)
+            self.lines.append(line)
+        return True
+
+    def _update_limits(self, traces, samples: int) -> bool:
+        """
+        Expand the axes limits if the data left them. Returns True if they changed.
+        """
+        changed = False
+
+        x_low, x_high = self.ax.get_xlim()
+        if samples - 1 > x_high:
+            self.ax.set_xlim(0, max(min(2 * samples, self.window_size) - 1, 1))
+            changed = True
+
+        if traces.size and np.isfinite(traces).any():
+            y_min = float(np.nanmin(traces))
+            y_max = float(np.nanmax(traces))
+            y_low, y_high = self.ax.get_ylim()
+            if not self._has_data_limits or y_min < y_low or y_max > y_high:
+                if self._has_data_limits:
+                    low, high = min(y_min, y_low), max(y_max, y_high)
+                else:
+                    low, high = y_min, y_max
+                margin = 0.1 * (high - low) or 1.0
+                self.ax.set_ylim(low - margin, high + margin)
+                self._has_data_limits = True
+                changed = True
+
+        return changed
+
+    def _on_draw(self, event):
+        """
+        Cache the background after a full redraw and draw the animated lines on top.
+        """
+        if not self.blit:
+            return
+        canvas = self.figure.canvas
+        self._background = canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.lines:
+            self.ax.draw_artist(line)
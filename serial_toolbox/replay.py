@@ -0,0 +1,228 @@
+"""
+Replay of recorded capture files through a pseudo-terminal.
+"""
+import errno
+import os
+import select
+import threading
+import time
+import tty
+
+import serial
+
+from .capture import CaptureReader, RX
+
+
+class CaptureReplay:
+    """
+    Plays the received traffic of a capture file back through a pseudo-terminal.
+
+    open() returns a serial.Serial on the slave side of a pty pair, which can be passed
+    to serial_interface or SerialMonitor in place of a real port. A background thread
+    writes the recorded RX records to the master side at their original timing scaled
+    by speed, or as fast as the reader accepts them. Data written to the port by the
+    application is read and discarded, so writes never block.
+
+    POSIX only.
+
+    Examples
+    --------
+    >>> with CaptureReplay('session.cap', speed=10) as replay:
+    ...     interface = serial_interface(replay.open(), terminal=False)
+    ...     replay.wait()
+
+    Attributes
+    ----------
+    path : str
+        Path of the capture file.
+    speed : float or None
+        Playback speed relative to the recording, e.g. 2.0 for twice as fast.
+        None replays as fast as possible.
+    start_time : float or None
+        Timestamp of the first record to replay.
+    end_time : float or None
+        Timestamp of the last record to replay.
+    loop : bool
+        If True, the replay restarts from the beginning when it reaches the end.
+    records_sent : int
+        Number of records written to the port so far.
+    bytes_sent : int
+        Number of bytes written to the port so far.
+    bytes_received : int
+        Number of bytes written by the application and discarded.
+    finished : threading.Event
+        Set when the replay has reached the end (with loop, only if the range holds no RX records) or was closed.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, start_time: float = None, end_time: float = None,
+                 loop: bool = False):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the capture file.
+        speed : float or None, optional
+            Playback speed relative to the recording, by default 1.0 (original timing).
+            None or 0 replays as fast as possible.
+        start_time : float, optional
+            Timestamp of the first record to replay, by default the start of the capture.
+        end_time : float, optional
+            Timestamp of the last record to replay, by default the end of the capture.
+        loop : bool, optional
+            If True, restart from the beginning at the end, by default False.
+        """
+        if speed is not None and speed < 0:
+            raise ValueError(f'speed must be positive, got {speed}')
+        self.path = path
+        self.speed = speed or None
+        self.start_time = start_time
+        self.end_time = end_time
+        self.loop = loop
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.finished = threading.Event()
+
+        self.reader = CaptureReader(path)
+        self.thread = None
+        self._master_fd = None
+        self._stop = threading.Event()
+
+    def open(self, baudrate: int = 115200, timeout: float = 0.1) -> serial.Serial:
+        """
+        Create the pseudo-terminal pair and start the replay.
+
+        Parameters
+        ----------
+        baudrate : int, optional
+            Baudrate configured on the returned port, by default 115200. The pty does not
+            throttle to it; only the recorded timing and speed do.
+        timeout : float, optional
+            Read timeout of the returned port, by default 0.1.
+
+        Returns
+        -------
+        serial.Serial
+            Open port on the slave side of the pty.
+        """
+        master_fd, slave_fd = os.openpty()
+        tty.setraw(master_fd)
+        port = serial.Serial(os.ttyname(slave_fd), baudrate=baudrate, timeout=timeout)
+        os.close(slave_fd)
+        self._master_fd = master_fd
+
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+        return port
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until the replay has reached the end.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds, by default None (wait forever).
+
+        Returns
+        -------
+        bool
+            True if the replay finished, False on timeout.
+        """
+        return self.finished.wait(timeout)
+
+    def close(self):
+        """
+        Stop the replay and close the pty and the capture file.
+
+        The port returned by open() reports an error on its next read after this,
+        like a disconnected device.
+        """
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self._master_fd is not None:
+            os.close(self._master_fd)
+            self._master_fd = None
+        self.reader.close()
+        self.finished.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                # Nothing to replay in the range: looping would only spin
+                if not self._play() or not self.loop:
+                    break
+        except OSError as e:
+            if e.errno != errno.EIO:  # EIO: the application closed the port
+                raise
+        finally:
+            self.finished.set()
+        # Keep discarding what the application writes until close()
+        while not self._stop.is_set():
+            self._discard_input(0.1)
+
+    def _play(self) -> int:
+        """
+        Send the RX records of the range once, returning the number of records sent.
+        """
+        sent = 0
+        first_time = None
+        started = time.monotonic()
+        for record in self.reader.records(self.start_time, self.end_time, direction=RX):
+            if first_time is None:
+                first_time = record.time
+            if self.speed is not None:
+                deadline = started + (record.time - first_time) / self.speed
+                while not self._stop.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._discard_input(remaining)
+            if not self._write(record.data):
+                return sent
+            sent += 1
+            self.records_sent += 1
+            self.bytes_sent += len(record.data)
+        return sent
+
+    def _write(self, data: bytes) -> bool:
+        """
+        Write data to the master side, discarding input while the pty buffer is full.
+
+        Returns
+        -------
+        bool
+            False if the replay was stopped before all data was written.
+        """
+        view = memoryview(data)
+        while view:
+            if self._stop.is_set():
+                return False
+            readable, writable, _ = select.select([self._master_fd], [self._master_fd], [], 0.1)
+            if readable:
+                self._read_input()
+            if writable:
+                view = view[os.write(self._master_fd, view):]
+        return True
+
+    def _discard_input(self, timeout: float):
+        readable, _, _ = select.select([self._master_fd], [], [], min(timeout, 0.1))
+        if readable:
+            self._read_input()
+
+    def _read_input(self):
+        try:
+            self.bytes_received += len(os.read(self._master_fd, 65536))
+        except OSError as e:
+            if e.errno != errno.EIO:
+                raise
+            time.sleep(0.1)  # The slave side is closed; avoid spinning on select
@@ -0,0 +1,725 @@
+"""
+Process-based receive pipeline connected by shared-memory rings.
+
+With serial_interface, reading, framing, parsing, printing and plotting share one
+interpreter, so at high rates parsing competes with rendering for the GIL.
+ProcessInterface moves the first stages to other processes:
+
+    reader process   owns the port, writes raw chunks to the raw ring and
+                     sends the bytes received on the TX pipe
+    parser process   frames, decodes and parses the chunks and writes the
+                     records and their channel values to the result ring
+    consumer thread  turns result messages into ParsedBatch objects for the
+                     monitor, the listeners and the traffic log
+
+Both rings are single-producer single-consumer byte rings in
+multiprocessing.shared_memory. Messages are copied in and out as raw bytes and
+arrays are rebuilt with numpy.frombuffer, so nothing is pickled. The reader never
+waits: a chunk that does not fit in the raw ring is dropped and counted.
+
+Requires a POSIX system, as the reader process waits on the port and the TX pipe
+with select().
+"""
+import collections
+import logging
+import multiprocessing
+import platform
+import select
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .framing import make_framer
+from .interface_core import RingBuffer
+from .log_init import log_init, TrafficLogger
+from .metrics import MetricsRegistry
+from .parsing import parse_numeric_batch
+
+ParsedBatch = collections.namedtuple('ParsedBatch', ['time', 'first_index', 'records', 'values', 'numeric'])
+ParsedBatch.__doc__ = """
+Records received together, as framed and parsed by the parser process.
+
+time is the receive timestamp and first_index the data_index of the first record.
+records are str in STR format and bytes in HEX format. values holds the channel
+values of the numeric records (rows x channels) and numeric marks them, one entry
+per record, as returned by parsing.parse_numeric_batch.
+"""
+
+_RESULT_HEADER = struct.Struct('<dqIIII')  # time, first index, records, value rows, channels, arena bytes
+_TIME = struct.Struct('<d')
+_LENGTH = struct.Struct('<I')
+_WRAP = 0xFFFFFFFF
+
+TX_CHUNK = 65536
+"""Largest message sent to the reader process on the TX pipe."""
+
+_ORDERED_STORES = platform.machine().lower() in ('x86_64', 'amd64', 'i386', 'i686', 'x86')
+"""True where stores become visible to other processes in program order (x86 TSO)."""
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class ShmRing:
+    """
+    Single-producer single-consumer ring of byte messages in shared memory.
+
+    The first 128 bytes hold two cache lines of 64-bit counters: the producer's
+    (write position, capacity, dropped messages, messages and bytes put, closed
+    flag) and the consumer's (read position). Positions only grow; a message is a 4-byte length
+    followed by the payload, padded to 8 bytes, and never wraps around the end of
+    the ring: a marker sends the consumer back to the start instead.
+
+    The payload is written before the write position is published, and read before
+    the read position is. On x86, aligned 64-bit stores are atomic and seen in program
+    order by the other process, so the positions are plain loads and stores. Elsewhere,
+    e.g. on aarch64, stores may become visible out of order, so every load and store
+    of a position goes through a shared multiprocessing lock, whose acquire and
+    release order the payload accesses around them.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block, to attach from another process.
+    capacity : int
+        Size of the message area in bytes.
+    lock : multiprocessing.synchronize.Lock or None
+        Lock ordering the position updates, None on x86. Pass it to attaching processes.
+    """
+
+    HEADER_SIZE = 128
+    _WRITE, _CAPACITY, _DROPPED, _MESSAGES, _BYTES, _CLOSED = 0, 1, 2, 3, 4, 5
+    _READ = 8
+
+    def __init__(self, size: int = 16 << 20, name: str = None, lock=None):
+        """
+        Parameters
+        ----------
+        size : int, optional
+            Size of the message area of a new ring in bytes, by default 16 MiB.
+        name : str, optional
+            Name of an existing ring to attach to, by default None (create one). The
+            attaching process must be started by the creator with multiprocessing.
+        lock : multiprocessing.synchronize.Lock, optional
+            The lock attribute of the ring attached to, passed to the attaching process.
+        """
+        self._owner = name is None
+        if self._owner and not _ORDERED_STORES:
+            lock = multiprocessing.get_context('spawn').Lock()
+        self.lock = lock
+        if self._owner:
+            size = _align(size)
+            self._shm = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + size)
+        elif sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name, track=False)
+        else:
+            # Processes started by multiprocessing share the creator's resource tracker,
+            # where the block is already registered, so attaching adds nothing to it
+            self._shm = shared_memory.SharedMemory(name)
+        self.name = self._shm.name
+        self._buffer = self._shm.buf
+        self._header = self._buffer[:self.HEADER_SIZE].cast('Q')
+        if self._owner:
+            self._header[self._CAPACITY] = size
+        self.capacity = self._header[self._CAPACITY]
+
+    @property
+    def dropped(self) -> int:
+        """
+        Number of messages the producer dropped because the ring was full.
+        """
+        return self._header[self._DROPPED]
+
+    @property
+    def messages_put(self) -> int:
+        """
+        Number of messages put.
+        """
+        return self._header[self._MESSAGES]
+
+    @property
+    def bytes_put(self) -> int:
+        """
+        Total payload bytes of the messages put.
+        """
+        return self._header[self._BYTES]
+
+    @property
+    def pending(self) -> int:
+        """
+        Bytes waiting for the consumer, including message headers and padding.
+        """
+        return self._load(self._WRITE) - self._load(self._READ)
+
+    @property
+    def max_message_size(self) -> int:
+        """
+        Largest message put accepts, in bytes: a padded message may take half the ring.
+        """
+        return (self.capacity // 2 & ~7) - _LENGTH.size
+
+    @property
+    def closed(self) -> bool:
+        """
+        True once the producer has called close_writer.
+        """
+        return bool(self._load(self._CLOSED))
+
+    def put(self, *parts, timeout: float = 0.0) -> bool:
+        """
+        Append one message made of the concatenated parts.
+
+        Parameters
+        ----------
+        *parts : bytes-like
+            The parts of the message.
+        timeout : float, optional
+            Time to wait for space in seconds, by default 0 (drop at once).
+
+        Returns
+        -------
+        bool
+            False if the message was dropped because the ring stayed full.
+        """
+        length = sum(len(part) for part in parts)
+        size = _align(_LENGTH.size + length)
+        capacity = self.capacity
+        if length > self.max_message_size:
+            raise ValueError(f'message of {length} bytes does not fit in a ring of {capacity} bytes')
+        header = self._header
+        write = header[self._WRITE]
+        offset = write % capacity
+        skip = capacity - offset if capacity - offset < size else 0
+        if write + skip + size - self._load(self._READ) > capacity:
+            if not _wait(lambda: write + skip + size - self._load(self._READ) <= capacity, timeout):
+                header[self._DROPPED] += 1
+                return False
+        buffer = self._buffer
+        if skip:
+            _LENGTH.pack_into(buffer, self.HEADER_SIZE + offset, _WRAP)
+            offset = 0
+        position = self.HEADER_SIZE + offset
+        _LENGTH.pack_into(buffer, position, length)
+        position += _LENGTH.size
+        for part in parts:
+            buffer[position:position + len(part)] = part
+            position += len(part)
+        header[self._MESSAGES] += 1
+        header[self._BYTES] += length
+        self._store(self._WRITE, write + skip + size)
+        return True
+
+    def get(self, timeout: float = 0.0) -> bytes:
+        """
+        Remove and return the oldest message.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time to wait for a message in seconds, by default 0.
+
+        Returns
+        -------
+        bytes or None
+            A copy of the message, None if there was none.
+        """
+        read = self._header[self._READ]
+        if read == self._load(self._WRITE):
+            if not _wait(lambda: read != self._load(self._WRITE), timeout):
+                return None
+        offset = read % self.capacity
+        length = _LENGTH.unpack_from(self._buffer, self.HEADER_SIZE + offset)[0]
+        if length == _WRAP:
+            read += self.capacity - offset
+            offset = 0
+            length = _LENGTH.unpack_from(self._buffer, self.HEADER_SIZE)[0]
+        start = self.HEADER_SIZE + offset + _LENGTH.size
+        message = bytes(self._buffer[start:start + length])
+        self._store(self._READ, read + _align(_LENGTH.size + length))
+        return message
+
+    def close_writer(self):
+        """
+        Mark the ring as finished, so the consumer stops once it is empty.
+        """
+        self._store(self._CLOSED, 1)
+
+    def _load(self, index: int) -> int:
+        if self.lock is None:
+            return self._header[index]
+        with self.lock:
+            return self._header[index]
+
+    def _store(self, index: int, value: int):
+        if self.lock is None:
+            self._header[index] = value
+        else:
+            with self.lock:
+                self._header[index] = value
+
+    def close(self):
+        """
+        Detach from the ring, and free it in the process that created it.
+        """
+        if self._header is None:
+            return
+        self._header.release()
+        self._header = None
+        self._buffer = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _wait(ready, timeout: float) -> bool:
+    """
+    Poll ready() with a growing sleep, from 50 us to 2 ms, until it returns True or timeout elapses.
+    """
+    if timeout is not None and timeout <= 0:
+        return ready()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 5e-5
+    while not ready():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 2e-3)
+    return True
+
+
+def _reader_main(device: str, baudrate: int, timeout: float, raw_name: str, raw_lock, tx_connection, stop,
+                 writer_options: dict, max_chunk: int, errors):
+    """
+    Entry point of the reader process: read the port into the raw ring and write what arrives on the TX pipe.
+    """
+    import serial
+    from .tx import SerialWriter
+
+    raw = ShmRing(name=raw_name, lock=raw_lock)
+    port = writer = None
+    try:
+        port = serial.Serial(device, baudrate=baudrate, timeout=timeout)
+        writer = SerialWriter(port, **writer_options)
+        fileno, tx_fileno = port.fileno(), tx_connection.fileno()
+        while not stop.is_set():
+            waited = [fileno]
+            if writer.pending <= writer.max_pending_bytes - TX_CHUNK:
+                waited.append(tx_fileno)
+            readable, _, _ = select.select(waited, [], [], 0.1)
+            if tx_fileno in readable:
+                try:
+                    writer.send(tx_connection.recv_bytes())
+                except EOFError:
+                    break
+                except ConnectionError as e:
+                    errors.put((logging.WARNING, f'Not sent: {e}'))
+            if fileno in readable:
+                chunk = port.read(min(port.in_waiting or 1, max_chunk))
+                if chunk:
+                    raw.put(_TIME.pack(time.time()), chunk)
+    except Exception as e:
+        errors.put((logging.ERROR, f'Serial reader process stopped: {e}'))
+    finally:
+        raw.close_writer()
+        if writer is not None:
+            writer.close()
+        if port is not None:
+            port.close()
+        raw.close()
+
+
+def _parser_main(raw_name: str, raw_lock, result_name: str, result_lock, format: str, framing: dict, stop,
+                 errors):
+    """
+    Entry point of the parser process: frame and parse raw chunks into result messages.
+    """
+    raw = ShmRing(name=raw_name, lock=raw_lock)
+    results = ShmRing(name=result_name, lock=result_lock)
+    framer = make_framer(**(framing or {}), format=format)
+    index = 0
+    try:
+        while True:
+            message = raw.get(timeout=0.1)
+            if message is None:
+                if raw.closed or stop.is_set():
+                    break
+                continue
+            frames = framer.feed(message[_TIME.size:])
+            if not frames:
+                continue
+            received_time = _TIME.unpack_from(message)[0]
+            if format == 'STR':
+                records = [frame.decode('utf-8', 'replace').strip() for frame in frames]
+            else:
+                records = frames
+            if not _put_records(results, received_time, index, records, format, stop, errors):
+                return
+            index += len(records)
+    except Exception as e:
+        errors.put((logging.ERROR, f'Parser process stopped: {e!r}'))
+        raise
+    finally:
+        results.close_writer()
+        raw.close()
+        results.close()
+
+
+def _put_records(results: ShmRing, received_time: float, index: int, records: list, format: str, stop,
+                 errors, parse: bool = True) -> bool:
+    """
+    Parse records and write them to the result ring, waiting for space.
+
+    A batch whose message does not fit in the ring, e.g. many short lines of a large
+    chunk, is split in halves, each parsed for its own number of channels. A single
+    record that is still too large is sent without values, or dropped if even its
+    text does not fit.
+
+    Returns
+    -------
+    bool
+        False if stop was set while waiting for space.
+    """
+    if format == 'STR' and parse:
+        values, numeric = parse_numeric_batch(records)
+        arena = ''.join(records).encode('utf-8')
+    else:
+        values, numeric = np.empty((0, 0)), np.zeros(len(records), dtype=bool)
+        arena = ''.join(records).encode('utf-8') if format == 'STR' else b''.join(records)
+    count = len(records)
+    size = _RESULT_HEADER.size + 8 * (count + 1) + _align(count) + 8 * values.size + len(arena)
+    if size > results.max_message_size:
+        if count > 1:
+            half = count // 2
+            return (_put_records(results, received_time, index, records[:half], format, stop, errors)
+                    and _put_records(results, received_time, index + half, records[half:], format, stop, errors))
+        if parse and values.size:
+            errors.put((logging.WARNING, f'Values of record {index} do not fit in the result ring, sent as text'))
+            return _put_records(results, received_time, index, records, format, stop, errors, parse=False)
+        errors.put((logging.WARNING, f'Record {index} of {len(arena)} bytes does not fit in the result ring, dropped'))
+        return True
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([len(record) for record in records], out=offsets[1:])
+    mask = numeric.astype(np.uint8).tobytes().ljust(_align(count), b'\0')
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    header = _RESULT_HEADER.pack(received_time, index, count, values.shape[0], values.shape[1], len(arena))
+    while not results.put(header, offsets.tobytes(), mask, values.tobytes(), arena, timeout=0.1):
+        if stop.is_set():
+            return False
+    return True
+
+
+def decode_result(message: bytes, format: str = 'STR') -> ParsedBatch:
+    """
+    Rebuild a ParsedBatch from a result message of the parser process.
+
+    Parameters
+    ----------
+    message : bytes
+        The message, as returned by ShmRing.get.
+    format : str, optional
+        'STR' or 'HEX', by default 'STR'.
+
+    Returns
+    -------
+    ParsedBatch
+        The batch. Its arrays are read-only views of message.
+    """
+    received_time, first_index, count, rows, channels, arena_size = _RESULT_HEADER.unpack_from(message)
+    position = _RESULT_HEADER.size
+    offsets = np.frombuffer(message, np.int64, count + 1, position).tolist()
+    position += 8 * (count + 1)
+    numeric = np.frombuffer(message, np.bool_, count, position)
+    position += _align(count)
+    values = np.frombuffer(message, np.float64, rows * channels, position).reshape(rows, channels)
+    position += 8 * rows * channels
+    arena = message[position:position + arena_size]
+    if format == 'STR':
+        arena = arena.decode('utf-8')
+    records = [arena[start:end] for start, end in zip(offsets, offsets[1:])]
+    return ParsedBatch(received_time, first_index, records, values, numeric)
+
+
+class _PipeWriter:
+    """
+    Sends data to the reader process, with the send and send_file methods of tx.SerialWriter.
+
+    Pacing and flow control are applied by the SerialWriter in the reader process.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    def send(self, data: bytes, timeout: float = None) -> int:
+        """
+        Pass data to the reader process, blocking while the pipe is full.
+
+        Raises
+        ------
+        ConnectionError
+            If the reader process is gone.
+        """
+        view = memoryview(data)
+        with self._lock:
+            if self._connection.closed:
+                raise ConnectionError('serial reader process stopped')
+            for start in range(0, len(view), TX_CHUNK):
+                self._connection.send_bytes(view[start:start + TX_CHUNK])
+        return len(view)
+
+    def send_file(self, path: str, progress=None, chunk_size: int = TX_CHUNK) -> dict:
+        """
+        Pass the contents of a file to the reader process, see tx.SerialWriter.send_file.
+        """
+        sent = 0
+        started = time.monotonic()
+        with open(path, 'rb') as file:
+            total = file.seek(0, 2)
+            file.seek(0)
+            while True:
+                chunk = file.read(min(chunk_size, TX_CHUNK))
+                if not chunk:
+                    break
+                sent += self.send(chunk)
+                if progress is not None:
+                    progress(sent, total)
+        elapsed = time.monotonic() - started
+        return {'bytes': sent, 'elapsed': elapsed, 'rate': sent / elapsed if elapsed > 0 else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ProcessInterface:
+    """
+    Receives from a serial port through a reader and a parser process.
+
+    It offers the parts of serial_interface that SerialMonitor, TransactionEngine,
+    SampleStore and the numeric Exporter formats use, except that received records
+    are queued as ParsedBatch objects in parsed_batches instead of record dicts in
+    data_queue, with the numbers already parsed. Raw captures are not available,
+    as the raw bytes stay in the reader process. Errors of the processes, and
+    their unexpected exits, are logged from the consumer thread.
+
+    Attributes
+    ----------
+    device : str
+        Device path of the port, reopened by the reader process.
+    format : str
+        'STR' or 'HEX'.
+    parsed_batches : RingBuffer
+        Bounded queue of ParsedBatch objects.
+    data_index : int
+        Number of records received.
+    listeners : list[callable]
+        Callbacks receiving every batch of records, see add_listener.
+    metrics : metrics.MetricsRegistry
+        Pipeline metrics ('reader.*', 'queue.*', 'pipeline.*').
+    traffic_log : log_init.TrafficLogger
+        Logger of the received and sent records.
+    writer : object
+        Sends data to the reader process, with the send and send_file methods of tx.SerialWriter.
+    thread : threading.Thread
+        Consumer thread reading the result ring.
+    stop_flag : bool
+        Set by stop.
+    """
+
+    def __init__(self, serial_port, max_queue_size: int = 100, format: str = 'STR', logger: logging.Logger = None,
+                 framing: dict = None, queue_policy: str = 'drop_oldest', metrics: MetricsRegistry = None,
+                 traffic_log: TrafficLogger = None, ring_size: int = 16 << 20, writer_options: dict = None,
+                 max_chunk: int = 65536):
+        """
+        Parameters
+        ----------
+        serial_port : serial.Serial
+            An open serial port. It is closed here and reopened with the same device,
+            baudrate and timeout by the reader process.
+        max_queue_size : int, optional
+            Maximum number of batches in parsed_batches, by default 100.
+        format : str, optional
+            'STR' or 'HEX', by default 'STR'.
+        logger : logging.Logger, optional
+            Logger for the default traffic log.
+        framing : dict, optional
+            Arguments of framing.make_framer, e.g. models.FramingConfig.model_dump(). By default
+            newline-terminated records.
+        queue_policy : str, optional
+            What happens when parsed_batches is full, see RingBuffer. By default 'drop_oldest'.
+        metrics : metrics.MetricsRegistry, optional
+            Registry to record metrics in. Defaults to a new one.
+        traffic_log : log_init.TrafficLogger, optional
+            Logger of the received and sent records. Defaults to logging every record to logger.
+        ring_size : int, optional
+            Size of each shared-memory ring in bytes, by default 16 MiB.
+        writer_options : dict, optional
+            Keyword arguments of the tx.SerialWriter in the reader process, e.g. flow_control.
+        max_chunk : int, optional
+            Largest chunk read from the port at once, by default 64 KiB.
+        """
+        if traffic_log is None:
+            traffic_log = TrafficLogger(logger=logger if logger is not None else log_init())
+        self.traffic_log = traffic_log
+        if metrics is None:
+            metrics = MetricsRegistry()
+        self.metrics = metrics
+        self.format = format
+        self.device = serial_port.port
+        self.parsed_batches = RingBuffer(max_queue_size, queue_policy)
+        self.data_index = 0
+        self.listeners = []
+        self.stop_flag = False
+
+        ring_size = max(ring_size, 4 * max_chunk)
+        self._raw = ShmRing(ring_size)
+        self._results = ShmRing(ring_size)
+        # Raw messages are a timestamp followed by the chunk read
+        metrics.gauge('reader.bytes', lambda: self._raw.bytes_put - _TIME.size * self._raw.messages_put)
+        metrics.gauge('reader.reads', lambda: self._raw.messages_put)
+        metrics.gauge('pipeline.raw_dropped', lambda: self._raw.dropped)
+        metrics.gauge('pipeline.raw_pending_bytes', lambda: self._raw.pending)
+        metrics.gauge('pipeline.result_pending_bytes', lambda: self._results.pending)
+        metrics.gauge('queue.depth', self.parsed_batches.qsize)
+        metrics.gauge('queue.high_watermark', lambda: self.parsed_batches.high_watermark)
+        metrics.gauge('queue.dropped', lambda: self.parsed_batches.dropped)
+
+        # spawn, as forking a process with the UI and logging threads running is unsafe
+        context = multiprocessing.get_context('spawn')
+        self._stop = context.Event()
+        self._errors = context.SimpleQueue()  # Messages of the processes, logged by the consumer thread
+        tx_receiver, tx_sender = context.Pipe(duplex=False)
+        self.writer = _PipeWriter(tx_sender)
+        baudrate, timeout = serial_port.baudrate, serial_port.timeout
+        serial_port.close()
+        self.reader = context.Process(
+            target=_reader_main, name='serial-reader', daemon=True,
+            args=(self.device, baudrate, timeout, self._raw.name, self._raw.lock, tx_receiver, self._stop,
+                  writer_options or {}, max_chunk, self._errors))
+        self.parser = context.Process(
+            target=_parser_main, name='serial-parser', daemon=True,
+            args=(self._raw.name, self._raw.lock, self._results.name, self._results.lock, format, framing,
+                  self._stop, self._errors))
+        self.reader.start()
+        self.parser.start()
+        tx_receiver.close()
+
+        self.thread = threading.Thread(target=self._consume)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add_listener(self, listener):
+        """
+        Call a function with every batch of records received, see serial_interface.add_listener.
+
+        Listeners run in the consumer thread.
+        """
+        self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        """
+        Stop calling a function added with add_listener.
+        """
+        self.listeners = [added for added in self.listeners if added is not listener]
+
+    def attach_capture(self, capture):
+        """
+        Not supported: the raw received bytes stay in the reader process.
+
+        Raises
+        ------
+        ValueError
+            Always.
+        """
+        raise ValueError('raw captures need the in-process reader, disable process_pipeline')
+
+    def detach_capture(self, capture):
+        pass
+
+    def write_to_port(self, data_str):
+        """
+        Sends data to the port through the reader process, see serial_interface.write_to_port.
+
+        Parameters
+        ----------
+        data_str : str
+            The data to write, hexadecimal in HEX format.
+        """
+        if self.format == 'STR':
+            data_bin = (data_str + "\n").encode()
+        else:
+            try:
+                data_bin = bytes.fromhex(data_str)
+            except ValueError:
+                logging.warning('\'' + data_str + '\' includes non-hexadecimal number')
+                return
+        try:
+            self.writer.send(data_bin)
+        except ConnectionError as e:
+            logging.warning('Not sent: %s', e)
+            return
+        self.traffic_log.sent(data_str)
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Stop the processes and the consumer thread and free the rings.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time to wait for each process to exit before terminating it, by default 2.0.
+        """
+        if self.stop_flag:
+            return
+        self._stop.set()
+        self.writer.close()
+        for process in (self.reader, self.parser):
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.stop_flag = True
+        self.thread.join()
+        self._raw.close()
+        self._results.close()
+
+    def _consume(self):
+        exited = set()  # Processes whose unexpected exit was reported
+        while not self.stop_flag:
+            message = self._results.get(timeout=0.1)
+            if message is not None:
+                self._publish(decode_result(message, self.format))
+                continue
+            self._log_errors()
+            if self._results.closed and not self._results.pending:
+                break
+            for process in (self.reader, self.parser):
+                # A process that was killed exits without closing its ring
+                if process.exitcode not in (None, 0) and process not in exited and not self._stop.is_set():
+                    logging.error('%s process exited with code %s', process.name, process.exitcode)
+                    exited.add(process)
+            if self.parser in exited:
+                break
+        self._log_errors()
+
+    def _log_errors(self):
+        """
+        Log the messages sent by the reader and parser processes.
+        """
+        while not self._errors.empty():
+            logging.log(*self._errors.get())
+
+    def _publish(self, batch: ParsedBatch):
+        self.traffic_log.received(batch.records)
+        for listener in self.listeners:
+            listener(batch.records, batch.time, batch.first_index)
+        self.data_index = batch.first_index + len(batch.records)
+        # With the 'block' policy, wait in steps so that stop_flag is still noticed
+        while not self.parsed_batches.put_many([batch], timeout=0.1):
+            if self.stop_flag or self._stop.is_set():
+                break
@@ -0,0 +1,397 @@
+"""
+Columnar in-memory history of received records with time range queries.
+"""
+import bisect
+import threading
+
+import numpy as np
+
+from .parsing import parse_numeric_batch
+
+
+class SampleWindow:
+    """
+    Records returned by a SampleStore query, as columns.
+
+    Attributes
+    ----------
+    time : numpy.ndarray
+        Receive timestamps (float64), non-decreasing.
+    index : numpy.ndarray
+        data_index of each record (int64).
+    values : numpy.ndarray
+        Numeric values of shape (records x channels), NaN where a record had none.
+    arena : bytes
+        Raw payloads of all records, concatenated.
+    offsets : numpy.ndarray
+        Start of each payload in arena, plus the end of the last one (int64, records + 1).
+    """
+
+    def __init__(self, time, index, values, arena, offsets):
+        self.time = time
+        self.index = index
+        self.values = values
+        self.arena = arena
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def payload(self, row: int) -> bytes:
+        """
+        Return the raw payload of one record.
+        """
+        return self.arena[self.offsets[row]:self.offsets[row + 1]]
+
+    def payloads(self) -> list:
+        """
+        Return the raw payloads of all records.
+        """
+        arena = self.arena
+        offsets = self.offsets.tolist()
+        return [arena[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+class _Chunk:
+    """
+    Preallocated columns for up to capacity records, and a byte arena for their payloads.
+    """
+
+    def __init__(self, capacity: int, channels: int):
+        self.capacity = capacity
+        self.size = 0
+        self.time = np.empty(capacity, dtype=np.float64)
+        self.index = np.empty(capacity, dtype=np.int64)
+        self.values = np.full((capacity, channels), np.nan)
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.arena = bytearray()
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + self.index.nbytes + self.values.nbytes + self.offsets.nbytes + len(self.arena)
+
+    def grow_channels(self, channels: int):
+        extra = np.full((self.capacity, channels - self.values.shape[1]), np.nan)
+        self.values = np.hstack((self.values, extra))
+
+    def add(self, times, indices, values, lengths, arena) -> None:
+        """
+        Append rows that fit in the chunk. lengths are the payload lengths and arena their concatenation.
+        """
+        start, end = self.size, self.size + len(times)
+        self.time[start:end] = times
+        self.index[start:end] = indices
+        if values is not None:
+            self.values[start:end, :values.shape[1]] = values
+        self.offsets[start + 1:end + 1] = self.offsets[start] + np.cumsum(lengths)
+        self.arena += arena
+        self.size = end
+
+    def slice(self, start: int, end: int, channels: int) -> tuple:
+        """
+        Copy rows start to end, with values padded to channels and offsets starting at 0.
+        """
+        values = self.values[start:end]
+        if values.shape[1] < channels:
+            values = np.hstack((values, np.full((end - start, channels - values.shape[1]), np.nan)))
+        else:
+            values = values.copy()
+        base = self.offsets[start]
+        return (self.time[start:end].copy(), self.index[start:end].copy(), values,
+                bytes(self.arena[base:self.offsets[end]]), self.offsets[start:end + 1] - base)
+
+
+class SampleStore:
+    """
+    Retains received records in chunked columns within a memory budget.
+
+    Each chunk holds chunk_size records as NumPy arrays of timestamps, data indices
+    and channel values, plus one byte arena with the raw payloads, addressed by an
+    offset array. When the store exceeds max_bytes, the oldest chunks are evicted
+    whole. Timestamps are kept non-decreasing, so window() finds the first chunk by
+    bisecting the chunk start times and the rows within it with searchsorted, instead
+    of scanning.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Memory budget for the stored columns and payloads.
+    chunk_size : int
+        Records per chunk.
+    parse_numbers : bool
+        Whether add_records parses text records into channel values.
+    keep_payloads : bool
+        Whether add_records stores the raw payloads.
+    rows : int
+        Number of records held.
+    evicted_rows : int
+        Number of records evicted to stay within max_bytes.
+    channels : int
+        Number of value columns.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, chunk_size: int = 16384, parse_numbers: bool = True,
+                 keep_payloads: bool = True):
+        """
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Memory budget in bytes, by default 64 MiB. At least one chunk is always kept.
+        chunk_size : int, optional
+            Records per chunk, by default 16384.
+        parse_numbers : bool, optional
+            Parse comma-separated numeric text records into channel values, by default True.
+        keep_payloads : bool, optional
+            Store the raw payload of every record, by default True.
+        """
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be positive')
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.parse_numbers = parse_numbers
+        self.keep_payloads = keep_payloads
+        self.rows = 0
+        self.evicted_rows = 0
+        self.channels = 0
+        self._chunks = []
+        self._first_times = []  # Timestamp of the first record of each chunk, for bisect
+        self._full_nbytes = 0  # Memory of all chunks but the last, which no longer change
+        self._last_time = -np.inf
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the stored columns and payloads, in bytes.
+        """
+        return self._full_nbytes + (self._chunks[-1].nbytes if self._chunks else 0)
+
+    def attach(self, interface):
+        """
+        Store every batch of records received by a serial_interface.
+
+        Parameters
+        ----------
+        interface : serial_interface
+            The interface. Its reader thread calls add_records.
+        """
+        interface.add_listener(self.add_records)
+
+    def detach(self, interface):
+        """
+        Stop storing the records of an interface.
+        """
+        interface.remove_listener(self.add_records)
+
+    def add_records(self, records, received_time: float, first_index: int):
+        """
+        Store a batch of records, as passed to serial_interface listeners.
+
+        Parameters
+        ----------
+        records : list[str] or list[bytes]
+            The records, text in STR format and bytes in HEX format.
+        received_time : float
+            Receive timestamp of the batch.
+        first_index : int
+            data_index of the first record.
+        """
+        if self.parse_numbers and records and isinstance(records[0], str):
+            values, numeric = parse_numeric_batch(records)
+        else:
+            values, numeric = None, None
+        self.add_parsed(records, values, numeric, received_time, first_index)
+
+    def add_parsed(self, records, values, numeric, received_time: float, first_index: int):
+        """
+        Store a batch of records whose numeric values were already parsed.
+
+        Lets a consumer that parses every batch anyway, such as the serial monitor,
+        fill the store without parsing the records a second time.
+
+        Parameters
+        ----------
+        records : list[str] or list[bytes]
+            The records, text in STR format and bytes in HEX format.
+        values : numpy.ndarray or None
+            Values of the numeric records (numeric rows x channels), as returned by
+            parsing.parse_numeric_batch, or None if there are none.
+        numeric : numpy.ndarray or None
+            Boolean mask of the numeric records, one entry per record.
+        received_time : float
+            Receive timestamp of the batch.
+        first_index : int
+            data_index of the first record.
+        """
+        count = len(records)
+        if not count:
+            return
+        columns = None
+        if values is not None and len(values):
+            columns = np.full((count, values.shape[1]), np.nan)
+            columns[numeric] = values
+        payloads = None
+        if self.keep_payloads:
+            payloads = [record.encode() for record in records] if isinstance(records[0], str) else records
+        self.add(np.full(count, received_time), np.arange(first_index, first_index + count), columns, payloads)
+
+    def add(self, times, indices, values=None, payloads=None):
+        """
+        Store records given as columns.
+
+        Parameters
+        ----------
+        times : array_like
+            Timestamps. Values below the latest stored timestamp are raised to it, so that
+            the store stays sorted even if the clock steps back.
+        indices : array_like
+            data_index of each record.
+        values : array_like, optional
+            Channel values of shape (records x channels), by default None (all NaN).
+        payloads : list[bytes], optional
+            Raw payload of each record, by default None (empty payloads).
+        """
+        times = np.maximum.accumulate(np.maximum(np.asarray(times, dtype=np.float64), self._last_time))
+        indices = np.asarray(indices, dtype=np.int64)
+        count = len(times)
+        if not count:
+            return
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)
+            if values.ndim == 1:
+                values = values[:, None]
+        if payloads is not None:
+            lengths = np.fromiter(map(len, payloads), dtype=np.int64, count=count)
+            payload_offsets = np.concatenate(([0], np.cumsum(lengths)))
+            arena = b''.join(payloads)
+        else:
+            lengths = np.zeros(count, dtype=np.int64)
+            payload_offsets = np.zeros(count + 1, dtype=np.int64)
+            arena = b''
+
+        with self._lock:
+            if values is not None and values.shape[1] > self.channels:
+                self.channels = values.shape[1]
+            done = 0
+            while done < count:
+                chunk = self._chunks[-1] if self._chunks else None
+                if chunk is None or chunk.size == chunk.capacity:
+                    if chunk is not None:
+                        self._full_nbytes += chunk.nbytes
+                    chunk = _Chunk(self.chunk_size, self.channels)
+                    self._chunks.append(chunk)
+                    self._first_times.append(float(times[done]))
+                elif chunk.values.shape[1] < self.channels:
+                    chunk.grow_channels(self.channels)
+                end = min(count, done + chunk.capacity - chunk.size)
+                chunk.add(times[done:end], indices[done:end], None if values is None else values[done:end],
+                          lengths[done:end], arena[payload_offsets[done]:payload_offsets[end]])
+                done = end
+            self.rows += count
+            self._last_time = float(times[-1])
+            self._evict()
+
+    def window(self, t0: float = None, t1: float = None) -> SampleWindow:
+        """
+        Return the records received from t0 up to, but not including, t1.
+
+        Parameters
+        ----------
+        t0 : float, optional
+            Start time, as time.time(), by default None (the oldest record).
+        t1 : float, optional
+            End time, by default None (the newest record included).
+
+        Returns
+        -------
+        SampleWindow
+            Copies of the matching records.
+        """
+        with self._lock:
+            first = 0
+            if t0 is not None:
+                # The last chunk starting at or before t0 may hold records from t0 on
+                first = max(bisect.bisect_right(self._first_times, t0) - 1, 0)
+            parts = []
+            for position in range(first, len(self._chunks)):
+                if t1 is not None and self._first_times[position] >= t1:
+                    break
+                chunk = self._chunks[position]
+                times = chunk.time[:chunk.size]
+                start = 0 if t0 is None else int(np.searchsorted(times, t0, 'left'))
+                end = chunk.size if t1 is None else int(np.searchsorted(times, t1, 'left'))
+                if end > start:
+                    parts.append(chunk.slice(start, end, self.channels))
+            return self._join(parts)
+
+    def last(self, n: int) -> SampleWindow:
+        """
+        Return the n most recent records, oldest first.
+
+        Parameters
+        ----------
+        n : int
+            Number of records.
+
+        Returns
+        -------
+        SampleWindow
+            Copies of up to n records.
+        """
+        with self._lock:
+            parts = []
+            remaining = n
+            for chunk in reversed(self._chunks):
+                if remaining <= 0:
+                    break
+                start = max(chunk.size - remaining, 0)
+                parts.append(chunk.slice(start, chunk.size, self.channels))
+                remaining -= chunk.size - start
+            return self._join(parts[::-1])
+
+    def time_range(self) -> tuple:
+        """
+        Return the timestamps of the oldest and the newest record, or None if the store is empty.
+        """
+        with self._lock:
+            if not self.rows:
+                return None
+            return self._first_times[0], self._last_time
+
+    def clear(self):
+        """
+        Remove all records.
+        """
+        with self._lock:
+            self._chunks = []
+            self._first_times = []
+            self._full_nbytes = 0
+            self._last_time = -np.inf
+            self.rows = 0
+
+    def _evict(self):
+        """
+        Drop the oldest chunks while over budget, keeping at least one. The caller holds the lock.
+        """
+        while len(self._chunks) > 1 and self.nbytes > self.max_bytes:
+            chunk = self._chunks.pop(0)
+            self._first_times.pop(0)
+            self._full_nbytes -= chunk.nbytes
+            self.rows -= chunk.size
+            self.evicted_rows += chunk.size
+
+    def _join(self, parts) -> SampleWindow:
+        """
+        Concatenate chunk slices into one SampleWindow, rebasing the payload offsets.
+        """
+        if not parts:
+            return SampleWindow(np.empty(0), np.empty(0, dtype=np.int64), np.empty((0, self.channels)),
+                                b'', np.zeros(1, dtype=np.int64))
+        if len(parts) == 1:
+            return SampleWindow(*parts[0])
+        times, indices, values, arenas, offsets = zip(*parts)
+        bases = np.cumsum([0] + [len(arena) for arena in arenas[:-1]])
+        joined_offsets = np.concatenate([part[:-1] + base for part, base in zip(offsets, bases)]
+                                        + [[bases[-1] + len(arenas[-1])]])
+        return SampleWindow(np.concatenate(times), np.concatenate(indices), np.concatenate(values),
+                            b''.join(arenas), joined_offsets)
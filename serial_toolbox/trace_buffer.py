@@ -0,0 +1,157 @@
+"""
+Fixed-size NumPy ring buffer for numeric plot traces.
+"""
+import numpy as np
+
+
+class TraceBuffer:
+    """
+    Preallocated ring buffer holding the last window_size samples of each channel.
+
+    Samples are stored in a (channels x 2*window_size) array and every sample is
+    written twice, at its ring position and window_size further on. The samples in
+    order therefore always form one contiguous slice per channel, so view() costs
+    no copy, while appends stay O(1) per sample.
+
+    Attributes
+    ----------
+    window_size : int
+        Number of samples kept per channel.
+    total : int
+        Number of samples appended since creation or the last clear().
+    """
+
+    def __init__(self, window_size: int, channels: int = 0, dtype=np.float64):
+        """
+        Parameters
+        ----------
+        window_size : int
+            Number of samples kept per channel.
+        channels : int, optional
+            Number of channels to preallocate, by default 0. More are added as they appear.
+        dtype : numpy.dtype, optional
+            Sample type, by default numpy.float64.
+        """
+        if window_size <= 0:
+            raise ValueError('window_size must be positive')
+        self.window_size = window_size
+        self.total = 0
+        self._data = np.full((channels, 2 * window_size), np.nan, dtype=dtype)
+        self._head = 0
+        self._count = 0
+
+    @property
+    def channels(self) -> int:
+        """
+        Number of channels currently stored.
+        """
+        return self._data.shape[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, values):
+        """
+        Append one sample per channel.
+
+        Parameters
+        ----------
+        values : sequence of float
+            One value per channel. Missing trailing channels are stored as NaN.
+        """
+        count = len(values)
+        if count > self.channels:
+            self._grow(count)
+
+        head = self._head
+        column = self._data[:, head]
+        column[:count] = values
+        column[count:] = np.nan
+        self._data[:, head + self.window_size] = column
+
+        self._head = (head + 1) % self.window_size
+        self._count = min(self._count + 1, self.window_size)
+        self.total += 1
+
+    def extend(self, rows):
+        """
+        Append a batch of samples.
+
+        Parameters
+        ----------
+        rows : array_like
+            Samples of shape (rows x channels). Channels beyond the current count are
+            added, and the history of new channels is filled with NaN.
+        """
+        rows = np.asarray(rows, dtype=self._data.dtype)
+        if rows.ndim != 2 or rows.shape[0] == 0:
+            return
+        if rows.shape[1] > self.channels:
+            self._grow(rows.shape[1])
+
+        count = rows.shape[0]
+        self.total += count
+        window = self.window_size
+        if count > window:
+            rows = rows[-window:]
+            self._head = (self._head + count - window) % window
+            count = window
+
+        block = np.full((self.channels, count), np.nan, dtype=self._data.dtype)
+        block[:rows.shape[1]] = rows.T
+
+        first = min(count, window - self._head)
+        self._write(self._head, block[:, :first])
+        if first < count:
+            self._write(0, block[:, first:])
+
+        self._head = (self._head + count) % window
+        self._count = min(self._count + count, window)
+
+    def view(self) -> np.ndarray:
+        """
+        Return the stored samples in order, oldest first, without copying.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (channels x len(self)) whose rows are contiguous. It is a view
+            into the buffer and changes as new samples are appended.
+        """
+        start = (self._head - self._count) % self.window_size
+        return self._data[:, start:start + self._count]
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Return a copy of the stored samples in order, oldest first.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (channels x len(self)).
+        """
+        return self.view().copy()
+
+    def clear(self):
+        """
+        Remove all samples, keeping the channel count.
+        """
+        self._data.fill(np.nan)
+        self._head = 0
+        self._count = 0
+        self.total = 0
+
+    def _write(self, start: int, block: np.ndarray):
+        """
+        Write a block of samples at ring position start and at its mirror position.
+        """
+        end = start + block.shape[1]
+        self._data[:, start:end] = block
+        self._data[:, start + self.window_size:end + self.window_size] = block
+
+    def _grow(self, channels: int):
+        """
+        Add NaN-filled rows so that the buffer holds the given number of channels.
+        """
+        extra = np.full((channels - self.channels, self._data.shape[1]), np.nan, dtype=self._data.dtype)
+        self._data = np.vstack((self._data, extra))
@@ -0,0 +1,431 @@
+"""
+Pipelined request/response transactions on top of serial_interface.
+
+A transaction sends one command and completes when a received record matches it,
+or fails when its timeout expires. Several transactions can be in flight at once,
+so the round trips of consecutive commands overlap instead of adding up.
+"""
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+
+from .metrics import MetricsRegistry
+
+_SEQUENCE_FIELD = re.compile(r'\{seq(?::([^{}]*))?\}')
+
+
+class Transaction:
+    """
+    One command and its response, returned by TransactionEngine.request.
+
+    Attributes
+    ----------
+    command : str
+        The command as sent, with the sequence id filled in.
+    sequence : int or None
+        Sequence id of the transaction, None without sequence id matching.
+    timeout : float
+        Time in seconds allowed for the response.
+    sent_time : float
+        time.time() just before the command was queued for writing.
+    received_time : float or None
+        Receive timestamp of the response.
+    response : str or bytes or None
+        The matching record.
+    error : Exception or None
+        TimeoutError if no response arrived in time, ConnectionError if the engine was closed.
+    """
+
+    def __init__(self, command: str, sequence, matcher, timeout: float, callback=None):
+        self.command = command
+        self.sequence = sequence
+        self.timeout = timeout
+        self.sent_time = None
+        self.received_time = None
+        self.response = None
+        self.error = None
+        self._matcher = matcher
+        self._callback = callback
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        """
+        True once the transaction has completed or failed.
+        """
+        return self._done.is_set()
+
+    @property
+    def rtt(self) -> float:
+        """
+        Round-trip time in seconds, None until a response was received.
+        """
+        if self.received_time is None:
+            return None
+        return self.received_time - self.sent_time
+
+    def wait(self, timeout: float = None):
+        """
+        Wait for the response.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds, by default None (until the transaction completes or fails).
+
+        Returns
+        -------
+        str or bytes
+            The response.
+
+        Raises
+        ------
+        TimeoutError
+            If the transaction timed out, or is still pending after timeout.
+        ConnectionError
+            If the engine was closed before a response arrived.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f'no response to {self.command!r} yet')
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    def _finish(self, response=None, received_time=None, error=None):
+        self.response = response
+        self.received_time = received_time
+        self.error = error
+        self._done.set()
+        if self._callback is not None:
+            try:
+                self._callback(self)
+            except Exception as e:
+                logging.error('Transaction callback error: %s', e)
+
+
+class TransactionEngine:
+    """
+    Sends commands through a serial_interface and matches the received records to them.
+
+    Responses are matched in one of two ways:
+
+    - In order: a record completes the oldest pending transaction it matches, by
+      regular expression (pattern), prefix, or unconditionally if neither is given.
+      This suits devices that answer commands in the order they were sent.
+    - By sequence id: with sequence_pattern, each command gets an id filled into its
+      '{seq}' placeholder, and a record completes the transaction whose id the pattern
+      extracts from it. Responses may then arrive in any order, and a late response to
+      a timed-out command cannot be mistaken for the next one.
+
+    At most max_in_flight transactions are pending at a time; request() blocks for a
+    free slot. Round-trip times are recorded in the 'transaction.rtt_ms' histogram.
+
+    Attributes
+    ----------
+    interface : serial_interface
+        The interface commands are sent through.
+    max_in_flight : int
+        Maximum number of pending transactions.
+    timeout : float
+        Default time in seconds allowed for a response.
+    rtt : metrics.Histogram
+        Round-trip times in milliseconds of the completed transactions.
+    completed : int
+        Number of transactions that received a response.
+    timeouts : int
+        Number of transactions that timed out.
+    unmatched : int
+        Number of records received while transactions were pending that matched none of them.
+    """
+
+    def __init__(self, interface, max_in_flight: int = 4, timeout: float = 1.0, sequence_pattern=None,
+                 parse_sequence=None, sequence_modulus: int = 256, metrics: MetricsRegistry = None):
+        """
+        Parameters
+        ----------
+        interface : serial_interface
+            The interface to send commands through.
+        max_in_flight : int, optional
+            Maximum number of pending transactions, by default 4.
+        timeout : float, optional
+            Default time in seconds allowed for a response, by default 1.0.
+        sequence_pattern : str or bytes or re.Pattern, optional
+            Regular expression with a group named 'seq' that extracts the sequence id from
+            a response. bytes in HEX format. By default None (match in order).
+        parse_sequence : callable, optional
+            Converts the 'seq' group to an int. Defaults to int() for text and to a
+            big-endian unsigned integer for bytes.
+        sequence_modulus : int, optional
+            Sequence ids count from 0 up to sequence_modulus - 1 and wrap, by default 256.
+        metrics : metrics.MetricsRegistry, optional
+            Registry to record 'transaction.*' metrics in. Defaults to the interface's.
+        """
+        if max_in_flight < 1:
+            raise ValueError('max_in_flight must be at least 1')
+        if sequence_pattern is not None:
+            if max_in_flight >= sequence_modulus:
+                raise ValueError('max_in_flight must be smaller than sequence_modulus')
+            sequence_pattern = self._compile(sequence_pattern, interface.format)
+            if 'seq' not in sequence_pattern.groupindex:
+                raise ValueError("sequence_pattern needs a group named 'seq'")
+        self.interface = interface
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.sequence_pattern = sequence_pattern
+        self.parse_sequence = parse_sequence or _parse_sequence
+        self.sequence_modulus = sequence_modulus
+        self.completed = 0
+        self.timeouts = 0
+        self.unmatched = 0
+
+        if metrics is None:
+            metrics = interface.metrics
+        self.rtt = metrics.histogram('transaction.rtt_ms')
+        self._sent = metrics.counter('transaction.sent')
+        metrics.gauge('transaction.completed', lambda: self.completed)
+        metrics.gauge('transaction.timeouts', lambda: self.timeouts)
+        metrics.gauge('transaction.unmatched', lambda: self.unmatched)
+        metrics.gauge('transaction.in_flight', lambda: len(self._pending))
+
+        self._pending = {}  # Key (sequence id or counter) -> Transaction, oldest first
+        self._deadlines = []  # Heap of (deadline, order, key, transaction)
+        self._keys = itertools.count()
+        self._order = itertools.count()  # Tie-breaker, so that the heap never compares transactions
+        self._next_sequence = 0
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self._deadline_changed = threading.Condition(self._lock)
+        self._closed = False
+
+        interface.add_listener(self._on_records)
+        self.thread = threading.Thread(target=self._expire)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of pending transactions.
+        """
+        return len(self._pending)
+
+    def request(self, command: str, pattern=None, prefix=None, timeout: float = None,
+                callback=None) -> Transaction:
+        """
+        Send a command and return its pending transaction without waiting for the response.
+
+        Blocks while max_in_flight transactions are pending.
+
+        Parameters
+        ----------
+        command : str
+            The command, as for serial_interface.write_to_port. With sequence id matching,
+            '{seq}' is replaced by the id, with any format spec, e.g. '{seq:02x}' in HEX format.
+            Other braces, e.g. of JSON, are sent unchanged.
+        pattern : str or bytes or re.Pattern, optional
+            Regular expression the response must contain. In HEX format a str is taken
+            as latin-1 bytes. Ignored with sequence id matching.
+        prefix : str or bytes, optional
+            Prefix the response must start with, hexadecimal in HEX format. Ignored with
+            sequence id matching.
+        timeout : float, optional
+            Time in seconds allowed for the response, by default the engine's timeout.
+        callback : callable, optional
+            Called as callback(transaction) when the transaction completes or fails, from
+            the reader or the timeout thread.
+
+        Returns
+        -------
+        Transaction
+            The pending transaction.
+
+        Raises
+        ------
+        ConnectionError
+            If the engine is closed.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        matcher = None
+        if self.sequence_pattern is None:
+            matcher = self._make_matcher(pattern, prefix)
+
+        with self._lock:
+            self._slot_free.wait_for(lambda: self._closed or len(self._pending) < self.max_in_flight)
+            if self._closed:
+                raise ConnectionError('transaction engine closed')
+            if self.sequence_pattern is None:
+                sequence = None
+                key = next(self._keys)
+            else:
+                while self._next_sequence in self._pending:
+                    self._next_sequence = (self._next_sequence + 1) % self.sequence_modulus
+                sequence = key = self._next_sequence
+                self._next_sequence = (sequence + 1) % self.sequence_modulus
+                command = _SEQUENCE_FIELD.sub(lambda field: format(sequence, field.group(1) or ''), command)
+            transaction = Transaction(command, sequence, matcher, timeout, callback)
+            # Register before sending, so that a fast response cannot be missed
+            transaction.sent_time = time.time()
+            self._pending[key] = transaction
+            heapq.heappush(self._deadlines, (time.monotonic() + timeout, next(self._order), key, transaction))
+            self._deadline_changed.notify()
+
+        self.interface.write_to_port(command)
+        self._sent.add()
+        return transaction
+
+    def query(self, command: str, pattern=None, prefix=None, timeout: float = None):
+        """
+        Send a command and wait for its response.
+
+        Parameters are as for request.
+
+        Returns
+        -------
+        str or bytes
+            The response.
+
+        Raises
+        ------
+        TimeoutError
+            If no response arrived in time.
+        """
+        return self.request(command, pattern, prefix, timeout).wait()
+
+    def wait_all(self, timeout: float = None) -> bool:
+        """
+        Wait until no transaction is pending.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds, by default None (until every transaction completes or times out).
+
+        Returns
+        -------
+        bool
+            True if no transaction is pending.
+        """
+        with self._lock:
+            return self._slot_free.wait_for(lambda: not self._pending, timeout)
+
+    def close(self):
+        """
+        Stop matching responses and fail the pending transactions with ConnectionError.
+        """
+        self.interface.remove_listener(self._on_records)
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._deadlines.clear()
+            self._slot_free.notify_all()
+            self._deadline_changed.notify()
+        for transaction in pending:
+            transaction._finish(error=ConnectionError('transaction engine closed'))
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def _make_matcher(self, pattern, prefix):
+        """
+        Return a function telling whether a record is the response, or None to accept any record.
+        """
+        if pattern is not None:
+            return self._compile(pattern, self.interface.format).search
+        if prefix is not None:
+            if self.interface.format == 'HEX' and isinstance(prefix, str):
+                prefix = bytes.fromhex(prefix)
+            return lambda record: record.startswith(prefix)
+        return None
+
+    @staticmethod
+    def _compile(pattern, format: str):
+        if isinstance(pattern, re.Pattern):
+            return pattern
+        if format == 'HEX' and isinstance(pattern, str):
+            pattern = pattern.encode('latin-1')
+        return re.compile(pattern)
+
+    def _on_records(self, records, received_time: float, first_index: int):
+        """
+        Listener of the interface: complete the transactions the received records answer.
+        """
+        if not self._pending:
+            return
+        finished = []
+        with self._lock:
+            for record in records:
+                if not self._pending:
+                    break
+                key = self._match(record)
+                if key is None:
+                    self.unmatched += 1
+                    continue
+                finished.append((self._pending.pop(key), record))
+            if finished:
+                self.completed += len(finished)
+                self._slot_free.notify_all()
+
+        for transaction, record in finished:
+            self.rtt.record((received_time - transaction.sent_time) * 1e3)
+            transaction._finish(record, received_time)
+
+    def _match(self, record):
+        """
+        Return the key of the pending transaction a record answers, or None. The caller holds the lock.
+        """
+        if self.sequence_pattern is not None:
+            match = self.sequence_pattern.search(record)
+            if match is None:
+                return None
+            try:
+                sequence = self.parse_sequence(match.group('seq'))
+            except ValueError:
+                return None
+            return sequence if sequence in self._pending else None
+
+        for key, transaction in self._pending.items():
+            if transaction._matcher is None or transaction._matcher(record):
+                return key
+        return None
+
+    def _expire(self):
+        """
+        Fail the transactions whose deadline has passed. Runs in the engine's thread.
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                expired = []
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    _, _, key, transaction = heapq.heappop(self._deadlines)
+                    # Skip entries of transactions that completed, or whose key was reused
+                    if self._pending.get(key) is transaction:
+                        del self._pending[key]
+                        expired.append(transaction)
+                if expired:
+                    self.timeouts += len(expired)
+                    self._slot_free.notify_all()
+                else:
+                    # Completed transactions stay in the heap until their deadline, so wait for that
+                    timeout = self._deadlines[0][0] - now if self._deadlines else None
+                    self._deadline_changed.wait(timeout)
+                    continue
+
+            for transaction in expired:
+                transaction._finish(error=TimeoutError(
+                    f'no response to {transaction.command!r} within {transaction.timeout} s'))
+
+
+def _parse_sequence(value) -> int:
+    """
+    Convert a 'seq' group to an int: decimal text, or a big-endian unsigned integer for bytes.
+    """
+    if isinstance(value, bytes):
+        return int.from_bytes(value, 'big')
+    return int(value)
@@ -0,0 +1,429 @@
+"""
+Oscilloscope-style triggered capture of received records.
+
+A TriggerEngine is fed every batch of received records with their parsed channel
+values. While armed, it evaluates its trigger condition over the whole batch at
+once; on a trigger it keeps the records around it, pre before and post after, as
+a TriggerCapture. Batches are only referenced, not copied, until a capture is
+complete, so a running trigger adds little to the receive path.
+"""
+import collections
+import re
+import threading
+import time
+
+import numpy as np
+
+TRIGGER_MODES = ('single', 'normal', 'auto')
+EDGES = ('rising', 'falling', 'either', 'above', 'below')
+
+
+class ChannelTrigger:
+    """
+    Triggers on the values of one channel: a crossing of a level, or any sample beyond it.
+
+    Attributes
+    ----------
+    channel : int
+        Channel number, 0 for the first column.
+    level : float
+        Trigger level.
+    edge : str
+        'rising' (from below level to level or above), 'falling', 'either',
+        'above' (any sample at or above level) or 'below'.
+    """
+
+    def __init__(self, channel: int, level: float, edge: str = 'rising'):
+        """
+        Parameters
+        ----------
+        channel : int
+            Channel number, 0 for the first column.
+        level : float
+            Trigger level.
+        edge : str, optional
+            'rising', 'falling', 'either', 'above' or 'below', by default 'rising'.
+        """
+        if edge not in EDGES:
+            raise ValueError(f"Unknown edge '{edge}', expected one of {EDGES}")
+        if channel < 0:
+            raise ValueError('channel must not be negative')
+        self.channel = channel
+        self.level = level
+        self.edge = edge
+        self._last = np.nan  # Last value of the channel, for edges across batches
+
+    def __str__(self):
+        return f'channel {self.channel} {self.edge} {self.level:g}'
+
+    def find(self, records, values, numeric, start: int = 0) -> int:
+        """
+        Return the position of the first triggering record at or after start, or -1.
+
+        Parameters
+        ----------
+        records : list[str] or list[bytes]
+            The records of the batch.
+        values : numpy.ndarray
+            Values of the numeric records, (numeric rows x channels).
+        numeric : numpy.ndarray
+            Boolean mask of the numeric records, one entry per record.
+        start : int, optional
+            First record position to consider, by default 0.
+        """
+        if values.shape[1] <= self.channel or not len(values):
+            return -1
+        column = values[:, self.channel]
+        previous = np.empty_like(column)
+        previous[0] = self._last
+        previous[1:] = column[:-1]
+
+        level = self.level
+        if self.edge == 'rising':
+            hits = (previous < level) & (column >= level)
+        elif self.edge == 'falling':
+            hits = (previous > level) & (column <= level)
+        elif self.edge == 'either':
+            hits = ((previous < level) & (column >= level)) | ((previous > level) & (column <= level))
+        elif self.edge == 'above':
+            hits = column >= level
+        else:
+            hits = column <= level
+
+        rows = np.flatnonzero(numeric)  # Record position of each numeric row
+        candidates = rows[hits]
+        candidates = candidates[candidates >= start]
+        return int(candidates[0]) if len(candidates) else -1
+
+    def advance(self, records, values, numeric):
+        """
+        Remember the end of a batch, after the find calls for it.
+        """
+        if values.shape[1] > self.channel and len(values):
+            self._last = values[-1, self.channel]
+
+
+class PatternTrigger:
+    """
+    Triggers on records matching a regular expression, or containing a byte pattern.
+
+    The records of a batch are joined and searched with one scan. Regular expressions
+    are compiled with re.MULTILINE, so ^ and $ match at the start and end of each
+    record. A byte pattern is searched in the concatenated records of a batch and
+    triggers on the record where it starts.
+
+    Attributes
+    ----------
+    pattern : re.Pattern or bytes
+        The compiled expression, or the byte pattern.
+    """
+
+    def __init__(self, pattern):
+        """
+        Parameters
+        ----------
+        pattern : str or bytes
+            A regular expression, or a byte pattern, e.g. bytes.fromhex('aa55').
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, re.MULTILINE)
+            self._bytes_pattern = re.compile(pattern.pattern.encode('latin-1'), re.MULTILINE)
+        elif not pattern:
+            raise ValueError('empty byte pattern')
+        self.pattern = pattern
+
+    def __str__(self):
+        if isinstance(self.pattern, bytes):
+            return f'bytes {self.pattern.hex()}'
+        return f'regex {self.pattern.pattern!r}'
+
+    def find(self, records, values, numeric, start: int = 0) -> int:
+        """
+        Return the position of the first triggering record at or after start, or -1, see ChannelTrigger.find.
+        """
+        if start >= len(records):
+            return -1
+        records = records[start:]
+        text_records = isinstance(records[0], str)
+        separator = '\n' if text_records else b'\n'
+        if isinstance(self.pattern, bytes):
+            if text_records:
+                return -1
+            joined = b''.join(records)
+            found = joined.find(self.pattern)
+            separator = b''
+        else:
+            joined = separator.join(records)
+            match = (self.pattern if text_records else self._bytes_pattern).search(joined)
+            found = match.start() if match else -1
+        if found < 0:
+            return -1
+        starts = np.cumsum([0] + [len(record) + len(separator) for record in records[:-1]])
+        return start + int(np.searchsorted(starts, found, 'right')) - 1
+
+    def advance(self, records, values, numeric):
+        """
+        Remember the end of a batch. Patterns are matched within a batch, so there is nothing to keep.
+        """
+
+
+class TriggerCapture:
+    """
+    Records around a trigger.
+
+    Attributes
+    ----------
+    number : int
+        Number of the capture since the engine was created, from 1.
+    position : int
+        Row of the triggering record.
+    forced : bool
+        True if the capture was taken by the auto mode without a trigger.
+    indices : numpy.ndarray
+        data_index of each record (int64).
+    times : numpy.ndarray
+        Receive timestamp of each record.
+    records : list[str] or list[bytes]
+        The records.
+    values : numpy.ndarray
+        Channel values of shape (records x channels), NaN for records that are not numeric.
+    """
+
+    def __init__(self, number, position, forced, indices, times, records, values):
+        self.number = number
+        self.position = position
+        self.forced = forced
+        self.indices = indices
+        self.times = times
+        self.records = records
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def index(self) -> int:
+        """
+        data_index of the triggering record.
+        """
+        return int(self.indices[self.position])
+
+    @property
+    def time(self) -> float:
+        """
+        Receive timestamp of the triggering record.
+        """
+        return float(self.times[self.position])
+
+
+class TriggerEngine:
+    """
+    Captures the records around trigger events in the received stream.
+
+    The engine keeps references to the recent batches, enough to cover pre records.
+    When the condition fires on a record, it waits until post more records have
+    arrived and then assembles the capture from the kept batches.
+
+    Modes, as on an oscilloscope:
+
+    - 'single': capture once, then stop until arm is called.
+    - 'normal': re-arm after every capture; records of a capture cannot trigger it again.
+    - 'auto': like 'normal', but if nothing triggers within auto_timeout seconds
+      of arming, capture anyway, around the first record of the next batch.
+
+    Attributes
+    ----------
+    condition : ChannelTrigger or PatternTrigger
+        The trigger condition.
+    pre : int
+        Records kept before the triggering record.
+    post : int
+        Records kept after the triggering record.
+    mode : str
+        'single', 'normal' or 'auto'.
+    auto_timeout : float
+        Seconds without trigger after which 'auto' captures anyway.
+    state : str
+        'armed', 'capturing' or 'stopped'.
+    capture : TriggerCapture or None
+        The last complete capture.
+    captures : int
+        Number of complete captures.
+    """
+
+    def __init__(self, condition, pre: int = 500, post: int = 500, mode: str = 'normal', auto_timeout: float = 1.0):
+        """
+        Parameters
+        ----------
+        condition : ChannelTrigger or PatternTrigger
+            The trigger condition.
+        pre : int, optional
+            Records kept before the triggering record, by default 500.
+        post : int, optional
+            Records kept after the triggering record, by default 500.
+        mode : str, optional
+            'single', 'normal' or 'auto', by default 'normal'.
+        auto_timeout : float, optional
+            Seconds without trigger after which 'auto' captures anyway, by default 1.0.
+        """
+        if mode not in TRIGGER_MODES:
+            raise ValueError(f"Unknown trigger mode '{mode}', expected one of {TRIGGER_MODES}")
+        if pre < 0 or post < 0:
+            raise ValueError('pre and post must not be negative')
+        self.condition = condition
+        self.pre = pre
+        self.post = post
+        self.mode = mode
+        self.auto_timeout = auto_timeout
+        self.capture = None
+        self.captures = 0
+        self._lock = threading.Lock()
+        self._batches = collections.deque()  # (first_index, time, records, values, numeric)
+        self._next_index = None  # data_index after the last record fed
+        self._trigger = None  # (data_index, forced) of the pending capture
+        self.arm()
+
+    def arm(self):
+        """
+        Wait for the next trigger, e.g. after a 'single' capture.
+        """
+        with self._lock:
+            self.state = 'armed'
+            self._trigger = None
+            self._armed_from = self._next_index or 0
+            self._armed_at = time.monotonic()
+
+    def feed(self, records, values, numeric, received_time: float, first_index: int) -> list:
+        """
+        Process a batch of records.
+
+        Parameters
+        ----------
+        records : list[str] or list[bytes]
+            The records of the batch.
+        values : numpy.ndarray
+            Values of the numeric records, as returned by parsing.parse_numeric_batch.
+        numeric : numpy.ndarray
+            Boolean mask of the numeric records.
+        received_time : float
+            Receive timestamp of the batch.
+        first_index : int
+            data_index of the first record.
+
+        Returns
+        -------
+        list[TriggerCapture]
+            The captures completed by this batch, oldest first, usually none or one.
+        """
+        count = len(records)
+        if not count:
+            return []
+        with self._lock:
+            self._batches.append((first_index, received_time, records, values, numeric))
+            self._next_index = first_index + count
+            completed = []
+            while True:
+                start = self._armed_from - first_index
+                if self.state == 'armed' and start < count:
+                    position = self.condition.find(records, values, numeric, max(start, 0))
+                    if position >= 0:
+                        self._trigger = (first_index + position, False)
+                        self.state = 'capturing'
+                    elif self.mode == 'auto' and time.monotonic() - self._armed_at >= self.auto_timeout:
+                        self._trigger = (max(first_index, self._armed_from), True)
+                        self.state = 'capturing'
+                if self.state != 'capturing' or self._next_index <= self._trigger[0] + self.post:
+                    break
+                # The capture is complete; in normal and auto mode, look for the next trigger
+                # in the rest of the batch
+                self.capture = self._assemble()
+                completed.append(self.capture)
+                self.captures += 1
+                if self.mode == 'single':
+                    self.state = 'stopped'
+                else:
+                    self.state = 'armed'
+                    self._armed_from = self._trigger[0] + self.post + 1
+                    self._armed_at = time.monotonic()
+                self._trigger = None
+            self.condition.advance(records, values, numeric)
+            self._trim()
+            return completed
+
+    def _trim(self):
+        """
+        Drop the batches no longer needed for a capture. The caller holds the lock.
+        """
+        needed = (self._trigger[0] if self._trigger else self._next_index) - self.pre
+        while len(self._batches) > 1:
+            first_index, _, records, _, _ = self._batches[0]
+            if first_index + len(records) > needed:
+                break
+            self._batches.popleft()
+
+    def _assemble(self) -> TriggerCapture:
+        """
+        Build the capture of the pending trigger from the kept batches. The caller holds the lock.
+        """
+        trigger_index, forced = self._trigger
+        start, end = trigger_index - self.pre, trigger_index + self.post + 1
+        channels = max((batch[3].shape[1] for batch in self._batches), default=0)
+        indices, times, records, values = [], [], [], []
+        for first_index, received_time, batch_records, batch_values, numeric in self._batches:
+            low = max(start - first_index, 0)
+            high = min(end - first_index, len(batch_records))
+            if high <= low:
+                continue
+            full = np.full((len(batch_records), channels), np.nan)
+            if len(batch_values):
+                full[numeric, :batch_values.shape[1]] = batch_values
+            indices.append(np.arange(first_index + low, first_index + high))
+            times.append(np.full(high - low, received_time))
+            records.extend(batch_records[low:high])
+            values.append(full[low:high])
+        indices = np.concatenate(indices)
+        return TriggerCapture(self.captures + 1, int(trigger_index - indices[0]), forced, indices,
+                              np.concatenate(times), records, np.concatenate(values))
+
+
+def make_trigger(kind: str, arguments: list, format: str = 'STR'):
+    """
+    Create a trigger condition from the words of a trigger command.
+
+    Parameters
+    ----------
+    kind : str
+        'level' (arguments: channel, level and optionally the edge), 'regex'
+        (arguments: the expression) or 'hex' (arguments: the bytes in hexadecimal).
+    arguments : list[str]
+        The remaining words.
+    format : str, optional
+        Data format of the records, 'STR' or 'HEX', by default 'STR'. A 'hex' trigger
+        needs 'HEX', as text records contain no raw bytes to match.
+
+    Returns
+    -------
+    ChannelTrigger or PatternTrigger
+        The condition.
+
+    Raises
+    ------
+    ValueError
+        If the words do not describe a trigger.
+    """
+    if kind == 'level':
+        if len(arguments) not in (2, 3):
+            raise ValueError('level trigger needs a channel, a level and optionally an edge')
+        return ChannelTrigger(int(arguments[0]), float(arguments[1]), *arguments[2:])
+    if kind == 'regex':
+        if not arguments:
+            raise ValueError('regex trigger needs an expression')
+        try:
+            return PatternTrigger(' '.join(arguments))
+        except re.error as e:
+            raise ValueError(f'invalid expression: {e}')
+    if kind == 'hex':
+        if format != 'HEX':
+            raise ValueError('hex trigger needs the HEX format, use a regex trigger on text records')
+        return PatternTrigger(bytes.fromhex(''.join(arguments)))
+    raise ValueError(f"Unknown trigger '{kind}', expected level, regex or hex")
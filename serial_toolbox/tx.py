@@ -0,0 +1,350 @@
+"""
+Buffered transmit path: a bounded send buffer drained by a writer thread.
+"""
+import logging
+import os
+import threading
+import time
+
+from .metrics import MetricsRegistry
+
+FLOW_CONTROLS = ('none', 'rtscts', 'xonxoff')
+
+
+class SerialWriter:
+    """
+    Writes to a serial port from a dedicated thread.
+
+    send() appends to a bounded byte buffer and returns; the writer thread takes
+    everything pending, up to max_write_size bytes, in a single write() call, so many
+    small sends are coalesced. When the buffer is full, send() blocks (backpressure).
+
+    Optional pacing inserts a delay after every byte or after every line, for devices
+    that cannot take data at the full link rate. With flow control the port's driver
+    does the handshaking; with 'rtscts' the writer also waits while CTS is low so that
+    a stalled device shows up in blocked_time instead of a hung write.
+
+    If a write fails, e.g. because the device was unplugged, send() raises until
+    set_port() provides a working port; data still queued is kept and written then.
+
+    Attributes
+    ----------
+    serial_port : serial.Serial
+        The opened serial port.
+    max_pending_bytes : int
+        Capacity of the send buffer.
+    max_write_size : int
+        Maximum number of bytes passed to one write() call.
+    inter_byte_delay : float
+        Delay in seconds after every byte, 0 to disable.
+    inter_line_delay : float
+        Delay in seconds after every newline, 0 to disable.
+    flow_control : str
+        'none', 'rtscts' or 'xonxoff'.
+    bytes_written : int
+        Number of bytes written to the port.
+    writes : int
+        Number of write() calls.
+    blocked_time : float
+        Seconds spent waiting for CTS.
+    """
+
+    def __init__(self, serial_port, max_pending_bytes: int = 1 << 20, max_write_size: int = 4096,
+                 inter_byte_delay: float = 0.0, inter_line_delay: float = 0.0, flow_control: str = 'none',
+                 metrics: MetricsRegistry = None):
+        """
+        Parameters
+        ----------
+        serial_port : serial.Serial
+            The opened serial port.
+        max_pending_bytes : int, optional
+            Capacity of the send buffer, by default 1 MiB.
+        max_write_size : int, optional
+            Maximum number of bytes per write() call, by default 4096.
+        inter_byte_delay : float, optional
+            Delay in seconds after every byte, by default 0.
+        inter_line_delay : float, optional
+            Delay in seconds after every newline, by default 0.
+        flow_control : str, optional
+            'none', 'rtscts' or 'xonxoff'; enables the corresponding setting on the port, by default 'none'.
+        metrics : metrics.MetricsRegistry, optional
+            Registry to record 'writer.*' metrics in. Defaults to a new one.
+        """
+        if flow_control not in FLOW_CONTROLS:
+            raise ValueError(f'flow_control must be one of {FLOW_CONTROLS}, got {flow_control!r}')
+        self.serial_port = serial_port
+        self.max_pending_bytes = max_pending_bytes
+        self.max_write_size = max_write_size
+        self.inter_byte_delay = inter_byte_delay
+        self.inter_line_delay = inter_line_delay
+        self.flow_control = flow_control
+        self.bytes_written = 0
+        self.writes = 0
+        self.blocked_time = 0.0
+
+        if flow_control == 'rtscts':
+            serial_port.rtscts = True
+        elif flow_control == 'xonxoff':
+            serial_port.xonxoff = True
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+        self._bytes_counter = metrics.counter('writer.bytes')
+        self._writes_counter = metrics.counter('writer.writes')
+        metrics.gauge('writer.pending', lambda: len(self._buffer))
+
+        self._buffer = bytearray()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self._error = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of bytes queued or being written.
+        """
+        return len(self._buffer) + self._in_flight
+
+    def send(self, data: bytes, timeout: float = None) -> int:
+        """
+        Queue data for writing, blocking while the send buffer is full.
+
+        Fails while the port is in error, until set_port provides a working one.
+
+        Parameters
+        ----------
+        data : bytes
+            The data to send.
+        timeout : float, optional
+            Maximum time to wait for space in seconds, by default None (wait forever).
+
+        Returns
+        -------
+        int
+            Number of bytes queued; less than len(data) on timeout.
+
+        Raises
+        ------
+        ConnectionError
+            If the writer is closed or the port failed.
+        """
+        view = memoryview(data)
+        queued = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while queued < len(view):
+                self._check_open()
+                space = self.max_pending_bytes - len(self._buffer)
+                if space <= 0:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._not_full.wait(remaining)
+                    continue
+                part = view[queued:queued + space]
+                self._buffer += part
+                queued += len(part)
+                self._not_empty.notify()
+        return queued
+
+    def send_file(self, path: str, progress=None, chunk_size: int = 65536) -> dict:
+        """
+        Stream a file to the port as fast as the link and the pacing allow.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file to send.
+        progress : callable, optional
+            Called as progress(bytes_sent, total_bytes) about every 0.5 s and at the end.
+        chunk_size : int, optional
+            Read size in bytes, by default 64 KiB.
+
+        Returns
+        -------
+        dict
+            'bytes' sent, 'elapsed' seconds and 'rate' in bytes per second.
+        """
+        total = os.path.getsize(path)
+        start_written = self.bytes_written
+        started = time.monotonic()
+        last_report = started
+
+        def report():
+            if progress is not None:
+                progress(self.bytes_written - start_written, total)
+
+        with open(path, 'rb') as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                queued = 0
+                while queued < len(chunk):
+                    queued += self.send(chunk[queued:], timeout=0.5)
+                    if time.monotonic() - last_report >= 0.5:
+                        last_report = time.monotonic()
+                        report()
+        while not self.flush(timeout=0.5):
+            report()
+        report()
+
+        elapsed = time.monotonic() - started
+        sent = self.bytes_written - start_written
+        return {'bytes': sent, 'elapsed': elapsed, 'rate': sent / elapsed if elapsed > 0 else 0.0}
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until everything queued has been written to the port.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds, by default None (wait forever).
+
+        Returns
+        -------
+        bool
+            True if the buffer is empty, False on timeout.
+        """
+        with self._lock:
+            self._idle.wait_for(lambda: self._closed or self._error is not None or not (self._buffer or self._in_flight),
+                                timeout)
+            self._check_open()
+            return not (self._buffer or self._in_flight)
+
+    def close(self, timeout: float = 1.0):
+        """
+        Stop the writer thread, giving it up to timeout seconds to write what is queued.
+        """
+        try:
+            self.flush(timeout)
+        except ConnectionError:
+            pass
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            self._idle.notify_all()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def suspend(self, reason: str):
+        """
+        Stop writing until set_port is called, e.g. because the port was lost.
+
+        Queued data is kept; send() raises ConnectionError in the meantime.
+
+        Parameters
+        ----------
+        reason : str
+            Reason given in the ConnectionError.
+        """
+        with self._lock:
+            self._error = ConnectionError(reason)
+            self._not_full.notify_all()
+            self._idle.notify_all()
+
+    def set_port(self, serial_port):
+        """
+        Continue writing on another port, e.g. one reopened after a disconnect.
+
+        Data queued when the previous port failed is written to the new one; only the
+        write that failed is lost.
+
+        Parameters
+        ----------
+        serial_port : serial.Serial
+            The opened serial port.
+        """
+        with self._lock:
+            self.serial_port = serial_port
+            if self.flow_control == 'rtscts':
+                serial_port.rtscts = True
+            elif self.flow_control == 'xonxoff':
+                serial_port.xonxoff = True
+            self._error = None
+            self._not_empty.notify_all()
+
+    def _check_open(self):
+        if self._error is not None:
+            raise ConnectionError(f'serial writer failed: {self._error}')
+        if self._closed:
+            raise ConnectionError('serial writer closed')
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._not_empty.wait_for(lambda: (self._buffer and self._error is None) or self._closed)
+                if self._closed:
+                    return
+                size = self._next_write_size()
+                data = bytes(self._buffer[:size])
+                del self._buffer[:size]
+                self._in_flight = size
+                self._not_full.notify_all()
+
+            try:
+                self._write(data)
+            except Exception as e:
+                logging.error('Serial write error: %s', e)
+                with self._lock:
+                    # Keep what is still queued, it is written if the port is replaced with set_port
+                    self._error = e
+                    self._in_flight = 0
+                    self._not_full.notify_all()
+                    self._idle.notify_all()
+                continue
+
+            with self._lock:
+                self._in_flight = 0
+                if not self._buffer:
+                    self._idle.notify_all()
+
+    def _next_write_size(self) -> int:
+        """
+        Size of the next write: one byte or one line when paced, else as much as allowed.
+        """
+        if self.inter_byte_delay > 0:
+            return 1
+        size = min(len(self._buffer), self.max_write_size)
+        if self.inter_line_delay > 0:
+            newline = self._buffer.find(b'\n', 0, size)
+            if newline >= 0:
+                size = newline + 1
+        return size
+
+    def _write(self, data: bytes):
+        if self.flow_control == 'rtscts':
+            self._wait_for_cts()
+        self.serial_port.write(data)
+        self.bytes_written += len(data)
+        self.writes += 1
+        self._bytes_counter.add(len(data))
+        self._writes_counter.add()
+
+        delay = self.inter_byte_delay * len(data)
+        if self.inter_line_delay > 0 and data.endswith(b'\n'):
+            delay += self.inter_line_delay
+        if delay > 0:
+            # Wait for the data to leave the UART so that the delay is between bytes on the wire
+            self.serial_port.flush()
+            time.sleep(delay)
+
+    def _wait_for_cts(self):
+        try:
+            if self.serial_port.cts:
+                return
+        except (AttributeError, OSError):
+            return  # The port cannot report CTS; rely on the driver
+        started = time.monotonic()
+        while not self._closed and not self.serial_port.cts:
+            time.sleep(0.001)
+        self.blocked_time += time.monotonic() - started
@@ -2,25 +2,37 @@ import threading
 import time
 import queue
 import cmd
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-import yaml
-from pydantic import ValidationError  # Ensure this is imported
+import shlex
+from typing import TYPE_CHECKING
+import numpy as np
 from .interface_core import serial_interface
-from .connect import port_manager
-from .log_init import log_init
-from .models import Config  # Import the pydantic model
+from .connect import port_manager, ReconnectSupervisor
+from .framing import make_framer
+from .log_init import log_init, TrafficLogger
+from .metrics import MetricsRegistry
+from .tx import SerialWriter
+from .transaction import TransactionEngine
+from .store import SampleStore
+from .export import Exporter, EXPORT_FORMATS
+from .trigger import TriggerEngine, TRIGGER_MODES, make_trigger
+from .trace_buffer import TraceBuffer
+from .output import TerminalOutput
+from .parsing import parse_numeric_batch
+from .replay import CaptureReplay
 
 from prompt_toolkit import PromptSession
 from prompt_toolkit.patch_stdout import patch_stdout
 
+if TYPE_CHECKING:
+    from .models import Config
+
 class SerialMonitor(cmd.Cmd):
     """
     A command-line serial monitor equipped with plotting functionality.
     
     Attributes
     ----------
-    interface : serial_interface
+    interface : serial_interface or shm_pipeline.ProcessInterface
         The serial interface for communication.
     plotting : bool
         Flag to enable or disable plotting.
@@ -28,18 +40,28 @@ class SerialMonitor(cmd.Cmd):
         Flag to control numeric data printing.
     data_lock : threading.Lock
         Lock to manage access to shared data.
-    traces : list
-        List of data traces for plotting.
+    traces : TraceBuffer
+        Ring buffer of data traces for plotting, one row per channel.
     plot_queue : queue.Queue
         Queue for handling plot data.
-    print_queue : queue.Queue
-        Queue for handling print data.
+    print_queue : TerminalOutput
+        Bounded, rate-limited buffer of lines to print.
     window_size : int
         Size of the data window for the plot.
     session : PromptSession
         Interactive session for the command prompt.
-    animation : FuncAnimation, optional
-        Animation instance for the plot.
+    plotter : TracePlot, optional
+        Incremental renderer for the plot.
+    plot_timer : matplotlib.backend_bases.TimerBase, optional
+        Timer driving the plot updates.
+    metrics : metrics.MetricsRegistry
+        Pipeline metrics, shared with the interface.
+    transactions : transaction.TransactionEngine
+        Engine matching responses to the commands sent with query.
+    store : store.SampleStore or None
+        History of the received records, None if disabled.
+    trigger : trigger.TriggerEngine or None
+        Trigger capture set up with the trigger command, None if off.
     """
 
     doc_header = 'Commands (type help <command> for details):'
@@ -47,13 +69,13 @@ class SerialMonitor(cmd.Cmd):
     intro = 'Type help or ? to list commands.\n'
     prompt = '(sertools) '
 
-    def __init__(self, interface, config: Config):
+    def __init__(self, interface, config: 'Config'):
         """
         Initialize the SerialMonitor with the given interface and configuration.
 
         Parameters
         ----------
-        interface : serial_interface
+        interface : serial_interface or shm_pipeline.ProcessInterface
             The serial interface for communication.
         config : Config
             Configuration for the serial monitor.
@@ -66,19 +88,64 @@ class SerialMonitor(cmd.Cmd):
         self.data_lock = threading.Lock()
 
         # Initialize plotting parameters
-        self.traces = []
         self.plot_queue = queue.Queue()
-        self.print_queue = queue.Queue()
+        self.print_queue = TerminalOutput(config.max_print_pending, config.max_print_rate)
         self.window_size = config.window_size
+        self.traces = TraceBuffer(self.window_size)
+
+        # Pipeline metrics, shared with the reader
+        self.metrics = interface.metrics
+        self._batches = self.metrics.counter('consumer.batches')
+        self._lines = self.metrics.counter('consumer.lines')
+        self._numeric_rows = self.metrics.counter('consumer.numeric_rows')
+        self._print_latency = self.metrics.histogram('latency.print_ms')
+        self._plot_latency = self.metrics.histogram('latency.plot_ms')
+        self._render_time = self.metrics.histogram('plot.render_ms')
+        self.metrics.gauge('print.pending', self.print_queue.qsize)
+        self.metrics.gauge('print.written', lambda: self.print_queue.written)
+        self.metrics.gauge('print.suppressed', lambda: self.print_queue.suppressed)
+        self._print_times = []  # Receive times of batches waiting to be printed
+        self._plot_times = []  # Receive times of batches waiting to be plotted
+
+        self.transactions = TransactionEngine(interface, config.max_in_flight, config.transaction_timeout)
+
+        self.store = None
+        if config.history_max_mb > 0:
+            # Filled by the consumer thread with the values it parses anyway, not as a listener
+            self.store = SampleStore(int(config.history_max_mb * (1 << 20)))
+            self.metrics.gauge('history.rows', lambda: self.store.rows)
+            self.metrics.gauge('history.bytes', lambda: self.store.nbytes)
+            self.metrics.gauge('history.evicted_rows', lambda: self.store.evicted_rows)
+
+        self.exporter = None
+        self.export_rotate_bytes = int(config.export_rotate_mb * (1 << 20)) or None
+        self.export_rotate_seconds = config.export_rotate_seconds or None
+        self.metrics.gauge('export.records', lambda: self.exporter.records_written if self.exporter else 0)
+        self.metrics.gauge('export.bytes', lambda: self.exporter.bytes_written if self.exporter else 0)
+        self.metrics.gauge('export.dropped', lambda: self.exporter.dropped_records if self.exporter else 0)
+
+        self.trigger = None
+        self.trigger_pre = config.trigger_pre
+        self.trigger_post = config.trigger_post
+        self.trigger_figure = None
+        self._plotted_capture = None
+        self.metrics.gauge('trigger.captures', lambda: self.trigger.captures if self.trigger else 0)
 
         # Initialize prompt_toolkit session
         self.session = PromptSession()
 
         # Plot initialization must be done in the main thread
-        self.animation = None
+        self.plotter = None
+        self.plot_timer = None
         if self.plotting:
+            # matplotlib is only imported when plotting is enabled
+            import matplotlib.pyplot as plt
+            from .plotting import TracePlot
             self.figure, self.ax = plt.subplots()
-            self.animation = FuncAnimation(self.figure, self.update_plot, interval=100, cache_frame_data=False)
+            self.plotter = TracePlot(self.figure, self.ax, self.window_size, config.plot_decimation)
+            self.plot_timer = self.figure.canvas.new_timer(interval=100)
+            self.plot_timer.add_callback(self.update_plot)
+            self.plot_timer.start()
             self.figure.canvas.mpl_connect('close_event', self.on_close_plot)
 
         # Start the RXD update thread
@@ -101,52 +168,106 @@ class SerialMonitor(cmd.Cmd):
             The close event for the plot window.
         """
         self.running = False
-        if self.animation and self.animation.event_source:
-            self.animation.event_source.stop()  # Stop the animation timer
+        if self.plot_timer:
+            self.plot_timer.stop()  # Stop the plot timer
 
     def rxd_update(self):
         """
         Continuously update received data.
+
+        With a shm_pipeline.ProcessInterface, the batches arrive already parsed.
         """
+        parsed_batches = getattr(self.interface, 'parsed_batches', None)
         while self.running:
-            data_queue_size = self.interface.data_queue.qsize()
-            if data_queue_size > 0:
-                for _ in range(data_queue_size):
-                    data_dict = self.interface.data_queue.get()
-
-                    if self.interface.format == 'HEX':
-                        self.print_queue.put("RXD: 0x" + data_dict['data'].hex())
-                    elif self.interface.format == 'STR':
-                        data_dict['data'] = data_dict['data'].strip()
-                        if self.is_comma_separated_numbers(data_dict['data']):
-                            values = [float(x) for x in data_dict['data'].split(',')]
-                            with self.data_lock:
-                                self.update_traces(values)
-                            if self.print_numbers:  # Check the flag before printing
-                                self.print_queue.put("RXD: " + data_dict['data'])
-                        else:
-                            self.print_queue.put("RXD: " + data_dict['data'])
-            time.sleep(0.01)
-
-    def is_comma_separated_numbers(self, data_str):
-        """
-        Check if the given string is a comma-separated string of numbers.
+            if parsed_batches is not None:
+                for batch in parsed_batches.get_many(timeout=0.1):
+                    self.update_parsed_batch(batch)
+                continue
+            records = self.interface.data_queue.get_many(timeout=0.1)
+            if records:
+                self.update_rxd_batch(records)
+
+    def update_rxd_batch(self, records):
+        """
+        Route a batch of received records to the traces and the print queue.
+
+        In STR format, all numeric lines of the batch are parsed in one pass and
+        appended to the traces together.
 
         Parameters
         ----------
-        data_str : str
-            The string to check.
+        records : list[dict]
+            Records taken from the interface's data_queue.
+        """
+        self._batches.add()
+        self._lines.add(len(records))
+        received_time = records[0]['time']
+
+        first_index = records[0]['index']
 
-        Returns
-        -------
-        bool
-            True if the string is a comma-separated string of numbers, False otherwise.
+        if self.interface.format == 'HEX':
+            self._route_hex([record['data'] for record in records], received_time, first_index)
+            return
+
+        lines = [record['data'].strip() for record in records]
+        values, numeric = parse_numeric_batch(lines)
+        self._route_lines(lines, values, numeric, received_time, first_index)
+
+    def update_parsed_batch(self, batch):
         """
-        try:
-            [float(x) for x in data_str.split(',')]
-            return True
-        except ValueError:
-            return False
+        Route a batch parsed by the worker process of a shm_pipeline.ProcessInterface.
+
+        Parameters
+        ----------
+        batch : shm_pipeline.ParsedBatch
+            The records with their parsed channel values.
+        """
+        self._batches.add()
+        self._lines.add(len(batch.records))
+        if self.interface.format == 'HEX':
+            self._route_hex(batch.records, batch.time, batch.first_index)
+        else:
+            self._route_lines(batch.records, batch.values, batch.numeric, batch.time, batch.first_index)
+
+    def _route_hex(self, records, received_time, first_index):
+        self.print_queue.put_many(["RXD: 0x" + record.hex() for record in records])
+        with self.data_lock:
+            self._print_times.append(received_time)
+        if self.store is not None:
+            self.store.add_parsed(records, None, None, received_time, first_index)
+        self._feed_trigger(records, np.empty((0, 0)), np.zeros(len(records), dtype=bool), received_time, first_index)
+
+    def _route_lines(self, lines, values, numeric, received_time, first_index):
+        if self.store is not None:
+            self.store.add_parsed(lines, values, numeric, received_time, first_index)
+        self._feed_trigger(lines, values, numeric, received_time, first_index)
+        if len(values):
+            self._numeric_rows.add(len(values))
+            with self.data_lock:
+                self.traces.extend(values)
+                self._plot_times.append(received_time)
+
+        if self.print_numbers:  # Check the flag before printing
+            printed = ["RXD: " + line for line in lines]
+        else:
+            printed = ["RXD: " + line for line, is_numeric in zip(lines, numeric) if not is_numeric]
+        if printed:
+            self.print_queue.put_many(printed)
+            with self.data_lock:
+                self._print_times.append(received_time)
+
+    def _feed_trigger(self, records, values, numeric, received_time, first_index):
+        trigger = self.trigger
+        if trigger is None:
+            return
+        captures = trigger.feed(records, values, numeric, received_time, first_index)
+        if captures:
+            self.print_queue.put_many([self._describe_capture(capture) for capture in captures])
+
+    def _describe_capture(self, capture) -> str:
+        kind = 'forced' if capture.forced else 'triggered'
+        return (f"TRIG: capture {capture.number} {kind} at index {capture.index}, "
+                f"{len(capture)} records, type 'trigger show' for details")
 
     def update_traces(self, values):
         """
@@ -155,48 +276,69 @@ class SerialMonitor(cmd.Cmd):
         Parameters
         ----------
         values : list of float
-            The new values to add to the traces.
+            The new values to add to the traces, one per channel.
         """
-        while len(self.traces) < len(values):
-            self.traces.append([])
-        
-        for i, value in enumerate(values):
-            self.traces[i].append(value)
-        
-        for trace in self.traces:
-            if len(trace) > self.window_size:
-                trace.pop(0)
+        self.traces.append(values)
 
-    def update_plot(self, frame):
+    def update_plot(self, frame=None):
         """
         Update the plot with the received data.
 
+        The traces are decimated, or copied, under data_lock and drawn after
+        releasing it, so rendering does not block the receive thread.
+
         Parameters
         ----------
-        frame : int
-            The current frame number.
+        frame : int, optional
+            The current frame number. Unused.
         """
+        started = time.perf_counter()
         with self.data_lock:
-            self.ax.clear()
-            for trace in self.traces:
-                self.ax.plot(trace)
-            self.ax.relim()
-            self.ax.autoscale_view()
-            self.figure.canvas.draw()
-            self.figure.canvas.flush_events()
+            traces = self.traces.view()
+            x, y = self.plotter.reduce(traces, self.traces.total)
+            received_times, self._plot_times = self._plot_times, []
+        self.plotter.draw(x, y, traces.shape[1])
+        self._render_time.record((time.perf_counter() - started) * 1e3)
+        trigger = self.trigger
+        if trigger is not None and trigger.capture is not None and trigger.capture is not self._plotted_capture:
+            self._plot_capture(trigger.capture)
+        if received_times:
+            self._plot_latency.record_many((time.time() - np.array(received_times)) * 1e3)
+
+    def _plot_capture(self, capture):
+        """
+        Draw a trigger capture in its own figure, with the trigger at x = 0.
+        """
+        import matplotlib.pyplot as plt
+        if self.trigger_figure is None or not plt.fignum_exists(self.trigger_figure.number):
+            self.trigger_figure, self.trigger_ax = plt.subplots()
+        ax = self.trigger_ax
+        ax.clear()
+        if capture.values.shape[1]:
+            ax.plot(np.arange(len(capture)) - capture.position, capture.values)
+        ax.axvline(0, color='gray', linestyle='--')
+        ax.set_title(f"Capture {capture.number}: {self.trigger.condition}, index {capture.index}"
+                     + (" (forced)" if capture.forced else ""))
+        ax.set_xlabel('records from trigger')
+        self.trigger_figure.canvas.draw_idle()
+        self._plotted_capture = capture
 
     def print_rxd(self):
         """
         Print the received data without interrupting the CLI.
+
+        Every tick, all pending lines are written with a single write.
         """
         while self.running:
-            try:
-                message = self.print_queue.get_nowait()
-                with patch_stdout():
-                    print(message)
-            except queue.Empty:
-                pass
             time.sleep(0.1)
+            with self.data_lock:
+                received_times, self._print_times = self._print_times, []
+            text = self.print_queue.drain()
+            if text:
+                with patch_stdout():
+                    print(text, end='')
+            if received_times:
+                self._print_latency.record_many((time.time() - np.array(received_times)) * 1e3)
 
     def do_send(self, arg):
         """
@@ -239,6 +381,376 @@ class SerialMonitor(cmd.Cmd):
             "  send 54657374 (for HEX)"
         ]))
 
+    def do_sendfile(self, arg):
+        """
+        Send the contents of a file via the serial interface, as fast as the link allows.
+
+        Parameters
+        ----------
+        arg : str
+            Path of the file to send.
+
+        Examples
+        --------
+        sendfile firmware.bin
+        """
+        path = arg.strip()
+        if not path:
+            print("Usage: sendfile <path>")
+            return
+
+        def progress(sent, total):
+            percent = 100 * sent / total if total else 100.0
+            print(f"TXD: {sent:,} / {total:,} bytes ({percent:.0f}%)")
+
+        try:
+            with patch_stdout():
+                result = self.interface.writer.send_file(path, progress=progress)
+        except OSError as e:
+            print(f"Cannot send '{path}': {e}")
+            return
+        except ConnectionError as e:
+            print(f"Send failed: {e}")
+            return
+        print(f"TXD: sent {result['bytes']:,} bytes in {result['elapsed']:.2f} s ({result['rate'] / 1e3:,.1f} kB/s)")
+
+    def help_sendfile(self):
+        """
+        Print detailed help for the sendfile command.
+        """
+        print("\n".join([
+            "sendfile <path>",
+            "Send the contents of a file via the serial interface, reporting progress and throughput.",
+            "Pacing and flow control follow the configuration file.",
+            "",
+            "Examples:",
+            "  sendfile firmware.bin"
+        ]))
+
+    def do_query(self, arg):
+        """
+        Send one or more commands and print their responses with round-trip times.
+
+        Commands separated by ';' are sent without waiting for the previous response,
+        up to max_in_flight at a time.
+
+        Parameters
+        ----------
+        arg : str
+            Optional '--prefix <prefix>' or '--pattern <regex>' the responses must match,
+            followed by the commands.
+
+        Examples
+        --------
+        query VERSION?
+            Send VERSION? and print the next record received.
+        query --prefix T= TEMP1?; TEMP2?; TEMP3?
+            Send three commands at once and print the records starting with T=.
+        """
+        try:
+            tokens = shlex.split(arg)
+        except ValueError as e:
+            print(f"Cannot parse '{arg}': {e}")
+            return
+        options = {}
+        while len(tokens) >= 2 and tokens[0] in ('--prefix', '--pattern'):
+            options[tokens[0][2:]] = tokens[1]
+            tokens = tokens[2:]
+        commands = [command.strip() for command in ' '.join(tokens).split(';') if command.strip()]
+        if not commands:
+            print("Usage: query [--prefix <prefix> | --pattern <regex>] <command>[; <command>...]")
+            return
+        if self.interface.format == 'HEX':
+            try:
+                for command in commands:
+                    bytes.fromhex(command)
+            except ValueError:
+                print(f"'{command}' includes non-hexadecimal number")
+                return
+
+        transactions = []
+        for command in commands:
+            print("TXD: " + command)
+            transactions.append(self.transactions.request(command, **options))
+        for transaction in transactions:
+            try:
+                response = transaction.wait()
+            except TimeoutError:
+                print(f"No response to '{transaction.command}' within {transaction.timeout} s")
+                continue
+            if self.interface.format == 'HEX':
+                response = response.hex()
+            print(f"RXD: {response} ({transaction.rtt * 1e3:.1f} ms)")
+
+    def help_query(self):
+        """
+        Print detailed help for the query command.
+        """
+        print("\n".join([
+            "query [--prefix <prefix> | --pattern <regex>] <command>[; <command>...]",
+            "Send commands and print their responses with round-trip times. Without --prefix",
+            "or --pattern, the next record received is the response. Commands separated by ';'",
+            "are pipelined, up to max_in_flight at a time. Round-trip times appear in stats.",
+            "",
+            "Examples:",
+            "  query VERSION?",
+            "  query --prefix T= TEMP1?; TEMP2?; TEMP3?",
+            "  query --pattern '^OK|^ERR' RESET"
+        ]))
+
+    def do_history(self, arg):
+        """
+        Summarize the records received in the last seconds, from the history store.
+
+        Parameters
+        ----------
+        arg : str
+            Number of seconds, by default the whole history.
+
+        Examples
+        --------
+        history 10
+            Print the number of records and the min/mean/max of each channel over the last 10 s.
+        """
+        if self.store is None:
+            print("History is disabled, set history_max_mb in the configuration file.")
+            return
+        try:
+            seconds = float(arg) if arg.strip() else None
+        except ValueError:
+            print(f"'{arg.strip()}' is not a number of seconds")
+            return
+        window = self.store.window(None if seconds is None else time.time() - seconds)
+        if not len(window):
+            print("No records.")
+            return
+        span = window.time[-1] - window.time[0]
+        print(f"{len(window):,} records, index {window.index[0]} to {window.index[-1]}, over {span:.2f} s "
+              f"({self.store.nbytes / (1 << 20):.1f} MiB held, {self.store.evicted_rows:,} records evicted)")
+        for channel, column in enumerate(window.values.T):
+            valid = column[~np.isnan(column)]
+            if len(valid):
+                print(f"  channel {channel}: {len(valid):,} values, min {valid.min():.6g}, "
+                      f"mean {valid.mean():.6g}, max {valid.max():.6g}")
+
+    def help_history(self):
+        """
+        Print detailed help for the history command.
+        """
+        print("\n".join([
+            "history [seconds]",
+            "Summarize the records received in the last seconds, or all retained records:",
+            "count, index range and min/mean/max of each numeric channel.",
+            "The retained history is bounded by history_max_mb in the configuration file.",
+            "",
+            "Examples:",
+            "  history",
+            "  history 10"
+        ]))
+
+    def do_export(self, arg):
+        """
+        Start or stop exporting the received data to a file.
+
+        Parameters
+        ----------
+        arg : str
+            Output path, with the format taken from its extension, or 'stop'.
+
+        Examples
+        --------
+        export run1.csv
+            Write the numeric records to run1.csv from a background thread.
+        export stop
+            Finish the export and print what was written.
+        """
+        path = arg.strip()
+        if not path:
+            if self.exporter is None:
+                print("Usage: export <path>.csv|.npy|.npz|.bin, or export stop")
+            else:
+                print(f"Exporting to {self.exporter.segments[-1] if self.exporter.segments else self.exporter.path}: "
+                      f"{self.exporter.records_written:,} records, {self.exporter.bytes_written:,} bytes written")
+            return
+        if self.exporter is not None:
+            self.exporter.close()
+            exporter, self.exporter = self.exporter, None
+            print(f"Exported {exporter.records_written:,} records ({exporter.bytes_written:,} bytes) to "
+                  f"{len(exporter.segments)} file(s), {exporter.skipped_records:,} skipped, "
+                  f"{exporter.dropped_records:,} dropped")
+            if path == 'stop':
+                return
+        elif path == 'stop':
+            print("No export running.")
+            return
+        try:
+            exporter = Exporter(path, rotate_bytes=self.export_rotate_bytes, rotate_seconds=self.export_rotate_seconds)
+        except ValueError as e:
+            print(e)
+            return
+        try:
+            exporter.attach(self.interface)
+        except ValueError as e:  # Raw exports need the in-process reader
+            exporter.close()
+            print(e)
+            return
+        self.exporter = exporter
+        print(f"Exporting {self.exporter.format} to {path}")
+
+    def help_export(self):
+        """
+        Print detailed help for the export command.
+        """
+        print("\n".join([
+            "export <path> | stop",
+            "Write the received data to a file from a background thread. The format follows the",
+            f"extension: {', '.join(EXPORT_FORMATS[:3])} for the numeric records with their receive",
+            "time and index, anything else for the raw received bytes. Starting a new export",
+            "finishes the running one. Files are split per export_rotate_mb/export_rotate_seconds.",
+            "Without arguments, print the progress of the running export.",
+            "",
+            "Examples:",
+            "  export run1.csv",
+            "  export run1.npz",
+            "  export session.bin",
+            "  export stop"
+        ]))
+
+    def do_trigger(self, arg):
+        """
+        Set up, arm, show or turn off the trigger capture.
+
+        Parameters
+        ----------
+        arg : str
+            'level <channel> <level> [edge]', 'regex <expression>' or 'hex <bytes>', with
+            optional '--pre <records>', '--post <records>' and '--mode single|normal|auto';
+            or 'arm', 'show' or 'off'. Without arguments, print the trigger state.
+
+        Examples
+        --------
+        trigger level 0 2.5 rising --pre 200 --post 800
+            Capture 1001 records around every rising crossing of 2.5 on channel 0.
+        trigger regex ^ERROR --mode single
+            Capture once around the first record starting with ERROR.
+        """
+        try:
+            tokens = shlex.split(arg)
+        except ValueError as e:
+            print(f"Cannot parse '{arg}': {e}")
+            return
+        options = {'pre': self.trigger_pre, 'post': self.trigger_post, 'mode': 'normal'}
+        words = []
+        while tokens:
+            token = tokens.pop(0)
+            if token in ('--pre', '--post', '--mode') and tokens:
+                options[token[2:]] = tokens.pop(0)
+            else:
+                words.append(token)
+
+        trigger = self.trigger
+        if not words:
+            if trigger is None:
+                print("Trigger off. Usage: trigger level|regex|hex ... [--pre N] [--post M] [--mode single|normal|auto]")
+            else:
+                print(f"Trigger on {trigger.condition}, {trigger.mode} mode, {trigger.pre} pre / {trigger.post} post "
+                      f"records: {trigger.state}, {trigger.captures} captures")
+            return
+        if words[0] in ('arm', 'show', 'off') and trigger is None:
+            print("No trigger set.")
+            return
+        if words[0] == 'arm':
+            trigger.arm()
+            print("Trigger armed.")
+            return
+        if words[0] == 'off':
+            self.trigger = None
+            print("Trigger off.")
+            return
+        if words[0] == 'show':
+            self._show_capture(trigger.capture)
+            return
+
+        try:
+            condition = make_trigger(words[0], words[1:], self.interface.format)
+            trigger = TriggerEngine(condition, int(options['pre']), int(options['post']), options['mode'])
+        except ValueError as e:
+            print(f"Invalid trigger: {e}")
+            return
+        self.trigger = trigger
+        print(f"Trigger armed on {condition}, {trigger.mode} mode, {trigger.pre} pre / {trigger.post} post records.")
+
+    def _show_capture(self, capture):
+        """
+        Print the trigger record of a capture, the records around it and the range of each channel.
+        """
+        if capture is None:
+            print("No capture yet.")
+            return
+        span = capture.times[-1] - capture.times[0]
+        print(f"Capture {capture.number}{' (forced)' if capture.forced else ''}: index {capture.index} at "
+              f"{time.strftime('%H:%M:%S', time.localtime(capture.time))}, {len(capture)} records "
+              f"(index {capture.indices[0]} to {capture.indices[-1]}) over {span:.3f} s")
+        for row in range(max(capture.position - 3, 0), min(capture.position + 4, len(capture))):
+            record = capture.records[row]
+            text = "0x" + record.hex() if isinstance(record, bytes) else record
+            print(f"{'>' if row == capture.position else ' '} {capture.indices[row]}: {text}")
+        for channel, column in enumerate(capture.values.T):
+            valid = column[~np.isnan(column)]
+            if len(valid):
+                print(f"  channel {channel}: min {valid.min():.6g}, max {valid.max():.6g}, "
+                      f"at trigger {column[capture.position]:.6g}")
+
+    def help_trigger(self):
+        """
+        Print detailed help for the trigger command.
+        """
+        print("\n".join([
+            "trigger level <channel> <level> [rising|falling|either|above|below] [options]",
+            "trigger regex <expression> [options]",
+            "trigger hex <bytes> [options]",
+            "trigger arm | show | off",
+            "Capture the records around an event, like an oscilloscope: a channel crossing a",
+            "level, a record matching a regular expression, or a byte pattern in HEX format.",
+            "Options: --pre <records> and --post <records> (defaults trigger_pre and trigger_post",
+            f"in the configuration file), --mode {'|'.join(TRIGGER_MODES)}. 'single' stops after",
+            "one capture until 'trigger arm'; 'auto' also captures after 1 s without a trigger.",
+            "Captures are announced with TRIG:, plotted in their own window when plotting is on,",
+            "and printed by 'trigger show'. Without arguments, print the trigger state.",
+            "",
+            "Examples:",
+            "  trigger level 0 2.5 rising --pre 200 --post 800",
+            "  trigger regex ^ERROR --mode single",
+            "  trigger hex aa55 --pre 10 --post 10",
+            "  trigger show"
+        ]))
+
+    def do_stats(self, arg):
+        """
+        Print the pipeline metrics.
+
+        Parameters
+        ----------
+        arg : str
+            Unused parameter.
+
+        Examples
+        --------
+        stats
+            Print counters, queue depths and latency percentiles of each stage.
+        """
+        print(self.metrics.format())
+
+    def help_stats(self):
+        """
+        Print detailed help for the stats command.
+        """
+        print("\n".join([
+            "stats",
+            "Print the pipeline metrics: bytes, frames and lines per stage, queue depths,",
+            "drops and latency percentiles in milliseconds from receive to print and plot."
+        ]))
+
     def do_exit(self, arg):
         """
         Exit the serial monitor.
@@ -255,8 +767,8 @@ class SerialMonitor(cmd.Cmd):
         """
         print('Exiting Serial Monitor.')
         self.running = False
-        if self.animation and self.animation.event_source:
-            self.animation.event_source.stop()  # Stop the animation timer
+        if self.plot_timer:
+            self.plot_timer.stop()  # Stop the plot timer
         return True
 
     def help_exit(self):
@@ -289,8 +801,8 @@ class SerialMonitor(cmd.Cmd):
             except (KeyboardInterrupt, EOFError):
                 print('Exiting Serial Monitor.')
                 self.running = False
-                if self.animation and self.animation.event_source:
-                    self.animation.event_source.stop()  # Stop the animation timer
+                if self.plot_timer:
+                    self.plot_timer.stop()  # Stop the plot timer
                 break
 
         self.postloop()  # Hook before exiting
@@ -306,8 +818,11 @@ class SerialMonitor(cmd.Cmd):
         Hook method executed once when the cmdloop method is about to return.
         """
         self.running = False
+        self.transactions.close()
+        if self.exporter is not None:
+            self.exporter.close()
 
-def serial_monitor(config_file):
+def serial_monitor(config_file, replay=None, speed=1.0):
     """
     Start and run the CLI application with configuration from a YAML file.
 
@@ -315,7 +830,15 @@ def serial_monitor(config_file):
     ----------
     config_file : str
         Path to the configuration file.
+    replay : str, optional
+        Path to a capture file to replay instead of opening a serial port.
+    speed : float, optional
+        Replay speed relative to the recording, 0 for as fast as possible. Defaults to 1.0.
     """
+    import yaml
+    from pydantic import ValidationError
+    from .models import Config
+
     # Load the configuration
     with open(config_file, 'r') as file:
         try:
@@ -325,31 +848,81 @@ def serial_monitor(config_file):
             print(f"Configuration error: {e}")
             return
 
-    logger = log_init()
-
-    port_interface = port_manager.select_port(
-        interactive=False,
-        baudrate=config.baudrate,
-        timeout=config.timeout,
-        portname="sertools",
-        logger=logger)
+    logger = log_init(async_file=config.async_log)
+    traffic_log = TrafficLogger(config.traffic_log, config.traffic_log_sample_every, config.traffic_log_max_rate, logger)
+
+    capture_replay = None
+    if replay is not None:
+        capture_replay = CaptureReplay(replay, speed=speed)
+        port_interface = capture_replay.open(baudrate=config.baudrate, timeout=config.timeout)
+    elif config.port is not None:
+        port_interface = port_manager.open_port(config.port, config.baudrate, config.timeout, logger)
+    else:
+        port_interface = port_manager.select_port(
+            interactive=False,
+            baudrate=config.baudrate,
+            timeout=config.timeout,
+            portname="sertools",
+            logger=logger)
 
     if not port_interface:
         return
 
-    target_serial_interface = serial_interface(
-        port_interface,
-        terminal=False,
-        max_queue_size=10,
-        format=config.format,
-        logger=logger
+    framer = None
+    if config.framing is not None:
+        framer = make_framer(**config.framing.model_dump(), format=config.format)
+
+    supervisor = None
+    if config.reconnect and capture_replay is None and not config.process_pipeline:
+        supervisor = ReconnectSupervisor.for_port(port_interface, logger)
+
+    metrics = MetricsRegistry()
+    writer_options = dict(
+        inter_byte_delay=config.tx_inter_byte_delay,
+        inter_line_delay=config.tx_inter_line_delay,
+        flow_control=config.flow_control
     )
+
+    if config.process_pipeline:
+        # Imported here, as the module is only needed with the process pipeline
+        from .shm_pipeline import ProcessInterface
+        target_serial_interface = ProcessInterface(
+            port_interface,
+            max_queue_size=config.max_queue_size,
+            queue_policy=config.queue_policy,
+            format=config.format,
+            logger=logger,
+            framing=config.framing.model_dump() if config.framing is not None else None,
+            traffic_log=traffic_log,
+            metrics=metrics,
+            ring_size=int(config.process_ring_mb * (1 << 20)),
+            writer_options=writer_options
+        )
+    else:
+        target_serial_interface = serial_interface(
+            port_interface,
+            terminal=False,
+            max_queue_size=config.max_queue_size,
+            queue_policy=config.queue_policy,
+            format=config.format,
+            logger=logger,
+            framer=framer,
+            traffic_log=traffic_log,
+            metrics=metrics,
+            writer=SerialWriter(port_interface, metrics=metrics, **writer_options),
+            supervisor=supervisor
+        )
     serial_monitor_instance = SerialMonitor(target_serial_interface, config)
+    if config.stats_interval > 0:
+        target_serial_interface.metrics.start_logging(config.stats_interval, logger)
     
     # Start the command loop in its own thread
     cmd_thread = threading.Thread(target=serial_monitor_instance.cmdloop)
     cmd_thread.start()
     
+    if serial_monitor_instance.plotting:
+        import matplotlib.pyplot as plt
+
     # Start the main loop to keep plot active
     while serial_monitor_instance.running:
         if serial_monitor_instance.plotting:
@@ -360,4 +933,12 @@ def serial_monitor(config_file):
         time.sleep(0.1)
 
     # Ensure the command loop thread exits cleanly
-    cmd_thread.join()
\ No newline at end of file
+    cmd_thread.join()
+    target_serial_interface.metrics.stop_logging()
+    if config.process_pipeline:
+        target_serial_interface.stop()
+
+    if capture_replay is not None:
+        target_serial_interface.stop_flag = True
+        target_serial_interface.thread.join()
+        capture_replay.close()
\ No newline at end of file
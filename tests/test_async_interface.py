@@ -0,0 +1,80 @@
+"""
+Tests of AsyncSerialInterface against a pseudo-terminal pair.
+
+The test writes to the master side as the device would, and the interface reads
+the slave side through a regular serial.Serial.
+"""
+import asyncio
+import os
+import pty
+import tty
+
+import pytest
+import serial
+
+from serial_toolbox.async_interface import AsyncSerialInterface
+
+
+@pytest.fixture
+def pty_pair():
+    master_fd, slave_fd = pty.openpty()
+    tty.setraw(master_fd)
+    port = serial.Serial(os.ttyname(slave_fd), timeout=0)
+    os.close(slave_fd)
+    yield master_fd, port
+    try:
+        os.close(master_fd)
+    except OSError:
+        pass
+    port.close()
+
+
+def test_readline(pty_pair):
+    master_fd, port = pty_pair
+
+    async def main():
+        async with AsyncSerialInterface(port) as interface:
+            os.write(master_fd, b'first line\r\nsecond')
+            assert await interface.readline(timeout=1.0) == 'first line'
+            os.write(master_fd, b' line\n')
+            assert await interface.readline(timeout=1.0) == 'second line'
+            assert interface.data_index == 2
+
+    asyncio.run(main())
+
+
+def test_write(pty_pair):
+    master_fd, port = pty_pair
+
+    async def main():
+        async with AsyncSerialInterface(port) as interface:
+            await interface.write('PING')
+            await asyncio.sleep(0.05)
+            assert os.read(master_fd, 100) == b'PING\n'
+
+    asyncio.run(main())
+
+
+def test_readline_timeout(pty_pair):
+    _, port = pty_pair
+
+    async def main():
+        async with AsyncSerialInterface(port) as interface:
+            with pytest.raises(TimeoutError):
+                await interface.readline(timeout=0.1)
+
+    asyncio.run(main())
+
+
+def test_readline_eof(pty_pair):
+    master_fd, port = pty_pair
+
+    async def main():
+        async with AsyncSerialInterface(port) as interface:
+            os.write(master_fd, b'last\n')
+            assert await interface.readline(timeout=1.0) == 'last'
+            os.close(master_fd)  # The device side hangs up
+            with pytest.raises(EOFError):
+                await interface.readline(timeout=1.0)
+
+    asyncio.run(main())